@@ -1,9 +1,16 @@
+import atexit
+import hmac
+import os
+import threading
 import time
-from flask import Flask, send_from_directory, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, Response, abort, send_from_directory, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
-from game.engine import GameEngine
 from game.constants import TICK_RATE
+from game.launch import make_arenas
+from game.metrics import METRICS, PROFILER
+from game.scheduler import TickTimer
+from game.workers import ArenaPool
 
 # -----------------------------------------------------------------------------
 # Flask + Socket.IO setup
@@ -13,66 +20,85 @@ app.config["SECRET_KEY"] = "u-boat-secret"
 socketio = SocketIO(app, async_mode="threading")
 
 # -----------------------------------------------------------------------------
-# Game Engine Instance
+# Arenas
 # -----------------------------------------------------------------------------
-game_engine = GameEngine()
+# Each arena is an independent match with its own GameEngine and Socket.IO
+# room; the manager creates them as players join and drops them when empty.
+# Which manager runs them (in-process, worker processes, cluster node) is
+# configured through the environment, see game.launch. It is built by the
+# entry point below: with ARENA_WORKERS, worker processes re-import this
+# module and must not start workers of their own.
+arenas = None
 game_loop_started = False
 
+# Socket.IO handlers run on their own threads (async_mode="threading") while
+# game_loop steps the arenas, and neither the manager nor an engine is safe
+# to change mid-tick. Every call into ``arenas`` from the loop, the routes
+# and the handlers holds this lock; relaying the result happens outside it.
+arenas_lock = threading.Lock()
+
+# Setting PROFILE_DIR enables /debug/profile, which samples stacks for a
+# number of ticks and writes a folded-stack file there.
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+
+# Setting ADMIN_TOKEN enables POST /admin/announce ({"message": ...} with
+# "Authorization: Bearer <token>"), which sends a system message to every
+# player, on every node of a cluster.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+def relay(messages):
+    for message in messages:
+        socketio.emit(
+            message.event, message.payload, room=message.to, skip_sid=message.skip_sid
+        )
+        METRICS.inc("messages_emitted_total", event=message.event)
+        # JSON payloads are serialized inside Socket.IO; only binary frames
+        # (possibly bundled in tick_events) have a size known here.
+        payload = message.payload
+        if message.event == "tick_events":
+            payload = payload["state"]
+        if isinstance(payload, bytes):
+            METRICS.inc("bytes_emitted_total", len(payload))
+
+
+def worker_relay(index):
+    while True:
+        relay(arenas.receive(index))
+
 
 # -----------------------------------------------------------------------------
 # Game Loop
 # -----------------------------------------------------------------------------
 def game_loop():
+    # Every arena broadcasts at TICK_RATE, but they are spread over
+    # ARENA_TICK_SLOTS slots so each frame of this loop only steps a share of
+    # them. Engines simulate in fixed SIM_RATE steps on their own clocks.
+    timer = TickTimer(TICK_RATE * arenas.slots)
     while True:
-        # Update game state
-        events = game_engine.update()
-
-        # Process events
-        for event in events:
-            if event["type"] == "respawn_ready":
-                socketio.emit(
-                    "respawn_ready",
-                    {"message": "You may respawn when ready."},
-                    room=event["sid"],
-                )
-            elif event["type"] == "hit":
-                socketio.emit(
-                    "sub_hit",
-                    {
-                        "victim_id": event["victim_id"],
-                        "victim_username": event["victim_name"],
-                        "attacker_username": event["attacker_name"],
-                    },
-                )
-                socketio.emit(
-                    "hit_confirmed",
-                    {
-                        "victim_id": event["victim_id"],
-                        "victim_username": event["victim_name"],
-                    },
-                    room=event["attacker_id"],
-                )
-                socketio.emit(
-                    "you_were_hit",
-                    {
-                        "by_username": event["attacker_name"],
-                        "respawn_available_at": event["respawn_at"],
-                    },
-                    room=event["victim_id"],
-                )
-
-        # Broadcast state to all players
-        # Note: In a real large-scale game, we wouldn't iterate all players here.
-        # We might only send updates to players who need them.
-        # But for this MVP, we iterate the known sockets or just the engine players.
-        # Since we don't have a list of all connected SIDs easily accessible without
-        # tracking them, we can iterate the players in the engine.
-        for sid in list(game_engine.submarines.keys()):
-            state = game_engine.get_state(sid)
-            if state:
-                socketio.emit("state_update", state, room=sid)
-
-        socketio.sleep(1.0 / TICK_RATE)
+        start = time.perf_counter()
+        with arenas_lock:
+            messages = arenas.tick()
+            METRICS.set("connected_players", len(arenas.player_arena))
+            METRICS.set("arenas", len(arenas.arenas))
+            dropped_steps = arenas.dropped_steps
+        emitting = time.perf_counter()
+        relay(messages)
+        METRICS.observe("phase_seconds", time.perf_counter() - emitting, phase="emit")
+        METRICS.observe("tick_seconds", time.perf_counter() - start)
+        profile = PROFILER.tick()
+        if profile:
+            app.logger.info("Wrote stack profile to %s", profile)
+
+        if timer.advance():
+            METRICS.inc("tick_overruns_total")
+            app.logger.warning(
+                "Tick overran by %.1f ms (%d overruns, %d simulation steps dropped)",
+                timer.last_overrun * 1000.0,
+                timer.overruns,
+                dropped_steps,
+            )
+        socketio.sleep(timer.remaining())
 
 
 # -----------------------------------------------------------------------------
@@ -83,6 +109,39 @@ def index():
     return send_from_directory("static", "index.html")
 
 
+@app.route("/metrics")
+def metrics():
+    with arenas_lock:
+        METRICS.set("dropped_steps", arenas.dropped_steps)
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/debug/profile")
+def profile():
+    if not PROFILE_DIR:
+        abort(404)
+    ticks = request.args.get("ticks", 100, type=int)
+    path = os.path.join(PROFILE_DIR, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+    if not PROFILER.start(max(1, ticks), path):
+        return {"status": "busy"}, 409
+    return {"status": "sampling", "ticks": ticks, "path": path}
+
+
+@app.route("/admin/announce", methods=["POST"])
+def announce():
+    if not ADMIN_TOKEN or not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {ADMIN_TOKEN}".encode()
+    ):
+        abort(404)
+    message = (request.get_json(silent=True) or {}).get("message")
+    if not isinstance(message, str) or not message.strip():
+        abort(400)
+    with arenas_lock:
+        messages = arenas.announce(message.strip())
+    relay(messages)
+    return {"status": "sent"}
+
+
 # -----------------------------------------------------------------------------
 # Socket.IO events
 # -----------------------------------------------------------------------------
@@ -93,92 +152,78 @@ def on_connect():
 
 @socketio.on("disconnect")
 def on_disconnect():
-    sid = request.sid
-    sub = game_engine.remove_player(sid)
-    if sub:
-        socketio.emit(
-            "system_message",
-            {"message": f"{sub.username} has left the hunt."},
-            skip_sid=sid,
-        )
+    with arenas_lock:
+        messages = arenas.leave(request.sid)
+    relay(messages)
 
 
 @socketio.on("join_game")
 def on_join_game(data):
     sid = request.sid
     username = data.get("username", "Captain")
-    game_engine.add_player(sid, username)
-    emit("joined", {"id": sid, "username": username})
-    socketio.emit(
-        "system_message",
-        {"message": f"{username} has joined the hunt."},
-        skip_sid=sid,
-    )
+    with arenas_lock:
+        previous = arenas.arena_for(sid)
+        if previous:
+            for room in previous.rooms_for(sid):
+                leave_room(room)
+        arena, messages = arenas.join(
+            sid,
+            username,
+            arena_name=data.get("arena"),
+            encodings=data.get("encodings"),
+            token=data.get("token"),
+        )
+        # No arena when the player was redirected to another node.
+        if arena:
+            for room in arena.rooms_for(sid):
+                join_room(room)
+    relay(messages)
+
+
+def dispatch(event, data=None):
+    with arenas_lock:
+        messages = arenas.dispatch(request.sid, event, data)
+    relay(messages)
+
+
+@socketio.on("state_ack")
+def on_state_ack(data):
+    dispatch("state_ack", data)
+
+
+@socketio.on("request_keyframe")
+def on_request_keyframe(data):
+    dispatch("request_keyframe", data)
 
 
 @socketio.on("update_controls")
 def on_update_controls(data):
-    sid = request.sid
-    game_engine.update_controls(sid, data)
+    dispatch("update_controls", data)
 
 
 @socketio.on("sonar_ping")
 def on_sonar_ping():
-    sid = request.sid
-    result = game_engine.perform_sonar_ping(sid)
-    
-    # Send results to the pinger
-    emit("sonar_result", {"contacts": result["contacts"]})
-    
-    # Notify those who were pinged
-    if "detected_by" in result:
-        for detection in result["detected_by"]:
-            socketio.emit(
-                "sonar_ping_detected",
-                {
-                    "pinging_id": detection["pinger_id"],
-                    "pinging_username": detection["pinger_name"],
-                    "approx_distance": detection["dist"],
-                },
-                room=detection["target_id"],
-            )
+    dispatch("sonar_ping")
 
 
 @socketio.on("fire_torpedo")
-def on_fire_torpedo():
-    sid = request.sid
-    torp_id = game_engine.fire_torpedo(sid)
-    if torp_id:
-        emit("torpedo_fired", {"id": torp_id})
+def on_fire_torpedo(data=None):
+    dispatch("fire_torpedo", data)
 
 
 @socketio.on("request_respawn")
 def on_request_respawn():
-    sid = request.sid
-    success = game_engine.request_respawn(sid)
-    if success:
-        sub = game_engine.get_player(sid)
-        socketio.emit(
-            "system_message",
-            {"message": f"{sub.username} has re-entered the hunt."},
-            skip_sid=sid,
-        )
-        # The state update loop will pick up the new position and send it
-        # But we can also send a confirmation message
-        emit(
-            "respawn_confirmed",
-            {"message": "You are back in the fight.", "x": sub.x, "y": sub.y},
-        )
-    else:
-        emit(
-            "respawn_not_ready",
-            {"message": "Hold tight, the crew is still preparing a new sub."},
-        )
+    dispatch("request_respawn")
 
 
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
     if not game_loop_started:
+        arenas = make_arenas()
+        atexit.register(arenas.close)
+        if isinstance(arenas, ArenaPool):
+            for index in range(len(arenas.workers)):
+                socketio.start_background_task(worker_relay, index)
         socketio.start_background_task(game_loop)
         game_loop_started = True
     socketio.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,183 @@
+"""
+Batch match simulation.
+
+Plays many seeded matches between scripted bot captains, headlessly and on
+manual clocks, across a process pool. Each match is fully determined by its
+seed (the engine's SimContext and the bots' generators all derive from it),
+so a batch doubles as a balance report (hits, accuracy, respawns per match)
+and as a regression check: the same seeds must produce the same world
+digests from one release to the next unless the simulation was meant to
+change.
+
+    python -m benchmarks.batch_sim --matches 1000 --subs 12 --duration 120 \\
+        --processes 8 --output batch.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from game.constants import TICK_RATE
+from game.engine import BACKENDS, GameEngine
+from game.replay import ManualClock, state_digest
+
+from .bots import BotCaptain
+from .engine_bench import percentile
+
+# Bot inputs as engine commands.
+COMMANDS = {
+    "update_controls": "controls",
+    "fire_torpedo": "fire",
+    "sonar_ping": "ping",
+    "request_respawn": "respawn",
+}
+
+
+def run_match(seed: int, subs: int = 12, duration: float = 60.0, backend: str = "object") -> dict:
+    """Simulates one match of ``duration`` seconds of play; returns its result record."""
+    clock = ManualClock(0.0)
+    engine = GameEngine(backend=backend, seed=seed, clock=clock)
+    bots = {}
+    for i in range(subs):
+        sid = f"bot{i}"
+        engine.add_player(sid, f"Bot {i}")
+        bots[sid] = BotCaptain(random.Random(f"{seed}:{sid}"))
+
+    frame_dt = 1.0 / TICK_RATE
+    frames = int(round(duration * TICK_RATE))
+    shots = hits = respawns = 0
+    kills: Dict[str, int] = dict.fromkeys(bots, 0)
+    start = time.perf_counter()
+    for _ in range(frames):
+        for sid, bot in bots.items():
+            for event, data in bot.decide(engine.submarines[sid].alive):
+                engine.queue_command(sid, COMMANDS[event], data)
+        clock.advance(frame_dt)
+        for event in engine.update(frame_dt):
+            kind = event["type"]
+            if kind == "torpedo_fired":
+                shots += 1
+            elif kind == "hit":
+                hits += 1
+                if event["attacker_id"] in kills:
+                    kills[event["attacker_id"]] += 1
+            elif kind == "respawn" and event["ok"]:
+                respawns += 1
+    wall = time.perf_counter() - start
+
+    simulated = engine.tick * engine.sim_dt
+    return {
+        "seed": seed,
+        "subs": subs,
+        "backend": backend,
+        "ticks": engine.tick,
+        "shots": shots,
+        "hits": hits,
+        "accuracy": hits / shots if shots else 0.0,
+        "respawns": respawns,
+        "top_kills": max(kills.values(), default=0),
+        "wall_seconds": wall,
+        "speedup": simulated / max(wall, 1e-9),
+        "digest": state_digest(engine),
+    }
+
+
+def _run_match(args) -> dict:
+    return run_match(*args)
+
+
+def run_batch(
+    seeds: Iterable[int],
+    subs: int = 12,
+    duration: float = 60.0,
+    backend: str = "object",
+    processes: Optional[int] = None,
+) -> List[dict]:
+    """
+    Runs one match per seed, in seed order. ``processes`` defaults to the
+    CPU count; 1 runs every match in this process.
+    """
+    jobs = [(seed, subs, duration, backend) for seed in seeds]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) <= 1:
+        return [_run_match(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        chunksize = max(1, len(jobs) // (processes * 4))
+        return list(pool.map(_run_match, jobs, chunksize=chunksize))
+
+
+def aggregate(results: List[dict], wall: float) -> dict:
+    """Batch-wide balance and throughput figures."""
+    if not results:
+        return {"matches": 0}
+    shots = sum(r["shots"] for r in results)
+    hits = sum(r["hits"] for r in results)
+    match_walls = [r["wall_seconds"] for r in results]
+    return {
+        "matches": len(results),
+        "shots": shots,
+        "hits": hits,
+        "accuracy": hits / shots if shots else 0.0,
+        "hits_per_match": statistics.fmean(r["hits"] for r in results),
+        "respawns_per_match": statistics.fmean(r["respawns"] for r in results),
+        "top_kills_max": max(r["top_kills"] for r in results),
+        "match_wall_p50_s": percentile(match_walls, 50),
+        "match_wall_p99_s": percentile(match_walls, 99),
+        "matches_per_second": len(results) / max(wall, 1e-9),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--first-seed", type=int, default=1)
+    parser.add_argument("--subs", type=int, default=12, help="bot captains per match")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of play per match")
+    parser.add_argument("--backend", choices=BACKENDS, default="object")
+    parser.add_argument("--processes", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    seeds = range(args.first_seed, args.first_seed + args.matches)
+    start = time.perf_counter()
+    results = run_batch(seeds, args.subs, args.duration, args.backend, args.processes)
+    wall = time.perf_counter() - start
+    summary = aggregate(results, wall)
+    print(
+        "%d matches in %.1f s (%.1f/s)  accuracy %.1f%%  %.1f hits/match  match p99 %.2f s"
+        % (
+            summary["matches"],
+            wall,
+            summary.get("matches_per_second", 0.0),
+            summary.get("accuracy", 0.0) * 100.0,
+            summary.get("hits_per_match", 0.0),
+            summary.get("match_wall_p99_s", 0.0),
+        )
+    )
+
+    if args.output:
+        report = {
+            "meta": {
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "subs": args.subs,
+                "duration": args.duration,
+                "backend": args.backend,
+            },
+            "summary": summary,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
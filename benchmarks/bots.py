@@ -0,0 +1,44 @@
+"""Scripted bot captains shared by the benchmark drivers."""
+import random
+from typing import Optional
+
+from game.constants import MAX_DEPTH, SUB_MAX_SPEED
+
+
+class BotCaptain:
+    """
+    Wanders with occasional course changes, fires and pings at random.
+    ``decide`` returns the inputs to send this frame as (event, data) pairs,
+    using the same event names as the Socket.IO protocol.
+    """
+
+    def __init__(
+        self,
+        rng: random.Random,
+        turn_chance: float = 0.1,
+        fire_chance: float = 0.02,
+        ping_chance: float = 0.02,
+    ):
+        self.rng = rng
+        self.turn_chance = turn_chance
+        self.fire_chance = fire_chance
+        self.ping_chance = ping_chance
+
+    def controls(self) -> dict:
+        return {
+            "heading": self.rng.uniform(0.0, 360.0),
+            "speed": self.rng.uniform(0.0, SUB_MAX_SPEED),
+            "depth": self.rng.uniform(0.0, MAX_DEPTH),
+        }
+
+    def decide(self, alive: Optional[bool] = True):
+        if not alive:
+            return [("request_respawn", None)]
+        actions = []
+        if self.rng.random() < self.turn_chance:
+            actions.append(("update_controls", self.controls()))
+        if self.rng.random() < self.fire_chance:
+            actions.append(("fire_torpedo", None))
+        if self.rng.random() < self.ping_chance:
+            actions.append(("sonar_ping", None))
+        return actions
@@ -0,0 +1,214 @@
+"""
+Headless engine benchmark.
+
+Drives a GameEngine directly with scripted bot captains and reports, per
+configuration, timings for each phase of a broadcast frame (``update``,
+``get_state`` for every player, ``perform_sonar_ping`` and serialization),
+p50/p99 frame latency, garbage collections, peak allocations and the
+serialized bytes sent per player per frame (JSON and binary wire format).
+
+    python -m benchmarks.engine_bench --subs 10 100 1000 --torpedoes 200 \\
+        --frames 100 --output bench.json
+
+Results are written as JSON so runs from different releases can be diffed.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from game.constants import TICK_RATE, WORLD_SIZE
+from game.engine import BACKENDS, GameEngine
+from game.protocol import DeltaEncoder
+from game.replay import ManualClock
+from game.wire import PLAYER_STREAM, WireCodec
+
+from .bots import BotCaptain
+
+PHASES = ("update", "get_state", "sonar_ping", "serialize")
+
+# Bot inputs queued on the engine; pings are timed as their own phase.
+QUEUED = {"update_controls": "controls", "fire_torpedo": "fire", "request_respawn": "respawn"}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Seconds in, milliseconds out."""
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000.0 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000.0,
+        "p99_ms": percentile(samples, 99) * 1000.0,
+        "max_ms": max(samples) * 1000.0 if samples else 0.0,
+    }
+
+
+def populate(engine: GameEngine, subs: int, torpedoes: int, rng: random.Random) -> List[BotCaptain]:
+    bots = []
+    for i in range(subs):
+        sid = f"bot{i}"
+        sub = engine.add_player(sid, f"Bot {i}")
+        sub.place(rng.uniform(0, WORLD_SIZE), rng.uniform(0, WORLD_SIZE))
+        bot = BotCaptain(random.Random(rng.random()))
+        sub.set_controls(**_control_args(bot.controls()))
+        bots.append(bot)
+    sids = list(engine.submarines)
+    for _ in range(torpedoes if sids else 0):
+        engine.fire_torpedo(rng.choice(sids))
+        torp = engine.torpedoes[-1]  # launches append to the active list
+        torp.place(rng.uniform(0, WORLD_SIZE), rng.uniform(0, WORLD_SIZE))
+        torp.heading = rng.uniform(0.0, 360.0)
+    return bots
+
+
+def _control_args(data: dict) -> dict:
+    return {"heading": data["heading"], "speed_command": data["speed"], "depth": data["depth"]}
+
+
+def run(
+    subs: int,
+    torpedoes: int = 0,
+    frames: int = 20,
+    backend: str = "object",
+    seed: int = 1,
+    trace_alloc: bool = False,
+) -> dict:
+    """Benchmarks one configuration; returns its result record."""
+    rng = random.Random(seed)
+    # Cooldowns, torpedo expiry and respawns run on simulated time.
+    clock = ManualClock(0.0)
+    engine = GameEngine(backend=backend, seed=seed, clock=clock)
+    bots = populate(engine, subs, torpedoes, rng)
+    sids = list(engine.submarines)
+    streams = {sid: (DeltaEncoder(), DeltaEncoder()) for sid in sids}
+    codec = WireCodec()
+    for sid in sids:
+        codec.register_sub(sid, engine.submarines[sid].username)
+
+    frame_dt = 1.0 / TICK_RATE
+    timings = {phase: [] for phase in PHASES}
+    frame_times = []
+    json_bytes = binary_bytes = 0
+    gc_before = sum(stat["collections"] for stat in gc.get_stats())
+    peak_alloc = 0
+    if trace_alloc:
+        tracemalloc.start()
+
+    for _ in range(frames):
+        if trace_alloc:
+            tracemalloc.reset_peak()
+        frame_start = time.perf_counter()
+
+        pinging = []
+        for sid, bot in zip(sids, bots):
+            for event, data in bot.decide(engine.submarines[sid].alive):
+                if event == "sonar_ping":
+                    pinging.append(sid)
+                else:
+                    engine.queue_command(sid, QUEUED[event], data)
+
+        clock.advance(frame_dt)
+        start = time.perf_counter()
+        engine.update(frame_dt)
+        timings["update"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for sid in pinging:
+            engine.perform_sonar_ping(sid)
+        timings["sonar_ping"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        states = [engine.get_personal_state(sid) for sid in sids]
+        timings["get_state"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        codec.sync_torpedoes(t.id for t in engine.torpedoes)
+        for sid, state in zip(sids, states):
+            json_stream, binary_stream = streams[sid]
+            message = json_stream.encode(state)
+            json_bytes += len(json.dumps(message, separators=(",", ":")))
+            json_stream.ack(message["seq"])
+            message = binary_stream.encode(state)
+            binary_bytes += len(codec.encode_stream(PLAYER_STREAM, message))
+            binary_stream.ack(message["seq"])
+        timings["serialize"].append(time.perf_counter() - start)
+
+        frame_times.append(time.perf_counter() - frame_start)
+        if trace_alloc:
+            peak_alloc = max(peak_alloc, tracemalloc.get_traced_memory()[1])
+
+    if trace_alloc:
+        tracemalloc.stop()
+    player_frames = max(1, len(sids) * frames)
+    return {
+        "subs": subs,
+        "torpedoes": torpedoes,
+        "frames": frames,
+        "backend": backend,
+        "frame": summarize(frame_times),
+        "phases": {phase: summarize(samples) for phase, samples in timings.items()},
+        "gc_collections": sum(stat["collections"] for stat in gc.get_stats()) - gc_before,
+        "peak_alloc_bytes": peak_alloc if trace_alloc else None,
+        "torpedoes_in_flight": len(engine.torpedoes),
+        "bytes_per_player_frame": {
+            "json": json_bytes / player_frames,
+            "binary": binary_bytes / player_frames,
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subs", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--torpedoes", type=int, default=0, help="torpedoes in flight at start")
+    parser.add_argument("--frames", type=int, default=20, help="broadcast frames per configuration")
+    parser.add_argument("--backend", choices=BACKENDS, default="object")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-alloc", action="store_true", help="record peak allocations (slow)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for subs in args.subs:
+        result = run(subs, args.torpedoes, args.frames, args.backend, args.seed, args.trace_alloc)
+        results.append(result)
+        print(
+            "%5d subs %5d torps  frame p50 %7.2f ms  p99 %7.2f ms  %6.0f B/player (binary)"
+            % (
+                subs,
+                args.torpedoes,
+                result["frame"]["p50_ms"],
+                result["frame"]["p99_ms"],
+                result["bytes_per_player_frame"]["binary"],
+            )
+        )
+
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
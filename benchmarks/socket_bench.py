@@ -0,0 +1,169 @@
+"""
+Socket.IO load generator.
+
+Connects many local websocket clients to a running server (``app.py`` or
+``server_async.py``), each steered by a BotCaptain. It measures what the
+clients see: state_update rate and inter-arrival jitter, bytes received per
+client, and connect/join latency.
+
+    python app.py &
+    python -m benchmarks.socket_bench --url http://localhost:5000 \\
+        --clients 200 --duration 30 --output socket.json
+
+Requires the asyncio Socket.IO client (``pip install "python-socketio[asyncio_client]"``).
+"""
+import argparse
+import asyncio
+import json
+import random
+import struct
+import sys
+import time
+from typing import List, Optional
+
+import socketio
+
+from .bots import BotCaptain
+from .engine_bench import summarize
+
+
+class LoadClient:
+    def __init__(self, index: int, url: str, encoding: str, arena: Optional[str], seed: int):
+        self.index = index
+        self.url = url
+        self.encoding = encoding
+        self.arena = arena
+        self.bot = BotCaptain(random.Random(seed))
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.joined = asyncio.Event()
+        self.alive = True
+        self.join_latency = None
+        self.updates = 0
+        self.bytes = 0
+        self.arrivals: List[float] = []
+        self.last_arrival = None
+
+        self.sio.on("joined", self._on_joined)
+        self.sio.on("state_update", self._on_state_update)
+        self.sio.on("tick_events", self._on_tick_events)
+        self.sio.on("you_were_hit", self._on_hit)
+        self.sio.on("respawn_confirmed", self._on_respawn)
+
+    async def _on_joined(self, data):
+        self.joined.set()
+
+    async def _on_hit(self, data):
+        self.alive = False
+
+    async def _on_respawn(self, data):
+        self.alive = True
+
+    async def _on_tick_events(self, bundle):
+        for event, payload in bundle["events"]:
+            if event == "you_were_hit":
+                await self._on_hit(payload)
+            elif event == "respawn_confirmed":
+                await self._on_respawn(payload)
+        if bundle["state"] is not None:
+            await self._on_state_update(bundle["state"])
+
+    async def _on_state_update(self, message):
+        now = time.perf_counter()
+        if self.last_arrival is not None:
+            self.arrivals.append(now - self.last_arrival)
+        self.last_arrival = now
+        self.updates += 1
+        if isinstance(message, (bytes, bytearray)):
+            self.bytes += len(message)
+            # The sequence number follows the version and flag bytes (see game.wire).
+            (seq,) = struct.unpack_from("<I", message, 2)
+        else:
+            self.bytes += len(json.dumps(message, separators=(",", ":")))
+            seq = message.get("seq")
+        # Ack like the real client so the server keeps sending small deltas.
+        await self.sio.emit("state_ack", {"seq": seq})
+
+    async def run(self, duration: float, action_interval: float) -> None:
+        start = time.perf_counter()
+        await self.sio.connect(self.url, transports=["websocket"])
+        await self.sio.emit(
+            "join_game",
+            {"username": f"Bot {self.index}", "arena": self.arena, "encodings": [self.encoding]},
+        )
+        await self.joined.wait()
+        self.join_latency = time.perf_counter() - start
+
+        deadline = start + duration
+        while time.perf_counter() < deadline:
+            for event, data in self.bot.decide(self.alive):
+                if data is None:
+                    await self.sio.emit(event)
+                else:
+                    await self.sio.emit(event, data)
+            await asyncio.sleep(action_interval)
+        await self.sio.disconnect()
+
+
+async def run(args) -> dict:
+    clients = [
+        LoadClient(i, args.url, args.encoding, args.arena, args.seed + i)
+        for i in range(args.clients)
+    ]
+    started = time.perf_counter()
+    # Stagger connections slightly so the server isn't hit by one burst.
+    tasks = []
+    for client in clients:
+        tasks.append(asyncio.ensure_future(client.run(args.duration, args.action_interval)))
+        await asyncio.sleep(args.ramp / max(1, args.clients))
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    failures = [repr(o) for o in outcomes if isinstance(o, BaseException)]
+    ok = [c for c, o in zip(clients, outcomes) if not isinstance(o, BaseException)]
+    arrivals = [gap for c in ok for gap in c.arrivals]
+    return {
+        "url": args.url,
+        "clients": args.clients,
+        "connected": len(ok),
+        "failures": failures[:10],
+        "encoding": args.encoding,
+        "duration_s": elapsed,
+        "join_latency": summarize([c.join_latency for c in ok if c.join_latency is not None]),
+        "update_interval": summarize(arrivals),
+        "updates_per_client_s": sum(c.updates for c in ok) / max(1, len(ok)) / args.duration,
+        "bytes_per_client_s": sum(c.bytes for c in ok) / max(1, len(ok)) / args.duration,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds each client plays")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which clients connect")
+    parser.add_argument("--action-interval", type=float, default=0.2, help="seconds between bot decisions")
+    parser.add_argument("--encoding", choices=("binary", "json"), default="binary")
+    parser.add_argument("--arena", help="put every client in this arena (default: auto-assign)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print(
+        "%d/%d clients  update interval p50 %.1f ms p99 %.1f ms  %.0f B/s per client"
+        % (
+            result["connected"],
+            result["clients"],
+            result["update_interval"]["p50_ms"],
+            result["update_interval"]["p99_ms"],
+            result["bytes_per_client_s"],
+        )
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}, "result": result}, f, indent=2)
+    return 0 if not result["failures"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
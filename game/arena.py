@@ -0,0 +1,596 @@
+"""
+Arenas: independent matches, each with its own GameEngine.
+
+An ``Arena`` owns one world plus everything needed to talk to its players
+(delta streams, wire codec, negotiated encodings). Its methods never touch
+sockets; they return ``Outbound`` messages that the server relays, so the
+same arena code can run behind Flask-SocketIO or anywhere else.
+
+``ArenaManager`` routes players into named or automatically assigned arenas,
+tears arenas down when their last player leaves, and steps all arenas from a
+single loop that spreads them over ARENA_TICK_SLOTS slots per tick interval.
+
+Given a ``state_dir``, every arena journals its world there (see
+``game.persistence``) and a new manager restores the arenas it finds. A
+restored sub waits RECONNECT_GRACE seconds for its player to rejoin with
+the session token they were given in ``joined``. Given a ``replay_dir``,
+every arena records its inputs there for replay (see ``game.replay``).
+
+Each tick's output is coalesced into one emit per recipient: a player's
+events (hits, sonar results, ...) travel with their state update as a
+single ``tick_events`` bundle, ``{"events": [[event, payload], ...],
+"state": update or None}``, and messages to the same room share one emit,
+which Socket.IO serializes once and fans out to every member. A lone event
+with no state update is sent as itself. Join and leave announcements are
+queued on the arena and go out with its next tick.
+"""
+import itertools
+import os
+import re
+import secrets
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from .constants import ARENA_CAPACITY, ARENA_NAME_MAX_LENGTH, ARENA_TICK_SLOTS, RECONNECT_GRACE
+from .engine import GameEngine, WORLD_CONFIG
+from .metrics import METRICS
+from .persistence import JOURNAL_SUFFIX, WorldJournal, dump_world, load_world
+from .replay import Recorder
+from .protocol import DeltaEncoder
+from .wire import WireCodec, PLAYER_STREAM, negotiate
+
+
+class Outbound(NamedTuple):
+    """A Socket.IO emit for the server to perform."""
+
+    event: str
+    payload: object
+    to: Optional[str] = None  # sid or room; None broadcasts to everyone
+    skip_sid: Optional[str] = None
+
+
+def bundle(messages: List[Outbound], updates: Dict[str, object]) -> List[Outbound]:
+    """
+    Coalesces a tick's ``messages`` and per-player state ``updates`` into one
+    emit per (recipient, skipped sid).
+    """
+    groups: Dict[Tuple[Optional[str], Optional[str]], list] = {}
+    for message in messages:
+        groups.setdefault((message.to, message.skip_sid), []).append(
+            [message.event, message.payload]
+        )
+    out = []
+    for (to, skip_sid), events in groups.items():
+        state = updates.pop(to, None) if skip_sid is None else None
+        if len(events) == 1 and state is None:
+            out.append(Outbound(events[0][0], events[0][1], to, skip_sid))
+        else:
+            out.append(Outbound("tick_events", {"events": events, "state": state}, to, skip_sid))
+    for sid, state in updates.items():
+        out.append(Outbound("state_update", state, sid))
+    return out
+
+
+def unbundle(messages: List[Outbound]) -> List[Outbound]:
+    """Expands ``tick_events`` bundles back into the messages they carry."""
+    out = []
+    for message in messages:
+        if message.event != "tick_events":
+            out.append(message)
+            continue
+        for event, payload in message.payload["events"]:
+            out.append(Outbound(event, payload, message.to, message.skip_sid))
+        if message.payload["state"] is not None:
+            out.append(Outbound("state_update", message.payload["state"], message.to))
+    return out
+
+
+# Arena names come from clients and become Socket.IO rooms, file names and
+# metric labels, so only short names from a plain character set are accepted.
+ARENA_NAME = re.compile(r"[A-Za-z0-9_-]{1,%d}" % ARENA_NAME_MAX_LENGTH)
+
+
+def valid_arena_name(name) -> bool:
+    return isinstance(name, str) and ARENA_NAME.fullmatch(name) is not None
+
+
+def reject_arena_name(sid: str) -> Outbound:
+    message = f"Arena names are 1 to {ARENA_NAME_MAX_LENGTH} letters, digits, '-' or '_'."
+    return Outbound("join_rejected", {"message": message}, sid)
+
+
+def journal_path(state_dir: str, arena_name: str) -> str:
+    # Arena names come from clients, so they are escaped into a safe file name.
+    return os.path.join(state_dir, quote(arena_name, safe="") + JOURNAL_SUFFIX)
+
+
+def replay_path(replay_dir: str, arena_name: str) -> str:
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(replay_dir, f"{quote(arena_name, safe='')}-{stamp}.replay")
+
+
+class Arena:
+    def __init__(
+        self,
+        name: str,
+        backend: str = "object",
+        state_dir: Optional[str] = None,
+        replay_dir: Optional[str] = None,
+    ):
+        self.name = name
+        self.room = f"arena:{name}"
+        self.engine = GameEngine(backend=backend)
+        # Tick slot assigned by the ArenaManager.
+        self.slot = 0
+        # Delta-compressed state stream per player, diffed against that
+        # player's last ack. Each carries only the player's area of interest.
+        self.player_streams: Dict[str, DeltaEncoder] = {}
+        # Binary wire format: entity handles and the negotiated encoding per sid.
+        self.wire_codec = WireCodec()
+        self.encodings: Dict[str, str] = {}
+        # Session tokens by sid, and restored subs awaiting their player:
+        # token -> (sid the sub was saved under, reconnect deadline).
+        self.tokens: Dict[str, str] = {}
+        self.detached: Dict[str, Tuple[str, float]] = {}
+        # Announcements to the room (joins, leaves) wait here for the next
+        # tick, which coalesces them with that tick's other output.
+        self.outbox: List[Outbound] = []
+        self.journal: Optional[WorldJournal] = None
+        if state_dir:
+            path = journal_path(state_dir, name)
+            state = WorldJournal.load(path)
+            if state:
+                self.restore(state)
+            self.journal = WorldJournal(path)
+        # Recording starts after any restore, from the restored world.
+        self.recorder: Optional[Recorder] = None
+        if replay_dir:
+            self.recorder = Recorder(self.engine, replay_path(replay_dir, name))
+
+    def __len__(self) -> int:
+        return len(self.engine.submarines)
+
+    def encoding_room(self, encoding: str) -> str:
+        """Players split by wire encoding, so arena-wide emits encode once per format."""
+        return f"{self.room}:{encoding}"
+
+    def rooms_for(self, sid: str) -> List[str]:
+        return [self.room, self.encoding_room(self.encodings.get(sid, "json"))]
+
+    def _encode(self, encoding: Optional[str], schema, message):
+        if encoding == "binary":
+            return self.wire_codec.encode_stream(schema, message)
+        return message
+
+    # -- persistence -----------------------------------------------------------
+    def restore(self, state: dict) -> None:
+        """Loads a journaled world; its subs wait for their players to reconnect."""
+        deadline = time.time() + RECONNECT_GRACE
+        for sid, token in load_world(self.engine, state).items():
+            self.detached[token] = (sid, deadline)
+            self.tokens[sid] = token
+        for sid, sub in self.engine.submarines.items():
+            self.wire_codec.register_sub(sid, sub.username)
+
+    def close(self, remove: bool = False) -> None:
+        """
+        Flushes the journal and any recording; ``remove`` deletes the journal
+        because the match is over.
+        """
+        if self.journal:
+            if not remove:
+                self.journal.record(dump_world(self.engine, self.tokens))
+            self.journal.close(remove)
+            self.journal = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    # -- membership ----------------------------------------------------------
+    def join(
+        self, sid: str, username: str, encodings=None, token: Optional[str] = None
+    ) -> List[Outbound]:
+        encoding = negotiate(encodings)
+        claim = self.detached.pop(token, None) if token else None
+        if claim:
+            # A player from before a restart takes their sub back.
+            old_sid = claim[0]
+            sub = self.engine.rebind_player(old_sid, sid)
+            username = sub.username
+            self.tokens.pop(old_sid, None)
+            self.wire_codec.release_sub(old_sid)
+        else:
+            self.engine.add_player(sid, username)
+            token = secrets.token_urlsafe(16)
+        self.tokens[sid] = token
+        self.player_streams[sid] = DeltaEncoder()
+        self.encodings[sid] = encoding
+
+        out = []
+        names = self.wire_codec.register_sub(sid, username)
+        out.append(Outbound("entity_names", names, self.encoding_room("binary"), sid))
+        if encoding == "binary":
+            out.append(Outbound("entity_names", dict(self.wire_codec.names), sid))
+        out.append(
+            Outbound(
+                "joined",
+                {
+                    "id": sid,
+                    "username": username,
+                    "encoding": encoding,
+                    "arena": self.name,
+                    "token": token,
+                },
+                sid,
+            )
+        )
+        out.append(Outbound("world_config", WORLD_CONFIG, sid))
+        self.outbox.append(
+            Outbound(
+                "system_message",
+                {"message": f"{username} has {'rejoined' if claim else 'joined'} the hunt."},
+                self.room,
+                sid,
+            )
+        )
+        return out
+
+    def leave(self, sid: str) -> List[Outbound]:
+        sub = self.engine.remove_player(sid)
+        self.player_streams.pop(sid, None)
+        self.encodings.pop(sid, None)
+        self.tokens.pop(sid, None)
+        self.wire_codec.release_sub(sid)
+        if sub:
+            self.outbox.append(
+                Outbound(
+                    "system_message",
+                    {"message": f"{sub.username} has left the hunt."},
+                    self.room,
+                    sid,
+                )
+            )
+        return []
+
+    # -- protocol --------------------------------------------------------------
+    def ack_state(self, sid: str, seq) -> None:
+        stream = self.player_streams.get(sid)
+        if stream and isinstance(seq, int):
+            stream.ack(seq)
+
+    def request_keyframe(self, sid: str, stream: Optional[str]) -> List[Outbound]:
+        if sid in self.player_streams:
+            self.player_streams[sid].reset()
+        return []
+
+    # -- player commands -----------------------------------------------------
+    # Inputs are buffered by the engine and take effect on the next tick;
+    # their results (sonar_result, torpedo_fired, ...) are sent from tick().
+    def _queue(self, sid: str, kind: str, data=None, rejection: str = "") -> List[Outbound]:
+        try:
+            if self.engine.queue_command(sid, kind, data) or not rejection:
+                return []
+        except ValueError as exc:
+            rejection = f"Orders not understood: {exc}."
+        return [Outbound("command_rejected", {"command": kind, "message": rejection}, sid)]
+
+    def update_controls(self, sid: str, data: dict) -> List[Outbound]:
+        return self._queue(sid, "controls", data)
+
+    def sonar_ping(self, sid: str) -> List[Outbound]:
+        return self._queue(sid, "ping", rejection="Sonar is still recharging.")
+
+    def fire_torpedo(self, sid: str, data: Optional[dict] = None) -> List[Outbound]:
+        # Only the view tick is kept, for lag compensation.
+        tick = data.get("tick") if isinstance(data, dict) else None
+        stamp = {"tick": tick} if isinstance(tick, int) else None
+        return self._queue(sid, "fire", stamp, rejection="Torpedo tubes are reloading.")
+
+    def request_respawn(self, sid: str) -> List[Outbound]:
+        return self._queue(sid, "respawn")
+
+    def _sonar_result(self, sid: str, result: dict) -> List[Outbound]:
+        # Send results to the pinger
+        if self.encodings.get(sid) == "binary":
+            payload = self.wire_codec.encode_sonar_result(result["contacts"])
+        else:
+            payload = {"contacts": result["contacts"]}
+        out = [Outbound("sonar_result", payload, sid)]
+
+        # Notify those who were pinged
+        for detection in result.get("detected_by", ()):
+            target = detection["target_id"]
+            if self.encodings.get(target) == "binary":
+                payload = self.wire_codec.encode_ping_detected(
+                    detection["pinger_id"], detection["dist"]
+                )
+            else:
+                payload = {
+                    "pinging_id": detection["pinger_id"],
+                    "pinging_username": detection["pinger_name"],
+                    "approx_distance": detection["dist"],
+                }
+            out.append(Outbound("sonar_ping_detected", payload, target))
+        return out
+
+    def _respawn_result(self, sid: str, ok: bool) -> List[Outbound]:
+        if not ok:
+            return [
+                Outbound(
+                    "respawn_not_ready",
+                    {"message": "Hold tight, the crew is still preparing a new sub."},
+                    sid,
+                )
+            ]
+        sub = self.engine.get_player(sid)
+        return [
+            Outbound(
+                "system_message",
+                {"message": f"{sub.username} has re-entered the hunt."},
+                self.room,
+                sid,
+            ),
+            # The state update loop will pick up the new position and send it
+            # But we can also send a confirmation message
+            Outbound(
+                "respawn_confirmed",
+                {"message": "You are back in the fight.", "x": sub.x, "y": sub.y},
+                sid,
+            ),
+        ]
+
+    # -- simulation ------------------------------------------------------------
+    def hit_audience(self, event: dict) -> List[str]:
+        """The attacker, the victim and every player in range of the wreck."""
+        audience = {event["victim_id"]}
+        if event["attacker_id"] in self.engine.submarines:
+            audience.add(event["attacker_id"])
+        victim = self.engine.get_player(event["victim_id"])
+        if victim:
+            audience.update(self.engine.players_near(victim.x, victim.y))
+        return sorted(audience)
+
+    def tick(self) -> List[Outbound]:
+        """Advances the world and returns this frame's events and state updates."""
+        # Restored subs whose players never came back are retired.
+        now = time.time()
+        for token, (sid, deadline) in list(self.detached.items()):
+            if now >= deadline:
+                del self.detached[token]
+                self.leave(sid)
+        out, self.outbox = self.outbox, []
+        for event in self.engine.update():
+            if event["type"] == "torpedo_fired":
+                out.append(Outbound("torpedo_fired", {"id": event["torpedo_id"]}, event["sid"]))
+            elif event["type"] == "sonar_ping":
+                out.extend(self._sonar_result(event["sid"], event))
+            elif event["type"] == "respawn":
+                out.extend(self._respawn_result(event["sid"], event["ok"]))
+            elif event["type"] == "respawn_ready":
+                out.append(
+                    Outbound(
+                        "respawn_ready",
+                        {"message": "You may respawn when ready."},
+                        event["sid"],
+                    )
+                )
+            elif event["type"] == "hit":
+                # Only players who could perceive the hit hear about it.
+                payload = {
+                    "victim_id": event["victim_id"],
+                    "victim_username": event["victim_name"],
+                    "attacker_username": event["attacker_name"],
+                }
+                for sid in self.hit_audience(event):
+                    out.append(Outbound("sub_hit", payload, sid))
+                out.append(
+                    Outbound(
+                        "hit_confirmed",
+                        {
+                            "victim_id": event["victim_id"],
+                            "victim_username": event["victim_name"],
+                        },
+                        event["attacker_id"],
+                    )
+                )
+                out.append(
+                    Outbound(
+                        "you_were_hit",
+                        {
+                            "by_username": event["attacker_name"],
+                            "respawn_available_at": event["respawn_at"],
+                        },
+                        event["victim_id"],
+                    )
+                )
+
+        # Send each player a patch of their personal, interest-filtered state.
+        # Building the states (including the sensor pass) and encoding them
+        # are timed separately.
+        self.wire_codec.sync_torpedoes(t.id for t in self.engine.torpedoes)
+        updates = {}
+        build = encode = 0.0
+        for sid in list(self.engine.submarines.keys()):
+            stream = self.player_streams.get(sid)
+            start = time.perf_counter()
+            state = self.engine.get_personal_state(sid)
+            middle = time.perf_counter()
+            build += middle - start
+            if stream and state:
+                message = self._encode(
+                    self.encodings.get(sid), PLAYER_STREAM, stream.encode(state, self.engine.tick)
+                )
+                encode += time.perf_counter() - middle
+                updates[sid] = message
+        METRICS.observe("phase_seconds", build, phase="state")
+        METRICS.observe("phase_seconds", encode, phase="serialization")
+        METRICS.set("players", len(self.engine.submarines), arena=self.name)
+        METRICS.set("torpedoes", len(self.engine.torpedoes), arena=self.name)
+        if self.journal and self.journal.due():
+            self.journal.record(dump_world(self.engine, self.tokens))
+        return bundle(out, updates)
+
+
+class ArenaManager:
+    def __init__(
+        self,
+        capacity: int = ARENA_CAPACITY,
+        slots: int = ARENA_TICK_SLOTS,
+        backend: str = "object",
+        state_dir: Optional[str] = None,
+        replay_dir: Optional[str] = None,
+    ):
+        self.capacity = capacity
+        self.slots = slots
+        self.backend = backend
+        self.state_dir = state_dir
+        self.replay_dir = replay_dir
+        self.arenas: Dict[str, Arena] = {}
+        self.player_arena: Dict[str, str] = {}
+        # Session token -> arena, for players reconnecting to a restored sub.
+        self.sessions: Dict[str, str] = {}
+        self.current_slot = 0
+        self._auto_names = (f"auto-{n}" for n in itertools.count(1))
+        if replay_dir:
+            os.makedirs(replay_dir, exist_ok=True)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+            for filename in sorted(os.listdir(state_dir)):
+                if filename.endswith(JOURNAL_SUFFIX):
+                    self._restore(unquote(filename[: -len(JOURNAL_SUFFIX)]))
+
+    def arena_for(self, sid: str) -> Optional[Arena]:
+        name = self.player_arena.get(sid)
+        return self.arenas.get(name) if name else None
+
+    def dispatch(self, sid: str, event: str, data=None) -> List[Outbound]:
+        """Runs a joined player's Socket.IO event against their arena."""
+        arena = self.arena_for(sid)
+        if not arena:
+            return []
+        if not isinstance(data, dict):
+            data = {}
+        if event == "state_ack":
+            arena.ack_state(sid, data.get("seq"))
+            return []
+        if event == "request_keyframe":
+            return arena.request_keyframe(sid, data.get("stream"))
+        if event == "update_controls":
+            return arena.update_controls(sid, data)
+        if event == "sonar_ping":
+            return arena.sonar_ping(sid)
+        if event == "fire_torpedo":
+            return arena.fire_torpedo(sid, data)
+        if event == "request_respawn":
+            return arena.request_respawn(sid)
+        raise ValueError(f"Unknown player event {event!r}")
+
+    def _new_arena(self, name: str):
+        return Arena(
+            name, backend=self.backend, state_dir=self.state_dir, replay_dir=self.replay_dir
+        )
+
+    def _restore(self, name: str) -> None:
+        arena = self._create(name)
+        for token in arena.detached:
+            self.sessions[token] = name
+        if not len(arena):
+            self._discard(arena)
+
+    def _claim(self, name: str) -> bool:
+        """Whether this manager may open arena ``name`` (see game.cluster)."""
+        return True
+
+    def _discard(self, arena) -> None:
+        del self.arenas[arena.name]
+        if self.state_dir or self.replay_dir:
+            arena.close(remove=True)
+            self.sessions = {t: n for t, n in self.sessions.items() if n != arena.name}
+        METRICS.remove("players", arena=arena.name)
+        METRICS.remove("torpedoes", arena=arena.name)
+
+    def _create(self, name: str):
+        arena = self._new_arena(name)
+        # Put the arena in the least busy tick slot so work spreads evenly
+        # across the tick interval.
+        load = [0] * self.slots
+        for other in self.arenas.values():
+            load[other.slot] += 1
+        arena.slot = load.index(min(load))
+        self.arenas[name] = arena
+        return arena
+
+    def _pick_arena(self, name: Optional[str]) -> Arena:
+        if name:
+            return self.arenas.get(name) or self._create(name)
+        # Fill the busiest auto arena that still has room, so matches are
+        # populated before a new one is opened.
+        open_arenas = [
+            a for a in self.arenas.values() if a.name.startswith("auto-") and len(a) < self.capacity
+        ]
+        if open_arenas:
+            return max(open_arenas, key=len)
+        while True:
+            auto_name = next(self._auto_names)
+            if auto_name not in self.arenas and self._claim(auto_name):
+                return self._create(auto_name)
+
+    def join(
+        self,
+        sid: str,
+        username: str,
+        arena_name: Optional[str] = None,
+        encodings=None,
+        token: Optional[str] = None,
+    ):
+        """
+        Routes a player into an arena. A ``token`` matching a restored sub
+        sends the player back to it. Returns (arena, outbound messages); the
+        arena is None when ``arena_name`` is not a valid name.
+        """
+        out = self.leave(sid)
+        if arena_name and not valid_arena_name(arena_name):
+            out.append(reject_arena_name(sid))
+            return None, out
+        if token in self.sessions and self.sessions[token] in self.arenas:
+            arena_name = self.sessions.pop(token)
+        arena = self._pick_arena(arena_name)
+        self.player_arena[sid] = arena.name
+        out.extend(arena.join(sid, username, encodings, token))
+        return arena, out
+
+    def leave(self, sid: str) -> List[Outbound]:
+        arena = self.arena_for(sid)
+        self.player_arena.pop(sid, None)
+        if not arena:
+            return []
+        out = arena.leave(sid)
+        if not len(arena):
+            self._discard(arena)
+        return out
+
+    def announce(self, message: str) -> List[Outbound]:
+        """A system message to every connected player, in every arena."""
+        return [Outbound("system_message", {"message": message})]
+
+    def tick(self) -> List[Outbound]:
+        """Steps the arenas in the current slot, then moves to the next slot."""
+        out = []
+        for arena in list(self.arenas.values()):
+            if arena.slot == self.current_slot:
+                out.extend(arena.tick())
+                # Restored arenas empty out when their players never return.
+                if not len(arena):
+                    self._discard(arena)
+        self.current_slot = (self.current_slot + 1) % self.slots
+        return out
+
+    def close(self) -> None:
+        """Flushes every arena's journal (on shutdown), keeping the files."""
+        for arena in self.arenas.values():
+            arena.close()
+
+    @property
+    def dropped_steps(self) -> int:
+        return sum(arena.engine.dropped_steps for arena in self.arenas.values())
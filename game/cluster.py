@@ -0,0 +1,360 @@
+"""
+Multi-node arenas.
+
+Each server process (a node) runs a ``ClusterManager``: an ArenaManager
+that only simulates the arenas it owns. Ownership lives in a shared
+``Directory`` that maps arena names to nodes and node ids to public URLs.
+A player joining an arena owned by another node is sent a ``redirect``
+(URL and arena name) instead of being joined, and the client reconnects
+there; automatically assigned arenas are opened on whichever node the
+player reached, so capacity grows with the number of nodes behind the load
+balancer.
+
+Nodes heartbeat into the directory every NODE_HEARTBEAT_INTERVAL seconds;
+the arenas of a node silent for NODE_TIMEOUT go to the next node that
+claims them (with its journal, if the state directory is shared).
+
+Messages meant for every player (``Outbound.to is None``, such as the
+announcements from ``ArenaManager.announce``) are published on a
+``MessageBus`` and relayed by every node from its next tick. Directories
+and buses come in three reaches: ``LocalDirectory``/``LocalBus`` for nodes
+sharing a process (tests), ``FileDirectory``/``FileBus`` for nodes sharing
+a host or filesystem, and ``RedisBus`` (Redis pub/sub, needs the ``redis``
+package) for nodes on separate hosts.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from .arena import ArenaManager, Outbound, valid_arena_name
+from .constants import NODE_HEARTBEAT_INTERVAL, NODE_TIMEOUT
+
+
+class Directory:
+    """
+    Arena -> node and node -> URL mapping shared by every node. Subclasses
+    provide ``_transaction``, which yields the state dict
+    ``{"nodes": {node: {"url", "seen"}}, "arenas": {arena: node}}`` under a
+    lock and persists any changes made to it.
+    """
+
+    def __init__(self, timeout: float = NODE_TIMEOUT, clock: Callable[[], float] = time.time):
+        self.timeout = timeout
+        self.clock = clock
+
+    def _transaction(self):
+        raise NotImplementedError
+
+    def _live(self, state: dict, node: Optional[str]) -> bool:
+        info = state["nodes"].get(node)
+        return bool(info) and self.clock() - info["seen"] < self.timeout
+
+    def register(self, node: str, url: str) -> None:
+        """Announces a node, or refreshes its heartbeat."""
+        with self._transaction() as state:
+            state["nodes"][node] = {"url": url, "seen": self.clock()}
+
+    def unregister(self, node: str) -> None:
+        """Removes a node that is shutting down, releasing its arenas."""
+        with self._transaction() as state:
+            state["nodes"].pop(node, None)
+            state["arenas"] = {a: n for a, n in state["arenas"].items() if n != node}
+
+    def claim(self, arena: str, node: str) -> str:
+        """
+        Makes ``node`` the owner of ``arena`` unless a live node already owns
+        it. Returns the owner either way.
+        """
+        with self._transaction() as state:
+            owner = state["arenas"].get(arena)
+            if owner != node and not self._live(state, owner):
+                state["arenas"][arena] = owner = node
+            return owner
+
+    def release(self, arena: str, node: str) -> None:
+        with self._transaction() as state:
+            if state["arenas"].get(arena) == node:
+                del state["arenas"][arena]
+
+    def owner(self, arena: str) -> Optional[str]:
+        with self._transaction() as state:
+            owner = state["arenas"].get(arena)
+            return owner if self._live(state, owner) else None
+
+    def url(self, node: str) -> Optional[str]:
+        with self._transaction() as state:
+            info = state["nodes"].get(node)
+            return info["url"] if info else None
+
+
+class LocalDirectory(Directory):
+    """In-memory directory for nodes in one process."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._state = {"nodes": {}, "arenas": {}}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            yield self._state
+
+
+class FileDirectory(Directory):
+    """
+    Directory kept in a JSON file, for nodes on one host or a shared
+    filesystem. Every operation takes an exclusive ``flock`` on a sidecar
+    lock file and rewrites the file atomically.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path) as f:
+                        state = json.load(f)
+                except (OSError, ValueError):
+                    state = {"nodes": {}, "arenas": {}}
+                before = json.dumps(state, sort_keys=True)
+                yield state
+                if json.dumps(state, sort_keys=True) != before:
+                    tmp = self.path + ".tmp"
+                    with open(tmp, "w") as f:
+                        json.dump(state, f)
+                    os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class MessageBus:
+    """
+    Delivers published messages (JSON-serializable dicts) to every
+    subscriber, on every node. Subclasses provide ``publish`` and, unless
+    they deliver on their own, ``poll``, which nodes call every tick.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[dict], None]] = []
+
+    def publish(self, message: dict) -> None:
+        raise NotImplementedError
+
+    def poll(self) -> None:
+        """Delivers the messages published since the last poll."""
+
+    def subscribe(self, callback: Callable[[dict], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[dict], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def close(self) -> None:
+        pass
+
+    def _deliver(self, message: dict) -> None:
+        for callback in list(self._subscribers):
+            callback(message)
+
+
+class LocalBus(MessageBus):
+    """In-process bus; delivers synchronously to the nodes sharing it."""
+
+    def publish(self, message: dict) -> None:
+        self._deliver(message)
+
+
+class FileBus(MessageBus):
+    """
+    Bus kept in an append-only JSON-lines file, for nodes on one host or a
+    shared filesystem. Publishers append under an exclusive ``flock``; each
+    bus reads the lines added since its last poll, starting from the end of
+    the file as it was when the bus was created. The file is never
+    truncated, so it suits occasional messages (announcements), not
+    per-tick traffic.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a") as f:
+            self._offset = f.tell()
+
+    def publish(self, message: dict) -> None:
+        line = json.dumps(message, separators=(",", ":")) + "\n"
+        with open(self.path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def poll(self) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Only whole lines; a publisher may be mid-write.
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        for line in data[:end].splitlines():
+            self._deliver(json.loads(line))
+
+
+class RedisBus(MessageBus):
+    """Bus over a Redis pub/sub channel, for nodes on separate hosts."""
+
+    def __init__(self, url: str, channel: str = "uboat:cluster"):
+        super().__init__()
+        import redis
+
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+
+    def publish(self, message: dict) -> None:
+        self._client.publish(self.channel, json.dumps(message, separators=(",", ":")))
+
+    def poll(self) -> None:
+        while True:
+            item = self._pubsub.get_message()
+            if item is None:
+                return
+            self._deliver(json.loads(item["data"]))
+
+    def close(self) -> None:
+        self._pubsub.close()
+        self._client.close()
+
+
+def make_bus(spec: str) -> MessageBus:
+    """A ``redis://`` (or ``rediss://``) URL makes a RedisBus; anything else is a FileBus path."""
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisBus(spec)
+    return FileBus(spec)
+
+
+class ClusterManager(ArenaManager):
+    """
+    An ArenaManager for one node of a cluster. ``join`` returns
+    ``(None, messages)`` when the player was redirected to another node.
+    """
+
+    def __init__(
+        self,
+        node_id: str,
+        url: str,
+        directory: Directory,
+        bus: Optional[MessageBus] = None,
+        **kwargs,
+    ):
+        # Set before the base class restores journaled arenas, which claims them.
+        self.node_id = node_id
+        self.url = url
+        self.directory = directory
+        self.bus = bus or LocalBus()
+        self._inbox = deque()
+        self._next_heartbeat = 0.0
+        self._heartbeat()
+        self.bus.subscribe(self._inbox.append)
+        super().__init__(**kwargs)
+
+    def _heartbeat(self) -> None:
+        now = time.time()
+        if now >= self._next_heartbeat:
+            self.directory.register(self.node_id, self.url)
+            self._next_heartbeat = now + NODE_HEARTBEAT_INTERVAL
+
+    def _claim(self, name: str) -> bool:
+        return self.directory.claim(name, self.node_id) == self.node_id
+
+    def _restore(self, name: str) -> None:
+        # Another live node took the arena over while we were down; its
+        # journal here is stale.
+        if self._claim(name):
+            super()._restore(name)
+
+    def _discard(self, arena) -> None:
+        super()._discard(arena)
+        self.directory.release(arena.name, self.node_id)
+
+    def _publish(self, messages: List[Outbound]) -> List[Outbound]:
+        """Sends messages for every player through the bus; returns the rest."""
+        local = []
+        for message in messages:
+            if message.to is None:
+                self.bus.publish({"event": message.event, "payload": message.payload})
+            else:
+                local.append(message)
+        return local
+
+    def announce(self, message: str) -> List[Outbound]:
+        """Sends a system message to every player on every node, from their next tick."""
+        return self._publish(super().announce(message))
+
+    def join(
+        self,
+        sid: str,
+        username: str,
+        arena_name: Optional[str] = None,
+        encodings=None,
+        token: Optional[str] = None,
+    ):
+        # Restored subs are routed by token in the base class.
+        if (
+            valid_arena_name(arena_name)
+            and token not in self.sessions
+            and arena_name not in self.arenas
+            and not self._claim(arena_name)
+        ):
+            out = self.leave(sid)
+            owner = self.directory.owner(arena_name)
+            out.append(
+                Outbound(
+                    "redirect",
+                    {"url": self.directory.url(owner), "arena": arena_name, "token": token},
+                    sid,
+                )
+            )
+            return None, out
+        arena, out = super().join(sid, username, arena_name, encodings, token)
+        return arena, self._publish(out)
+
+    def leave(self, sid: str) -> List[Outbound]:
+        return self._publish(super().leave(sid))
+
+    def dispatch(self, sid: str, event: str, data=None) -> List[Outbound]:
+        return self._publish(super().dispatch(sid, event, data))
+
+    def tick(self) -> List[Outbound]:
+        self._heartbeat()
+        out = self._publish(super().tick())
+        self.bus.poll()
+        while self._inbox:
+            message = self._inbox.popleft()
+            out.append(Outbound(message["event"], message["payload"]))
+        return out
+
+    def close(self) -> None:
+        super().close()
+        self.bus.unsubscribe(self._inbox.append)
+        self.bus.close()
+        self.directory.unregister(self.node_id)
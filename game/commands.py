@@ -0,0 +1,103 @@
+import math
+import threading
+from typing import List, Optional, Tuple
+
+from .constants import FIRE_COOLDOWN, SONAR_PING_COOLDOWN, MAX_PENDING_COMMANDS
+
+# Commands a player can queue, in the order the engine understands them.
+COMMANDS = ("controls", "fire", "ping", "respawn")
+
+# "tick" is the client's view of the world when it sent the command (see
+# GameEngine._view_tick).
+CONTROL_FIELDS = ("heading", "speed", "depth", "tick")
+
+# Minimum seconds between accepted commands of a kind.
+COOLDOWNS = {"fire": FIRE_COOLDOWN, "ping": SONAR_PING_COOLDOWN}
+
+
+def parse_controls(data) -> dict:
+    """
+    The control fields set in ``data``, as numbers (``tick`` as an int).
+    Raises ValueError for anything else, so a malformed payload is turned
+    away when it arrives rather than failing the tick that applies it.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("controls must be an object")
+    controls = {}
+    for field in CONTROL_FIELDS:
+        value = data.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            raise ValueError(f"{field} must be a number")
+        if field == "tick":
+            if not isinstance(value, int):
+                raise ValueError("tick must be an integer")
+            controls[field] = value
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be a number") from None
+        if not math.isfinite(number):
+            raise ValueError(f"{field} must be finite")
+        controls[field] = number
+    return controls
+
+
+class CommandBuffer:
+    """
+    One player's inputs waiting for the next ``GameEngine.update()``.
+
+    Consecutive control updates collapse into one (later fields win), fire
+    and ping are limited by their cooldowns, at most one respawn request is
+    pending, and the buffer holds at most MAX_PENDING_COMMANDS entries.
+    Anything over a limit is rejected at ``push`` so spamming costs nothing
+    beyond the check, and control values are checked there too (see
+    ``parse_controls``).
+
+    Server threads push while the game loop drains, so both hold a lock;
+    a command is either in a drained batch or left for the next one.
+    """
+
+    def __init__(self):
+        self.pending: List[Tuple[str, Optional[dict]]] = []
+        self.last_accepted = {kind: float("-inf") for kind in COOLDOWNS}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def push(self, kind: str, data: Optional[dict], now: float) -> bool:
+        """
+        Queues a command; returns False if it was rate limited. Raises
+        ValueError for an unknown command or malformed controls.
+        """
+        if kind not in COMMANDS:
+            raise ValueError(f"Unknown command {kind!r}")
+        if kind == "controls":
+            data = parse_controls(data)
+        with self._lock:
+            return self._push(kind, data, now)
+
+    def _push(self, kind: str, data: Optional[dict], now: float) -> bool:
+        if kind == "controls":
+            if self.pending and self.pending[-1][0] == "controls":
+                self.pending[-1][1].update(data)
+                return True
+        elif kind in COOLDOWNS:
+            if now - self.last_accepted[kind] < COOLDOWNS[kind]:
+                return False
+        elif any(k == kind for k, _ in self.pending):
+            return False
+        if len(self.pending) >= MAX_PENDING_COMMANDS:
+            return False
+        if kind in COOLDOWNS:
+            self.last_accepted[kind] = now
+        self.pending.append((kind, data))
+        return True
+
+    def drain(self) -> List[Tuple[str, Optional[dict]]]:
+        with self._lock:
+            pending, self.pending = self.pending, []
+        return pending
@@ -1,16 +1,49 @@
 # Game tuning constants
 WORLD_SIZE = 2000.0
 MAX_DEPTH = 300.0
-TICK_RATE = 5  # updates per second
+TICK_RATE = 5  # state broadcasts per second
+SIM_RATE = 20  # fixed simulation steps per second
+MAX_CATCHUP_STEPS = 8  # most simulation steps run for one update(); the rest is dropped
 TORPEDO_SPEED = 30.0  # world units per second
 SUB_MAX_SPEED = 20.0  # world units per second
 SONAR_RANGE = 500.0
+SONAR_CONTACT_WINDOW = 5.0  # seconds an active ping reveals contacts (both ways)
 PASSIVE_SONAR_RANGE = 750.0
 PASSIVE_SONAR_NOISE_BEARING = 15.0
 PASSIVE_SONAR_NOISE_DISTANCE = 0.2
 HIT_RADIUS = 12.0  # cylindrical radius of the submarine hull
 RESPAWN_TIME = 10.0
 
+# Spatial indexing
+SPATIAL_CELL_SIZE = 125.0  # world units per grid cell (WORLD_SIZE should be a multiple)
+
+# Player input limits
+FIRE_COOLDOWN = 1.0  # seconds between torpedo launches
+SONAR_PING_COOLDOWN = 2.0  # seconds between active sonar pings
+MAX_PENDING_COMMANDS = 8  # queued inputs per player between updates
+
+# Lag compensation
+MAX_LAG_COMPENSATION = 0.5  # seconds a shot may be rewound to the world its captain saw
+POSE_HISTORY_TICKS = int(MAX_LAG_COMPENSATION * SIM_RATE) + 1  # sub poses kept per sub
+
+# Interest management: what each player is sent about the world
+INTEREST_RANGE = PASSIVE_SONAR_RANGE  # entities inside this range enter a player's view
+INTEREST_EXIT_RANGE = INTEREST_RANGE + 100.0  # ...and leave only beyond this one (hysteresis)
+
+# Arenas
+ARENA_CAPACITY = 16  # players per auto-assigned arena before a new one opens
+ARENA_TICK_SLOTS = 4  # arenas are staggered over this many slots per tick interval
+ARENA_NAME_MAX_LENGTH = 32  # characters in a client-chosen arena name
+
+# Persistence
+JOURNAL_INTERVAL = 10  # arena ticks between journal records
+JOURNAL_SNAPSHOT_INTERVAL = 300  # journal records between full snapshots
+RECONNECT_GRACE = 120.0  # seconds a restored sub waits for its player to reconnect
+
+# Cluster
+NODE_HEARTBEAT_INTERVAL = 5.0  # seconds between a node's directory heartbeats
+NODE_TIMEOUT = 15.0  # a node silent this long loses its arenas to whoever claims them
+
 # Movement modelling
 MAX_TURN_RATE = 25.0  # degrees per second
 MAX_ACCELERATION = 20.0  # speed change per second
@@ -0,0 +1,43 @@
+"""
+Per-world simulation context.
+
+A ``SimContext`` bundles the clock and random source of one GameEngine and
+is shared by that engine's models. Nothing in the simulation reads
+``time.time()`` or the global ``random`` module directly, so engines on
+manual clocks run as fast as the CPU allows, and engines with the same
+seed and inputs produce the same world, even many at once in one process
+or across a process pool.
+"""
+import json
+import random
+import time
+from typing import Callable, Optional
+
+
+class SimContext:
+    __slots__ = ("seed", "clock", "rng")
+
+    def __init__(self, seed: Optional[int] = None, clock: Callable[[], float] = time.time):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.clock = clock
+        # Spawn positions and headings.
+        self.rng = random.Random(self.seed)
+
+    def now(self) -> float:
+        return self.clock()
+
+    def rng_state(self) -> str:
+        """Where ``rng`` is in its stream, as a string (see game.persistence)."""
+        version, internal, gauss = self.rng.getstate()
+        return json.dumps([version, internal, gauss], separators=(",", ":"))
+
+    def set_rng_state(self, state: str) -> None:
+        version, internal, gauss = json.loads(state)
+        self.rng.setstate((version, tuple(internal), gauss))
+
+    def sensor_rng(self, tick: int) -> random.Random:
+        """
+        Passive-sonar noise for one tick. Seeded by (seed, tick) rather than
+        drawn from ``rng``, so how often contacts are read never changes spawns.
+        """
+        return random.Random(f"{self.seed}:{tick}")
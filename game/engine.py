@@ -1,132 +1,647 @@
-import math
 import time
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 from .constants import (
     WORLD_SIZE,
     MAX_DEPTH,
     SONAR_RANGE,
+    SONAR_CONTACT_WINDOW,
     PASSIVE_SONAR_RANGE,
-    PASSIVE_SONAR_NOISE_BEARING,
-    PASSIVE_SONAR_NOISE_DISTANCE,
     SUB_MAX_SPEED,
-    RESPAWN_TIME,
+    HIT_RADIUS,
+    SUB_LENGTH,
+    SIM_RATE,
+    TICK_RATE,
+    MAX_CATCHUP_STEPS,
+    TORPEDO_SPEED,
+    INTEREST_RANGE,
+    INTEREST_EXIT_RANGE,
+    MAX_LAG_COMPENSATION,
 )
-import random
-from .models import Submarine, Torpedo
-from .physics import torpedo_hits_sub
+from .commands import CommandBuffer
+from .context import SimContext
+from .history import PoseHistory
+from .metrics import METRICS
+from .models import Submarine, Torpedo, TorpedoPool
+from .physics import torpedo_sweep_hits_sub, wrap_delta
+from .sensors import Contact, sense
+from .spatial import SpatialHash
+from .timers import TimerQueue
+
+# Any torpedo within this horizontal radius of a sub's centre may touch its hull.
+HIT_QUERY_RADIUS = HIT_RADIUS + SUB_LENGTH / 2.0
+
+# Submarine.to_dict fields copied back verbatim when a sub is restored.
+RESTORED_SUB_FIELDS = (
+    "depth",
+    "heading",
+    "speed",
+    "target_heading",
+    "target_speed",
+    "target_depth",
+    "alive",
+    "last_sonar_ping",
+    "respawn_at",
+    "respawn_ready",
+)
+
+# Simulation backends selectable when constructing a GameEngine.
+BACKENDS = ("object", "numpy")
+
+# Static world parameters. These never change during a session, so clients
+# receive them once (on join) rather than in every state update.
+WORLD_CONFIG = {
+    "world_size": WORLD_SIZE,
+    "max_depth": MAX_DEPTH,
+    "sonar_range": SONAR_RANGE,
+    "passive_sonar_range": PASSIVE_SONAR_RANGE,
+    "sub_max_speed": SUB_MAX_SPEED,
+    "torpedo_speed": TORPEDO_SPEED,
+    # Snapshots are stamped with the simulation tick; clients convert ticks
+    # to time with sim_rate and size their interpolation buffer by tick_rate.
+    "sim_rate": SIM_RATE,
+    "tick_rate": TICK_RATE,
+}
 
 
 class GameEngine:
-    def __init__(self):
+    def __init__(
+        self,
+        backend: str = "object",
+        sim_rate: int = SIM_RATE,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown engine backend {backend!r}; expected one of {BACKENDS}")
+        self.backend = backend
+        # Every timestamp (launches, hits, respawns, cooldowns) and random
+        # draw comes from this context, shared with the models, so a seeded
+        # world re-simulates exactly (see game.replay).
+        self.ctx = SimContext(seed, clock)
+        # The numpy backend keeps sub and torpedo state in arrays (the models
+        # are views onto them) and steps and hit-tests them in batches; the
+        # object backend steps each model on its own.
+        self.vector = None
+        if backend == "numpy":
+            from .vectorized import VectorizedBackend
+
+            self.vector = VectorizedBackend(self.ctx)
         self.submarines: Dict[str, Submarine] = {}
-        self.torpedoes: List[Torpedo] = []
-        self.last_tick = time.time()
+        # Living subs that may still move. A sub at rest on its ordered
+        # heading and depth is settled and dropped from this set until its
+        # controls change or it respawns; sunk subs wait on a respawn timer,
+        # so neither is touched by a step.
+        self.active: Dict[str, Submarine] = {}
+        # Respawns, torpedo expiry and sonar contact windows fire from here
+        # (see game.timers) instead of being polled every step.
+        self.timers = TimerQueue()
+        # Expiry timer of each torpedo in flight, cancelled if it hits first.
+        self.expiry_timers: Dict[int, list] = {}
+        # Subs whose active ping is still revealing contacts.
+        self.pinging: Set[str] = set()
+        # Torpedoes in flight live in a recycling pool; ``torpedoes`` is its
+        # active list, changed in place (never reassigned).
+        self.torpedo_pool = self.vector.torpedo_pool if self.vector else TorpedoPool(self.ctx)
+        self.torpedoes: List[Torpedo] = self.torpedo_pool.active
+        self.last_tick = clock()
+        # Fixed-timestep accumulator: wall time is banked and consumed in
+        # whole steps of sim_dt, so physics never sees a variable dt.
+        self.sim_dt = 1.0 / sim_rate
+        # Lag compensation: commands carry the tick of the world their player
+        # was looking at. Shots are judged against that world, at most
+        # max_rewind ticks back, using each sub's recent poses.
+        self.max_rewind = int(MAX_LAG_COMPENSATION * sim_rate)
+        self.history: Dict[str, PoseHistory] = {}
+        self.view_lag: Dict[str, int] = {}
+        self.accumulator = 0.0
+        self.dropped_steps = 0
+        # Simulation step counter.
+        self.tick = 0
+        # Serialized torpedoes, built when first sent in a tick and shared by
+        # every player who sees them that tick (see torpedo_dict).
+        self._torpedo_dicts: Dict[int, dict] = {}
+        self._torpedo_dicts_tick = -1
+        # Torpedo ids currently in each player's area of interest.
+        self.interests: Dict[str, Set[str]] = {}
+        # Player inputs, applied at the start of the next update().
+        self.commands: Dict[str, CommandBuffer] = {}
+        # Optional game.replay.Recorder logging every input as it is applied.
+        self.recorder = None
+        self._sensors: Dict[str, List[Contact]] = {}
+        self._sensors_key = None
+        # Spatial indexes over living subs and in-flight torpedoes. Entities
+        # keep their own bucket current as they move (see models.Positioned).
+        self.sub_index = SpatialHash()
+        self.torpedo_index = SpatialHash()
 
     def add_player(self, sid: str, username: str) -> Submarine:
-        sub = Submarine(sid, username)
+        if self.recorder:
+            self.recorder.join(sid, username)
+        if self.vector:
+            sub = self.vector.add_submarine(sid, username)
+        else:
+            sub = Submarine(sid, username, self.ctx)
         self.submarines[sid] = sub
+        self.active[sid] = sub
+        self.interests[sid] = set()
+        self.commands[sid] = CommandBuffer()
+        self.history[sid] = PoseHistory(self.max_rewind + 1)
+        self._track(self.sub_index, sub)
         return sub
 
     def remove_player(self, sid: str) -> Optional[Submarine]:
-        return self.submarines.pop(sid, None)
+        if self.recorder:
+            self.recorder.leave(sid)
+        sub = self.submarines.pop(sid, None)
+        self.active.pop(sid, None)
+        self.interests.pop(sid, None)
+        self.commands.pop(sid, None)
+        self.history.pop(sid, None)
+        self.view_lag.pop(sid, None)
+        self.pinging.discard(sid)
+        if sub:
+            self._untrack(self.sub_index, sub)
+            if self.vector:
+                self.vector.remove_submarine(sub)
+        return sub
+
+    def restore_player(self, data: dict) -> Submarine:
+        """Re-adds a sub from its ``Submarine.to_dict`` form (see game.persistence)."""
+        sub = self.add_player(data["id"], data["username"])
+        sub.place(data["x"], data["y"])
+        for field in RESTORED_SUB_FIELDS:
+            setattr(sub, field, data[field])
+        if not sub.alive:
+            self._untrack(self.sub_index, sub)
+            self.active.pop(sub.id, None)
+            self._schedule_respawn(sub)
+        self._schedule_ping_window(sub, sub.last_sonar_ping, self.ctx.now())
+        return sub
+
+    def restore_torpedo(self, data: dict) -> Torpedo:
+        """Re-launches a torpedo from its ``Torpedo.to_dict`` form, keeping its id and timers."""
+        torp = self.torpedo_pool.spawn(
+            data["owner"], data["x"], data["y"], data["depth"], data["heading"], data["id"]
+        )
+        torp.created_at = data["created_at"]
+        torp.expires_at = data["expires_at"]
+        self._track(self.torpedo_index, torp)
+        self._schedule_expiry(torp)
+        return torp
+
+    def rebind_player(self, old_sid: str, new_sid: str) -> Optional[Submarine]:
+        """Hands a sub (and its torpedoes) to a reconnected player's new sid."""
+        if self.recorder:
+            self.recorder.rebind(old_sid, new_sid)
+        sub = self.submarines.pop(old_sid, None)
+        if not sub:
+            return None
+        tracked = sub.index is not None
+        if tracked:
+            self._untrack(self.sub_index, sub)
+        sub.id = new_sid
+        self.submarines[new_sid] = sub
+        if self.active.pop(old_sid, None):
+            self.active[new_sid] = sub
+        if tracked:
+            self._track(self.sub_index, sub)
+        self.interests[new_sid] = self.interests.pop(old_sid, set())
+        self.commands[new_sid] = self.commands.pop(old_sid, None) or CommandBuffer()
+        self.history[new_sid] = self.history.pop(old_sid, None) or PoseHistory(self.max_rewind + 1)
+        if old_sid in self.view_lag:
+            self.view_lag[new_sid] = self.view_lag.pop(old_sid)
+        if old_sid in self.pinging:
+            self.pinging.discard(old_sid)
+            self.pinging.add(new_sid)
+        for torp in self.torpedoes:
+            if torp.owner_id == old_sid:
+                torp.owner_id = new_sid
+        self._torpedo_dicts_tick = -1
+        return sub
+
+    @staticmethod
+    def _track(index: SpatialHash, entity) -> None:
+        entity.index = index
+        index.insert(entity.id, entity)
+
+    @staticmethod
+    def _untrack(index: SpatialHash, entity) -> None:
+        entity.index = None
+        index.remove(entity.id)
+
+    def subs_near(self, x: float, y: float, radius: float) -> List[Submarine]:
+        """Living subs within ``radius`` (horizontal, wrapped) of (x, y)."""
+        if self.vector:
+            return self.vector.subs_near(x, y, radius)
+        return self.sub_index.query(x, y, radius)
+
+    def torpedoes_near(self, x: float, y: float, radius: float) -> List[Torpedo]:
+        """Torpedoes within ``radius`` (horizontal, wrapped) of (x, y)."""
+        if self.vector:
+            return self.vector.torpedoes_near(x, y, radius)
+        return self.torpedo_index.query(x, y, radius)
+
+    def players_near(self, x: float, y: float, radius: float = INTEREST_EXIT_RANGE) -> List[str]:
+        """Sids of living subs that can perceive (x, y); defaults to the interest range."""
+        return [sub.id for sub in self.subs_near(x, y, radius)]
+
+    def torpedoes_of_interest(self, sid: str) -> List[Torpedo]:
+        """
+        Torpedoes in a player's area of interest. A torpedo enters the area
+        within INTEREST_RANGE of the sub (or its wreck) and leaves it only
+        beyond INTEREST_EXIT_RANGE, so entries don't flicker at the boundary.
+        """
+        sub = self.submarines.get(sid)
+        if not sub:
+            return []
+        seen = self.interests[sid]
+        visible = []
+        for torp in self.torpedoes_near(sub.x, sub.y, INTEREST_EXIT_RANGE):
+            if torp.id in seen:
+                visible.append(torp)
+                continue
+            dx = wrap_delta(torp.x - sub.x)
+            dy = wrap_delta(torp.y - sub.y)
+            if dx * dx + dy * dy <= INTEREST_RANGE * INTEREST_RANGE:
+                visible.append(torp)
+        self.interests[sid] = {t.id for t in visible}
+        return visible
+
+    def sensor_contacts(self, sid: str) -> List[Contact]:
+        """
+        Every sub within PASSIVE_SONAR_RANGE of ``sid``, with true and noisy
+        range and bearing. The pass covers all players at once and is reused
+        until the next tick or until any sub moves, appears or disappears.
+        """
+        key = (self.tick, self.sub_index.version)
+        if self._sensors_key != key:
+            rng = self.ctx.sensor_rng(self.tick)
+            with METRICS.time("phase_seconds", phase="sensor_pass"):
+                self._sensors = sense(self.submarines.values(), self.sub_index, rng)
+            self._sensors_key = key
+        return self._sensors.get(sid, [])
 
     def get_player(self, sid: str) -> Optional[Submarine]:
         return self.submarines.get(sid)
 
+    def queue_command(self, sid: str, kind: str, data: Optional[dict] = None) -> bool:
+        """
+        Buffers a player input ("controls", "fire", "ping" or "respawn") for
+        the next update(). Returns False if it was rate limited or dropped;
+        raises ValueError for malformed controls (see CommandBuffer.push).
+        """
+        buffer = self.commands.get(sid)
+        if buffer is None:
+            return False
+        return buffer.push(kind, data, self.ctx.now())
+
+    def drain_commands(self) -> List[Tuple[str, str, Optional[dict]]]:
+        """
+        Takes every buffered input as (sid, kind, data), player by player (in
+        join order) and each player's in the order they arrived.
+        """
+        return [
+            (sid, kind, data)
+            for sid, buffer in list(self.commands.items())
+            for kind, data in buffer.drain()
+        ]
+
+    def apply_commands(
+        self,
+        now: Optional[float] = None,
+        commands: Optional[List[Tuple[str, str, Optional[dict]]]] = None,
+    ) -> List[dict]:
+        """
+        Applies ``commands`` (default: every buffered input, see
+        drain_commands); returns their results as events.
+        """
+        now = self.ctx.now() if now is None else now
+        if commands is None:
+            commands = self.drain_commands()
+        events = []
+        for sid, kind, data in commands:
+            tick = data.get("tick") if data else None
+            if kind == "controls":
+                self._view_tick(sid, tick)
+                self.update_controls(sid, data)
+            elif kind == "fire":
+                hits = []
+                torp_id = self.fire_torpedo(sid, now, tick, hits)
+                if torp_id:
+                    events.append({"type": "torpedo_fired", "sid": sid, "torpedo_id": torp_id})
+                    events.extend(hits)
+            elif kind == "ping":
+                result = self.perform_sonar_ping(sid, now)
+                events.append({"type": "sonar_ping", "sid": sid, **result})
+            elif kind == "respawn":
+                events.append(
+                    {"type": "respawn", "sid": sid, "ok": self.request_respawn(sid, now)}
+                )
+        return events
+
     def update_controls(self, sid: str, data: dict):
         sub = self.submarines.get(sid)
         if sub and sub.alive:
             sub.set_controls(
                 data.get("heading"), data.get("speed"), data.get("depth")
             )
+            self.wake(sid)
 
-    def fire_torpedo(self, sid: str) -> Optional[str]:
+    def wake(self, sid: str) -> None:
+        """
+        Puts a living sub back into the simulated set. Call it after changing
+        a sub's controls or position other than through the engine.
+        """
         sub = self.submarines.get(sid)
         if sub and sub.alive:
-            torp = Torpedo(sid, sub.x, sub.y, sub.depth, sub.heading)
-            self.torpedoes.append(torp)
-            return torp.id
+            self.active[sid] = sub
+
+    # -- timers ----------------------------------------------------------------
+    # Subjects carry what the timer was set for; a timer whose subject has
+    # since changed (a sunk sub, a newer ping) is ignored when it fires.
+    def _schedule_respawn(self, sub: Submarine) -> None:
+        if sub.respawn_at is not None and not sub.respawn_ready:
+            self.timers.schedule(sub.respawn_at, "respawn_ready", sub)
+
+    def _schedule_expiry(self, torp: Torpedo) -> None:
+        self.expiry_timers[torp.id] = self.timers.schedule(torp.expires_at, "torpedo_expiry", torp)
+
+    def _schedule_ping_window(self, sub: Submarine, pinged_at: float, now: float) -> None:
+        if now - pinged_at <= SONAR_CONTACT_WINDOW:
+            self.pinging.add(sub.id)
+            self.timers.schedule(pinged_at + SONAR_CONTACT_WINDOW, "ping_window", (sub, pinged_at))
+
+    def _fire_timers(self, now: float, events: List[dict]) -> None:
+        for kind, subject in self.timers.due(now):
+            if kind == "respawn_ready":
+                sub = subject
+                if self.submarines.get(sub.id) is sub and not sub.alive and not sub.respawn_ready:
+                    sub.respawn_ready = True
+                    events.append({"type": "respawn_ready", "sid": sub.id})
+            elif kind == "torpedo_expiry":
+                self._retire_torpedo(subject)
+            elif kind == "ping_window":
+                sub, pinged_at = subject
+                if sub.last_sonar_ping == pinged_at:
+                    self.pinging.discard(sub.id)
+
+    def _view_tick(self, sid: str, tick=None) -> int:
+        """
+        The tick a player's command is judged at. A stamped command updates
+        the player's view lag (capped at max_rewind); unstamped ones reuse it.
+        """
+        if isinstance(tick, int) and not isinstance(tick, bool) and tick <= self.tick:
+            self.view_lag[sid] = min(self.tick - tick, self.max_rewind)
+        return self.tick - self.view_lag.get(sid, 0)
+
+    def fire_torpedo(
+        self,
+        sid: str,
+        now: Optional[float] = None,
+        tick: Optional[int] = None,
+        hits: Optional[List[dict]] = None,
+    ) -> Optional[int]:
+        """
+        Launches a torpedo from where the shooter was in the world they saw
+        (``tick``, see _view_tick), then runs it forward to the present
+        against the other subs' past poses. Hits scored on the way are
+        appended to ``hits``.
+        """
+        sub = self.submarines.get(sid)
+        if not sub or not sub.alive:
+            return None
+        now = self.ctx.now() if now is None else now
+        start = self._view_tick(sid, tick)
+        pose = self.history[sid].at(start) if start < self.tick else None
+        if pose is None:
+            start = self.tick
+            pose = (sub.x, sub.y, sub.depth, sub.heading)
+        x, y, depth, heading = pose
+        torp = self.torpedo_pool.spawn(
+            sid, x, y, depth, heading, now=now - (self.tick - start) * self.sim_dt
+        )
+        self._track(self.torpedo_index, torp)
+        self._schedule_expiry(torp)
+        if start < self.tick:
+            METRICS.observe("rewind_seconds", (self.tick - start) * self.sim_dt)
+            hit = self._catch_up(torp, start, now)
+            if hit and hits is not None:
+                hits.append(hit)
+        return torp.id
+
+    def _catch_up(self, torp: Torpedo, start: int, now: float) -> Optional[dict]:
+        """
+        Steps a torpedo launched at tick ``start`` up to the current tick,
+        sweeping each step against where the other subs were at that tick.
+        Returns the hit event if it struck a sub (and retires the torpedo).
+        """
+        dt = self.sim_dt
+        # Subs may have moved since the rewound tick; widen the query to cover it.
+        radius = HIT_QUERY_RADIUS + (TORPEDO_SPEED + SUB_MAX_SPEED * (self.tick - start)) * dt
+        for tick in range(start + 1, self.tick + 1):
+            torp.update(dt)
+            for sub in self.sub_index.query(torp.x, torp.y, radius):
+                if sub.id == torp.owner_id:
+                    continue
+                history = self.history[sub.id]
+                pose = history.at(tick)
+                if pose is None:
+                    continue
+                before = history.at(tick - 1) or pose
+                if torpedo_sweep_hits_sub(
+                    torp.prev_x, torp.prev_y, torp.x, torp.y, torp.depth,
+                    before[0], before[1], pose[0], pose[1], pose[2], pose[3],
+                ):
+                    event = self._sink(sub, torp, now)
+                    self._retire_torpedo(torp)
+                    return event
         return None
 
-    def request_respawn(self, sid: str) -> bool:
+    def request_respawn(self, sid: str, now: Optional[float] = None) -> bool:
         sub = self.submarines.get(sid)
         if not sub or sub.alive:
             return False
         
-        now = time.time()
+        now = self.ctx.now() if now is None else now
         if sub.respawn_at and now >= sub.respawn_at:
             sub.respawn()
+            # Poses from the previous life must not be rewound to.
+            self.history[sid].clear()
+            self._track(self.sub_index, sub)
+            self.active[sid] = sub
             return True
         return False
 
-    def update(self) -> List[dict]:
+    def update(self, elapsed: Optional[float] = None) -> List[dict]:
         """
-        Updates game state. Returns a list of events (e.g. hits) to be broadcasted.
+        Updates game state by the wall time elapsed since the previous call (or
+        by ``elapsed`` seconds), in fixed steps of ``sim_dt``. At most
+        MAX_CATCHUP_STEPS run per call; time beyond that is dropped and counted
+        in ``dropped_steps``. Queued player commands are applied first. Returns a
+        list of events (e.g. hits) to be broadcasted.
         """
-        now = time.time()
-        dt = now - self.last_tick
+        now = self.ctx.now()
+        if elapsed is None:
+            elapsed = now - self.last_tick
         self.last_tick = now
+        # Inputs are logged as the batch this update applies, so a command
+        # queued while it runs is recorded with the update that applies it.
+        commands = self.drain_commands()
+        if self.recorder:
+            self.recorder.update(now, elapsed, commands)
+        self.accumulator += max(0.0, elapsed)
+        events = self.apply_commands(now, commands)
+
+        # The epsilon keeps float residue (0.0499999...) from losing a step.
+        steps = int(self.accumulator / self.sim_dt + 1e-9)
+        if steps > MAX_CATCHUP_STEPS:
+            dropped = steps - MAX_CATCHUP_STEPS
+            self.dropped_steps += dropped
+            self.accumulator -= dropped * self.sim_dt
+            steps = MAX_CATCHUP_STEPS
+
+        for _ in range(steps):
+            self.accumulator -= self.sim_dt
+            events.extend(self.step(self.sim_dt, now - self.accumulator))
+        METRICS.inc("sim_steps_total", steps)
+        METRICS.inc("events_total", len(events))
+        return events
+
+    def step(self, dt: float, now: float) -> List[dict]:
+        """Advances the simulation by ``dt`` seconds, ending at time ``now``."""
+        self.tick += 1
         events = []
+        awake = list(self.active.values())
+
+        # Update submarines; settled ones are asleep and skipped.
+        with METRICS.time("phase_seconds", phase="sub_physics"):
+            if self.vector:
+                self.vector.step_submarines(awake, dt, self.sub_index)
+            else:
+                for sub in awake:
+                    sub.update(dt)
 
-        # Update submarines
-        for sub in self.submarines.values():
-            sub.update(dt)
-            # Check respawn ready
-            if (
-                not sub.alive
-                and sub.respawn_at
-                and now >= sub.respawn_at
-                and not sub.respawn_ready
-            ):
-                sub.respawn_ready = True
-                events.append({"type": "respawn_ready", "sid": sub.id})
+        # Respawns come due, torpedoes run out and ping windows close.
+        self._fire_timers(now, events)
 
         # Update torpedoes
-        surviving_torps = []
-        for torp in self.torpedoes:
-            torp.update(dt)
-            if torp.is_expired(now):
+        with METRICS.time("phase_seconds", phase="torpedo_physics"):
+            if self.vector:
+                self.vector.step_torpedoes(dt, self.torpedo_index)
+            else:
+                for torp in self.torpedoes:
+                    torp.update(dt)
+
+        # Resolve hits in torpedo order; a sub sunk earlier in the pass (or a
+        # torpedo that already detonated) is skipped. Detonated torpedoes are
+        # retired after the pass, since retiring reorders the active list.
+        spent = {}
+        collision_start = time.perf_counter()
+        for torp, sub in self._hit_candidates(self.torpedoes, list(self.submarines.values()), dt):
+            if torp.id in spent or not sub.alive:
                 continue
+            spent[torp.id] = torp
+            events.append(self._sink(sub, torp, now))
+
+        for torp in spent.values():
+            self._retire_torpedo(torp)
+        METRICS.observe("phase_seconds", time.perf_counter() - collision_start, phase="collision")
+
+        # Record the poses of subs that moved, for lag-compensated shots (see
+        # fire_torpedo), and put those that came to rest to sleep. A sleeping
+        # sub's last move is over, so its swept path collapses to a point.
+        history = self.history
+        for sub in awake:
+            if not sub.alive:  # sunk this step, see _sink
+                continue
+            history[sub.id].record(self.tick, sub.x, sub.y, sub.depth, sub.heading)
+            if sub.settled():
+                sub.prev_x = sub.x
+                sub.prev_y = sub.y
+                del self.active[sub.id]
+        return events
+
+    def _sink(self, sub: Submarine, torp: Torpedo, now: float) -> dict:
+        """Sinks ``sub`` with ``torp``; returns the hit event."""
+        sub.take_hit(now)
+        self._untrack(self.sub_index, sub)
+        self.active.pop(sub.id, None)
+        self._schedule_respawn(sub)
+        attacker = self.submarines.get(torp.owner_id)
+        return {
+            "type": "hit",
+            "victim_id": sub.id,
+            "victim_name": sub.username,
+            "attacker_id": torp.owner_id,
+            "attacker_name": attacker.username if attacker else "Unknown",
+            "respawn_at": sub.respawn_at,
+        }
+
+    def _retire_torpedo(self, torp: Torpedo) -> None:
+        timer = self.expiry_timers.pop(torp.id, None)
+        if timer:
+            self.timers.cancel(timer)
+        self._untrack(self.torpedo_index, torp)
+        self.torpedo_pool.release(torp)
 
-            hit = False
-            for sub in self.submarines.values():
+    def _hit_candidates(
+        self, torps: List[Torpedo], subs: List[Submarine], dt: float
+    ) -> Iterable[Tuple[Torpedo, Submarine]]:
+        """
+        Yields (torpedo, sub) pairs whose paths met during the last step,
+        ordered by torpedo. Uses a swept test so nothing tunnels through a hull.
+        """
+        # Both the torpedo and the sub may have travelled during the step.
+        radius = HIT_QUERY_RADIUS + (TORPEDO_SPEED + SUB_MAX_SPEED) * dt
+        if self.vector:
+            yield from self.vector.hit_pairs(self.sub_index, radius)
+            return
+
+        for torp in torps:
+            for sub in self.sub_index.query(torp.x, torp.y, radius):
                 if not sub.alive or sub.id == torp.owner_id:
                     continue
-
-                if torpedo_hits_sub(
-                    torp.x, torp.y, torp.depth, sub.x, sub.y, sub.depth, sub.heading
+                if torpedo_sweep_hits_sub(
+                    torp.prev_x, torp.prev_y, torp.x, torp.y, torp.depth,
+                    sub.prev_x, sub.prev_y, sub.x, sub.y, sub.depth, sub.heading,
                 ):
-                    sub.take_hit()
-                    attacker = self.submarines.get(torp.owner_id)
-                    attacker_name = attacker.username if attacker else "Unknown"
-                    
-                    events.append(
-                        {
-                            "type": "hit",
-                            "victim_id": sub.id,
-                            "victim_name": sub.username,
-                            "attacker_id": torp.owner_id,
-                            "attacker_name": attacker_name,
-                            "respawn_at": sub.respawn_at,
-                        }
-                    )
-                    hit = True
-                    break
-            
-            if not hit:
-                surviving_torps.append(torp)
-        
-        self.torpedoes = surviving_torps
-        return events
+                    yield torp, sub
 
     def get_state(self, sid: str) -> dict:
+        """
+        Full state for one player: the personal envelope merged with the world
+        config. The server sends the config once on join; this combined view
+        is kept for tools and tests.
+        """
+        personal = self.get_personal_state(sid)
+        if not personal:
+            return {}
+        return {**personal, **WORLD_CONFIG}
+
+    def torpedo_dict(self, torp: Torpedo) -> dict:
+        """
+        ``torp.to_dict()``, built the first time the torpedo is sent in a tick
+        and reused for every other player who sees it; callers must treat it
+        as read-only.
+        """
+        if self._torpedo_dicts_tick != self.tick:
+            self._torpedo_dicts.clear()
+            self._torpedo_dicts_tick = self.tick
+        data = self._torpedo_dicts.get(torp.id)
+        if data is None:
+            data = self._torpedo_dicts[torp.id] = torp.to_dict()
+        return data
+
+    def get_personal_state(self, sid: str) -> dict:
+        """
+        The per-player envelope: own sub, active and passive contacts, and the
+        torpedoes in the player's area of interest.
+        """
         sub = self.submarines.get(sid)
         if not sub:
             return {}
 
-        now = time.time()
-        
         # Build "you" state
         if sub.alive:
             you = {
@@ -148,106 +663,58 @@ class GameEngine:
                 "respawn_ready": sub.respawn_ready,
             }
 
-        # Build sonar contacts
+        # Active and passive contacts both come from the shared sensor pass.
         contacts = []
-        if sub.alive:
-            for other in self.submarines.values():
-                if other.id == sid or not other.alive:
-                    continue
-                
-                dx = other.x - sub.x
-                dy = other.y - sub.y
-                dz = other.depth - sub.depth
-                dist = math.sqrt(dx * dx + dy * dy + dz * dz)
-                
-                if dist <= SONAR_RANGE:
-                    recent_ping = (now - sub.last_sonar_ping <= 5.0) or (
-                        now - other.last_sonar_ping <= 5.0
-                    )
-                    if recent_ping:
-                        contacts.append({
-                            "id": other.id,
-                            "username": other.username,
-                            "x": other.x,
-                            "y": other.y,
-                            "depth": other.depth,
-                        })
-
-        # Build passive sonar contacts
         passive_contacts = []
-        if sub.alive:
-            for other in self.submarines.values():
-                if other.id == sid or not other.alive:
-                    continue
-                
-                dx = other.x - sub.x
-                dy = other.y - sub.y
-                dz = other.depth - sub.depth
-                dist = math.sqrt(dx * dx + dy * dy + dz * dz)
-                
-                if dist <= PASSIVE_SONAR_RANGE:
-                    # Calculate true bearing
-                    true_bearing = (math.degrees(math.atan2(dx, -dy)) + 360.0) % 360.0
-                    
-                    # Apply noise
-                    bearing_noise = random.uniform(-PASSIVE_SONAR_NOISE_BEARING, PASSIVE_SONAR_NOISE_BEARING)
-                    dist_noise_factor = random.uniform(1.0 - PASSIVE_SONAR_NOISE_DISTANCE, 1.0 + PASSIVE_SONAR_NOISE_DISTANCE)
-                    
-                    noisy_bearing = (true_bearing + bearing_noise + 360.0) % 360.0
-                    noisy_dist = dist * dist_noise_factor
-                    
-                    passive_contacts.append({
-                        "id": other.id, # Identifying info might be too much, but useful for client tracking if needed. 
-                                        # For strict realism, maybe hide ID, but for game feel, knowing who it *might* be is okay?
-                                        # Let's keep ID for now so client can track blips, but maybe UI shouldn't show name?
-                                        # Re-reading request: "identify another sub... spot a sub". 
-                                        # Let's include username but maybe UI can choose to hide it or show it with uncertainty.
+        for contact in self.sensor_contacts(sid):
+            other = contact.sub
+            if contact.distance <= SONAR_RANGE:
+                if sid in self.pinging or other.id in self.pinging:
+                    contacts.append({
+                        "id": other.id,
                         "username": other.username,
-                        "distance": round(noisy_dist, 1),
-                        "bearing": round(noisy_bearing, 1),
-                        "depth": round(other.depth, 1), # Maybe depth should be noisy too? Plan didn't specify, keeping accurate for now or maybe just don't send it?
-                                                        # Plan said "reduced accuracy". Let's send it for now.
+                        "x": other.x,
+                        "y": other.y,
+                        "depth": other.depth,
                     })
 
+            passive_contacts.append({
+                "id": other.id,
+                "username": other.username,
+                "distance": round(contact.noisy_distance, 1),
+                "bearing": round(contact.noisy_bearing, 1),
+                "depth": round(other.depth, 1),
+            })
+
+        torpedoes = [self.torpedo_dict(t) for t in self.torpedoes_of_interest(sid)]
+
         return {
             "you": you,
-            "torpedoes": [t.to_dict() for t in self.torpedoes],
             "sonar_contacts": contacts,
             "passive_contacts": passive_contacts,
-            "world_size": WORLD_SIZE,
-            "max_depth": MAX_DEPTH,
-            "sonar_range": SONAR_RANGE,
-            "passive_sonar_range": PASSIVE_SONAR_RANGE,
-            "sub_max_speed": SUB_MAX_SPEED,
+            "torpedoes": torpedoes,
         }
 
-    def perform_sonar_ping(self, sid: str) -> dict:
+    def perform_sonar_ping(self, sid: str, now: Optional[float] = None) -> dict:
         sub = self.submarines.get(sid)
         if not sub or not sub.alive:
             return {"contacts": []}
         
-        now = time.time()
+        now = self.ctx.now() if now is None else now
         sub.last_sonar_ping = now
+        self._schedule_ping_window(sub, now, now)
         
         contacts = []
         pings_detected = []
 
-        for other in self.submarines.values():
-            if other.id == sid or not other.alive:
-                continue
-            
-            dx = other.x - sub.x
-            dy = other.y - sub.y
-            dz = other.depth - sub.depth
-            dist = math.sqrt(dx * dx + dy * dy + dz * dz)
-            
+        for contact in self.sensor_contacts(sid):
+            other, dist = contact.sub, contact.distance
             if dist <= SONAR_RANGE:
-                bearing = (math.degrees(math.atan2(dx, -dy)) + 360.0) % 360.0
                 contacts.append({
                     "id": other.id,
                     "username": other.username,
                     "distance": round(dist, 1),
-                    "bearing": round(bearing, 1),
+                    "bearing": round(contact.bearing, 1),
                     "depth": round(other.depth, 1),
                 })
                 pings_detected.append({
@@ -0,0 +1,73 @@
+"""
+Recent sub poses, for lag-compensated hit validation.
+
+Each living sub's pose (x, y, depth, heading) is recorded after every
+simulation step into a fixed-size ring of POSE_HISTORY_TICKS entries, so
+the engine can see where everyone was in the (slightly older) world a
+captain was looking at when they fired. Poses live in flat ``array``
+buffers rather than per-tick objects, so the history costs a constant 40
+bytes per sub per kept tick and allocates nothing as it turns over.
+
+Sleeping subs (see GameEngine.active) stop recording, but hold their last
+pose, so the ring behaves as if they had recorded it every tick: queries
+past the latest record return it, and the first record after a gap fills
+the skipped ticks still kept with it.
+"""
+from array import array
+from typing import Optional, Tuple
+
+from .constants import POSE_HISTORY_TICKS
+
+Pose = Tuple[float, float, float, float]  # x, y, depth, heading
+
+_FIELDS = 4
+
+
+class PoseHistory:
+    __slots__ = ("capacity", "_ticks", "_poses", "_last")
+
+    def __init__(self, capacity: int = POSE_HISTORY_TICKS):
+        self.capacity = capacity
+        # Tick each slot was written at; -1 marks a slot never written.
+        self._ticks = array("q", [-1]) * capacity
+        self._poses = array("d", [0.0]) * (capacity * _FIELDS)
+        # Latest tick recorded, -1 if none.
+        self._last = -1
+
+    def _write(self, tick: int, x: float, y: float, depth: float, heading: float) -> None:
+        slot = tick % self.capacity
+        self._ticks[slot] = tick
+        base = slot * _FIELDS
+        poses = self._poses
+        poses[base] = x
+        poses[base + 1] = y
+        poses[base + 2] = depth
+        poses[base + 3] = heading
+
+    def record(self, tick: int, x: float, y: float, depth: float, heading: float) -> None:
+        last = self._last
+        if last >= 0 and tick > last + 1:
+            # The sub slept since ``last``, holding that pose.
+            held = self.at(last)
+            for skipped in range(max(last + 1, tick - self.capacity + 1), tick):
+                self._write(skipped, *held)
+        self._write(tick, x, y, depth, heading)
+        self._last = max(last, tick)
+
+    def clear(self) -> None:
+        self._ticks = array("q", [-1]) * self.capacity
+        self._last = -1
+
+    def at(self, tick: int) -> Optional[Pose]:
+        """
+        The pose at ``tick``; ticks after the latest record get that (resting)
+        pose. None if nothing that old is still kept.
+        """
+        if tick < 0 or self._last < 0:
+            return None
+        tick = min(tick, self._last)
+        slot = tick % self.capacity
+        if self._ticks[slot] != tick:
+            return None
+        base = slot * _FIELDS
+        return tuple(self._poses[base : base + _FIELDS])
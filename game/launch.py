@@ -0,0 +1,53 @@
+"""
+Arena manager selection for the server entry points (app.py, server_async.py).
+
+The manager is configured through the environment:
+
+    ARENA_WORKERS      simulate arenas in this many worker processes; this
+                       process only routes commands and relays their output
+                       (see game.workers)
+    STATE_DIR          journal arena worlds there and restore them on
+                       startup; players rejoin their subs with a session
+                       token (see game.persistence)
+    REPLAY_DIR         record every arena's inputs there (see game.replay)
+    CLUSTER_DIRECTORY  run as one node of a cluster sharing this directory
+                       file: only the arenas this node owns are simulated
+                       and players are redirected to CLUSTER_URL of the node
+                       owning theirs (see game.cluster); CLUSTER_NODE names
+                       this node (default: the host name)
+    CLUSTER_BUS        how cluster nodes share announcements: a redis:// URL,
+                       or a file path for nodes sharing a filesystem
+                       (default: CLUSTER_DIRECTORY with a ".bus" suffix)
+
+Journals, recordings and cluster mode need the in-process manager, so they
+are ignored when ARENA_WORKERS is set.
+"""
+import os
+from typing import Mapping, Optional
+
+from .arena import ArenaManager
+from .cluster import ClusterManager, FileDirectory, make_bus
+from .workers import ArenaPool
+
+
+def make_arenas(environ: Optional[Mapping[str, str]] = None) -> ArenaManager:
+    """
+    Builds the arena manager ``environ`` (default: os.environ) asks for.
+    With ARENA_WORKERS this starts the worker processes, so under the
+    ``spawn`` start method it must only run in the server's main process.
+    """
+    environ = os.environ if environ is None else environ
+    workers = int(environ.get("ARENA_WORKERS", "0"))
+    if workers > 0:
+        return ArenaPool(workers)
+    options = {"state_dir": environ.get("STATE_DIR"), "replay_dir": environ.get("REPLAY_DIR")}
+    directory = environ.get("CLUSTER_DIRECTORY")
+    if directory:
+        return ClusterManager(
+            node_id=environ.get("CLUSTER_NODE", os.uname().nodename),
+            url=environ.get("CLUSTER_URL", "http://localhost:5000"),
+            directory=FileDirectory(directory),
+            bus=make_bus(environ.get("CLUSTER_BUS") or directory + ".bus"),
+            **options,
+        )
+    return ArenaManager(**options)
@@ -0,0 +1,227 @@
+"""
+In-process tick metrics and sampling profiler.
+
+``METRICS`` is the process-wide registry the engine, arenas and servers
+record into: counters, gauges and timing histograms, each optionally
+labelled. ``render()`` produces the Prometheus text exposition format.
+Histograms keep cumulative buckets for Prometheus and also a rolling window
+of recent samples, from which p50/p99 are reported.
+
+``SamplingProfiler`` samples every thread's stack at a fixed interval for a
+chosen number of ticks and writes folded stacks (``frame;frame;frame N``),
+the input format of flamegraph.pl, speedscope and inferno.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Upper bounds, in seconds, of the timing histogram buckets.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+RECENT_SAMPLES = 600  # samples kept per histogram for rolling quantiles
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    # Label values may contain anything; the text format escapes these three.
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = RECENT_SAMPLES):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    def __init__(self, prefix: str = "subwars"):
+        self.prefix = prefix
+        self.counters: Dict[str, Dict[LabelKey, float]] = collections.defaultdict(dict)
+        self.gauges: Dict[str, Dict[LabelKey, float]] = collections.defaultdict(dict)
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = collections.defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(labels)
+        with self.lock:
+            series = self.counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self.lock:
+            self.gauges[name][_key(labels)] = value
+
+    def remove(self, name: str, **labels) -> None:
+        """Drops one labelled gauge series (e.g. for an arena that closed)."""
+        with self.lock:
+            self.gauges[name].pop(_key(labels), None)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _key(labels)
+        with self.lock:
+            series = self.histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def quantiles(self, name: str, **labels) -> Dict[str, float]:
+        """p50/p99 over the recent samples of one histogram series."""
+        with self.lock:
+            histogram = self.histograms.get(name, {}).get(_key(labels))
+            if histogram is None:
+                return {"p50": 0.0, "p99": 0.0}
+            return {"p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99)}
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+            for name, series in sorted(self.gauges.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f"{full}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}"
+                        )
+                    lines.append(
+                        f"{full}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}"
+                    )
+                    lines.append(f"{full}_sum{_format_labels(key)} {histogram.total}")
+                    lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+                # Rolling quantiles over recent ticks, as a separate gauge family.
+                lines.append(f"# TYPE {full}_recent gauge")
+                for key, histogram in sorted(series.items()):
+                    for q in (0.5, 0.99):
+                        lines.append(
+                            f"{full}_recent{_format_labels(key, ('quantile', str(q)))} "
+                            f"{histogram.quantile(q)}"
+                        )
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class SamplingProfiler:
+    """
+    Samples all thread stacks every ``interval`` seconds while active. The
+    game loop calls ``tick()`` once per frame; after the requested number of
+    ticks the samples are written to ``path`` as folded stacks.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: collections.Counter = collections.Counter()
+        self.remaining = 0
+        self.path: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.remaining > 0
+
+    def start(self, ticks: int, path: str) -> bool:
+        """Begins sampling; returns False if a capture is already running."""
+        with self._lock:
+            if self.active:
+                return False
+            self.samples.clear()
+            self.path = path
+            self.remaining = ticks
+            self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def tick(self) -> Optional[str]:
+        """Counts a finished frame; returns the output path when a capture completes."""
+        if not self.active:
+            return None
+        with self._lock:
+            self.remaining -= 1
+            if self.remaining > 0:
+                return None
+        self._thread.join()
+        return self.write()
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while self.active:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def write(self) -> str:
+        with open(self.path, "w") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        return self.path
+
+
+PROFILER = SamplingProfiler()
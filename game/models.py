@@ -1,8 +1,5 @@
 import math
-import random
-import time
 from .constants import (
-    WORLD_SIZE,
     MAX_DEPTH,
     TORPEDO_SPEED,
     SUB_MAX_SPEED,
@@ -12,30 +9,115 @@ from .constants import (
     DIVE_RATE_PER_SPEED,
     RESPAWN_TIME,
 )
+from .context import SimContext
 from .physics import (
     wrap_position,
     clamp,
     angular_difference,
     move_towards,
     interpret_speed_command,
+    random_position,
 )
 
 
-class Torpedo:
-    def __init__(self, owner_id, x, y, depth, heading):
-        self.id = f"torp-{time.time()}-{random.randint(0, 9999)}"
+class Positioned:
+    """
+    Mixin for entities tracked by a ``SpatialHash``.
+
+    Assigning ``x`` or ``y`` re-buckets the entity in its attached index (if
+    any). Updates that change both coordinates should go through ``place()``
+    (a teleport) or ``move_to()`` (motion during a simulation step) so the
+    entity is re-bucketed only once.
+
+    ``prev_x``/``prev_y`` hold the position at the start of the latest
+    movement, for swept collision tests. Teleports reset them, so a respawn
+    or a test fixture never looks like a sweep across the map.
+    """
+
+    __slots__ = ()
+
+    index = None
+    _x = 0.0
+    _y = 0.0
+    prev_x = 0.0
+    prev_y = 0.0
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, value: float):
+        self._x = self.prev_x = value
+        self._reindex()
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, value: float):
+        self._y = self.prev_y = value
+        self._reindex()
+
+    def place(self, x: float, y: float):
+        """Teleports the entity to (x, y), re-bucketing it at most once."""
+        self._x = self.prev_x = x
+        self._y = self.prev_y = y
+        self._reindex()
+
+    def move_to(self, x: float, y: float):
+        """Moves the entity to (x, y), remembering where the move started."""
+        self.prev_x = self._x
+        self.prev_y = self._y
+        self._x = x
+        self._y = y
+        self._reindex()
+
+    def _reindex(self):
+        if self.index is not None:
+            self.index.move(self.id, self)
+
+
+class Torpedo(Positioned):
+    # Torpedoes are numerous and short-lived, so they are slotted and
+    # recycled through a TorpedoPool rather than allocated per launch.
+    __slots__ = (
+        "id",
+        "owner_id",
+        "index",
+        "_x",
+        "_y",
+        "prev_x",
+        "prev_y",
+        "depth",
+        "heading",
+        "created_at",
+        "expires_at",
+        "slot",
+    )
+
+    def __init__(self, torpedo_id, owner_id, x, y, depth, heading, now):
+        self.index = None
+        self.slot = -1  # position in the owning pool's active list
+        self.reset(torpedo_id, owner_id, x, y, depth, heading, now)
+
+    def reset(self, torpedo_id, owner_id, x, y, depth, heading, now):
+        """(Re)launches the torpedo at simulation time ``now``."""
+        self.id = torpedo_id
         self.owner_id = owner_id
-        self.x = x
-        self.y = y
+        self.place(x, y)
         self.depth = depth
         self.heading = heading
-        self.created_at = time.time()
+        self.created_at = now
         self.expires_at = self.created_at + 20.0
 
     def update(self, dt: float):
         heading_rad = math.radians(self.heading)
-        self.x = wrap_position(self.x + math.sin(heading_rad) * TORPEDO_SPEED * dt)
-        self.y = wrap_position(self.y - math.cos(heading_rad) * TORPEDO_SPEED * dt)
+        self.move_to(
+            wrap_position(self._x + math.sin(heading_rad) * TORPEDO_SPEED * dt),
+            wrap_position(self._y - math.cos(heading_rad) * TORPEDO_SPEED * dt),
+        )
 
     def is_expired(self, now: float) -> bool:
         return now >= self.expires_at
@@ -53,12 +135,66 @@ class Torpedo:
         }
 
 
-class Submarine:
-    def __init__(self, sid, username):
+class TorpedoPool:
+    """
+    Storage for one world's torpedoes.
+
+    ``active`` is a plain list of the torpedoes in flight. Ids are integers
+    that increase monotonically and are never reused; ``next_id`` is the
+    next one to be issued. Launch times come from the world's SimContext.
+    Removal swaps the last torpedo into the freed position (so order is not
+    preserved), and released objects go on a free list for the next launch.
+    """
+
+    def __init__(self, ctx: SimContext = None):
+        self.ctx = ctx or SimContext()
+        self.active = []
+        self._free = []
+        self.next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def spawn(self, owner_id, x, y, depth, heading, torpedo_id=None, now=None) -> Torpedo:
+        """
+        Launches a torpedo at ``now`` (default: the context clock);
+        ``torpedo_id`` keeps a restored torpedo's old id.
+        """
+        if now is None:
+            now = self.ctx.now()
+        torpedo_id = self._issue_id(torpedo_id)
+        if self._free:
+            torp = self._free.pop()
+            torp.reset(torpedo_id, owner_id, x, y, depth, heading, now)
+        else:
+            torp = Torpedo(torpedo_id, owner_id, x, y, depth, heading, now)
+        torp.slot = len(self.active)
+        self.active.append(torp)
+        return torp
+
+    def _issue_id(self, torpedo_id=None) -> int:
+        if torpedo_id is None:
+            torpedo_id = self.next_id
+        self.next_id = max(self.next_id, torpedo_id + 1)
+        return torpedo_id
+
+    def release(self, torp: Torpedo) -> None:
+        """Removes a torpedo in O(1). It must not be in a spatial index."""
+        last = self.active.pop()
+        if last is not torp:
+            self.active[torp.slot] = last
+            last.slot = torp.slot
+        torp.slot = -1
+        self._free.append(torp)
+
+
+class Submarine(Positioned):
+    # Spawn positions and hit times come from the world's SimContext; a sub
+    # created on its own gets a private wall-clock context.
+    def __init__(self, sid, username, ctx: SimContext = None):
+        self.ctx = ctx or SimContext()
         self.id = sid
         self.username = username
-        self.x = 0.0
-        self.y = 0.0
         self.depth = 50.0
         self.heading = 0.0
         self.speed = 0.0
@@ -72,9 +208,8 @@ class Submarine:
         self.randomize_position()
 
     def randomize_position(self):
-        self.x = random.uniform(0, WORLD_SIZE)
-        self.y = random.uniform(0, WORLD_SIZE)
-        self.heading = random.uniform(0, 359)
+        self.place(*random_position(self.ctx.rng))
+        self.heading = self.ctx.rng.uniform(0, 359)
 
     def respawn(self):
         self.randomize_position()
@@ -87,6 +222,15 @@ class Submarine:
         self.respawn_at = None
         self.respawn_ready = False
 
+    def settled(self) -> bool:
+        """At rest on its ordered heading and depth, so update() would change nothing."""
+        return (
+            self.speed == 0.0
+            and clamp(self.target_speed, 0.0, SUB_MAX_SPEED) == 0.0
+            and self.depth == clamp(self.target_depth, 0.0, MAX_DEPTH)
+            and (self.target_heading is None or self.heading == self.target_heading % 360.0)
+        )
+
     def update(self, dt: float):
         if not self.alive:
             return
@@ -115,8 +259,7 @@ class Submarine:
         heading_rad = math.radians(self.heading)
         dx = math.sin(heading_rad) * speed * dt
         dy = -math.cos(heading_rad) * speed * dt
-        self.x = wrap_position(self.x + dx)
-        self.y = wrap_position(self.y + dy)
+        self.move_to(wrap_position(self._x + dx), wrap_position(self._y + dy))
 
     def set_controls(self, heading, speed_command, depth):
         if heading is not None:
@@ -126,9 +269,10 @@ class Submarine:
         if depth is not None:
             self.target_depth = clamp(float(depth), 0.0, MAX_DEPTH)
 
-    def take_hit(self):
+    def take_hit(self, now=None):
+        """Sinks the sub at ``now`` (default: the context clock)."""
         self.alive = False
-        self.respawn_at = time.time() + RESPAWN_TIME
+        self.respawn_at = (self.ctx.now() if now is None else now) + RESPAWN_TIME
         self.respawn_ready = False
 
     def to_dict(self):
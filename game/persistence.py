@@ -0,0 +1,177 @@
+"""
+World persistence for crash recovery and rolling restarts.
+
+``dump_world`` captures what is needed to rebuild an arena's world: subs
+(with the session tokens their players reconnect with), torpedoes in flight,
+respawn timers and the position of the world's random stream. It is built
+from ``Submarine.to_dict`` and ``Torpedo.to_dict``. ``load_world`` rebuilds
+a GameEngine from it.
+
+``WorldJournal`` keeps one arena's world in a local file. The file holds a
+full snapshot followed by an append-only log of patches, both in the
+delta-protocol format from ``game.protocol``, one JSON message per line.
+Every JOURNAL_SNAPSHOT_INTERVAL records the log is compacted into a fresh
+snapshot, which is written to a temporary file and renamed into place.
+
+Arenas record their world every JOURNAL_INTERVAL ticks (``due``) and when
+they close, so a crash loses at most that many ticks. Recording only hands
+the captured state to a background thread, which diffs it against the
+previous record, serializes it and writes it out. If a write fails (disk
+full, permissions), the error is logged and counted in the
+``journal_errors_total`` metric, and the journal stops taking records; the
+arena plays on without crash recovery.
+"""
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+from .constants import JOURNAL_INTERVAL, JOURNAL_SNAPSHOT_INTERVAL
+from .metrics import METRICS
+from .protocol import DeltaDecoder, DeltaEncoder
+
+JOURNAL_SUFFIX = ".journal"
+
+logger = logging.getLogger(__name__)
+
+
+def dump_world(engine, tokens: Dict[str, str]) -> dict:
+    """Engine state as a delta-protocol state; ``tokens`` maps sid -> session token."""
+    return {
+        "world": {
+            "tick": engine.tick,
+            "seed": engine.ctx.seed,
+            "rng": engine.ctx.rng_state(),
+            "next_torpedo_id": engine.torpedo_pool.next_id,
+        },
+        "subs": [
+            {**sub.to_dict(), "token": tokens.get(sid)}
+            for sid, sub in engine.submarines.items()
+        ],
+        "torpedoes": [torp.to_dict() for torp in engine.torpedoes],
+    }
+
+
+def load_world(engine, state: dict) -> Dict[str, str]:
+    """Restores a ``dump_world`` state into an empty engine; returns sid -> token."""
+    world = state.get("world", {})
+    engine.tick = world.get("tick", 0)
+    engine.ctx.seed = world.get("seed", engine.ctx.seed)
+    tokens = {}
+    for data in state.get("subs", []):
+        engine.restore_player(data)
+        if data.get("token"):
+            tokens[data["id"]] = data["token"]
+    for data in state.get("torpedoes", []):
+        engine.restore_torpedo(data)
+    engine.torpedo_pool.next_id = max(
+        engine.torpedo_pool.next_id, world.get("next_torpedo_id", 1)
+    )
+    # Last, since re-adding the subs draws spawn positions.
+    if world.get("rng"):
+        engine.ctx.set_rng_state(world["rng"])
+    return tokens
+
+
+class WorldJournal:
+    def __init__(
+        self,
+        path: str,
+        snapshot_interval: int = JOURNAL_SNAPSHOT_INTERVAL,
+        interval: int = JOURNAL_INTERVAL,
+    ):
+        self.path = path
+        self.interval = interval
+        self._ticks = 0
+        # Only the writer thread touches the encoder.
+        self.encoder = DeltaEncoder(keyframe_interval=snapshot_interval, auto_ack=True)
+        self._queue: "queue.Queue" = queue.Queue()
+        # The writer's error, once a write has failed; no records are taken after it.
+        self.failed: Optional[Exception] = None
+        self._writer = threading.Thread(target=self._write_loop, name="journal", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def load(path: str) -> Optional[dict]:
+        """Replays a journal file; returns the last complete state, or None."""
+        if not os.path.exists(path):
+            return None
+        decoder = DeltaDecoder()
+        with open(path) as f:
+            for line in f:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    break  # a torn final line from a crash mid-write
+                if not decoder.apply(message):
+                    break
+        return decoder.state
+
+    def due(self) -> bool:
+        """Called once per tick; True on the ticks whose state should be recorded."""
+        self._ticks += 1
+        return (self._ticks - 1) % self.interval == 0
+
+    def record(self, state: dict) -> None:
+        """
+        Queues a ``dump_world`` state, which the caller must not change
+        afterwards; only its changes since the last record are kept. Dropped
+        once the journal has failed.
+        """
+        if self.failed is None:
+            self._queue.put(state)
+
+    def close(self, remove: bool = False) -> bool:
+        """
+        Flushes pending records; ``remove`` deletes the file (the world ended).
+        Returns False if records were lost to a failed write.
+        """
+        self._queue.put(None)
+        self._writer.join()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+        return self.failed is None
+
+    def _write_loop(self) -> None:
+        log = None
+        while True:
+            state = self._queue.get()
+            if state is None:
+                break
+            if self.failed is not None:
+                continue  # drain what was queued before the failure
+            try:
+                log = self._write(log, state)
+            except Exception as exc:
+                self.failed = exc
+                METRICS.inc("journal_errors_total")
+                logger.error("Journal %s failed, no longer recording: %s", self.path, exc)
+                if log:
+                    with contextlib.suppress(OSError):
+                        log.close()
+                    log = None
+        if log:
+            log.close()
+
+    def _write(self, log, state: dict):
+        """Writes one record to the open ``log`` (None before the first); returns the log."""
+        message = self.encoder.encode(state)
+        line = json.dumps(message, separators=(",", ":")) + "\n"
+        if message.get("key"):
+            # Compact: the new snapshot replaces the file atomically.
+            if log:
+                log.close()
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(line)
+            os.replace(tmp, self.path)
+            log = open(self.path, "a")
+        else:
+            log.write(line)
+        # Flush whole batches so a crash loses at most what was queued.
+        if self._queue.empty():
+            log.flush()
+        return log
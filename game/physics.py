@@ -1,5 +1,4 @@
 import math
-import random
 from .constants import (
     WORLD_SIZE,
     SPEED_ORDER_MAX,
@@ -9,8 +8,8 @@ from .constants import (
 )
 
 
-def random_position():
-    return random.uniform(0, WORLD_SIZE), random.uniform(0, WORLD_SIZE)
+def random_position(rng):
+    return rng.uniform(0, WORLD_SIZE), rng.uniform(0, WORLD_SIZE)
 
 
 def wrap_position(value: float) -> float:
@@ -21,6 +20,16 @@ def wrap_position(value: float) -> float:
     return value
 
 
+def wrap_delta(delta: float, size: float = WORLD_SIZE) -> float:
+    """Shortest signed offset between two wrapped coordinates."""
+    half = size / 2.0
+    if delta > half:
+        delta -= size
+    elif delta < -half:
+        delta += size
+    return delta
+
+
 def clamp(value: float, minimum: float, maximum: float) -> float:
     return max(minimum, min(maximum, value))
 
@@ -51,16 +60,66 @@ def torpedo_hits_sub(torp_x, torp_y, torp_depth, sub_x, sub_y, sub_depth, sub_he
     dir_y = -math.cos(heading_rad)
     half_length = SUB_LENGTH / 2.0
 
-    rel_x = torp_x - sub_x
-    rel_y = torp_y - sub_y
+    rel_x = wrap_delta(torp_x - sub_x)
+    rel_y = wrap_delta(torp_y - sub_y)
     along = rel_x * dir_x + rel_y * dir_y
     along_clamped = clamp(along, -half_length, half_length)
-    closest_x = sub_x + dir_x * along_clamped
-    closest_y = sub_y + dir_y * along_clamped
 
-    cross_x = torp_x - closest_x
-    cross_y = torp_y - closest_y
+    cross_x = rel_x - dir_x * along_clamped
+    cross_y = rel_y - dir_y * along_clamped
     horizontal_dist = math.sqrt(cross_x * cross_x + cross_y * cross_y)
     dz = torp_depth - sub_depth
     distance = math.sqrt(horizontal_dist * horizontal_dist + dz * dz)
     return distance <= HIT_RADIUS
+
+
+def torpedo_sweep_hits_sub(
+    prev_x, prev_y, torp_x, torp_y, torp_depth,
+    sub_prev_x, sub_prev_y, sub_x, sub_y, sub_depth, sub_heading,
+) -> bool:
+    """
+    Continuous version of ``torpedo_hits_sub``: tests the whole path the
+    torpedo swept during the step, relative to the sub's own motion, so fast
+    torpedoes (or long steps) cannot tunnel through the hull. The capsule uses
+    the sub's end-of-step heading and depth.
+    """
+    heading_rad = math.radians(sub_heading)
+    half_length = SUB_LENGTH / 2.0
+    axis_x = math.sin(heading_rad) * 2.0 * half_length
+    axis_y = -math.cos(heading_rad) * 2.0 * half_length
+
+    # Work in the sub's frame: the torpedo moves along start + t * (dx, dy, 0)
+    # while the hull axis spans -half_length..half_length around the origin.
+    start_x = wrap_delta(prev_x - sub_prev_x)
+    start_y = wrap_delta(prev_y - sub_prev_y)
+    dx = wrap_delta(torp_x - prev_x) - wrap_delta(sub_x - sub_prev_x)
+    dy = wrap_delta(torp_y - prev_y) - wrap_delta(sub_y - sub_prev_y)
+    dz = torp_depth - sub_depth
+
+    # Closest points between segment P(s) = start + s*d and the hull axis
+    # Q(t) = -axis/2 + t*axis, s, t in [0, 1] (Ericson, Real-Time Collision
+    # Detection, 5.1.9). The axis always has non-zero length.
+    r_x = start_x + axis_x / 2.0
+    r_y = start_y + axis_y / 2.0
+    a = dx * dx + dy * dy
+    e = axis_x * axis_x + axis_y * axis_y
+    f = axis_x * r_x + axis_y * r_y
+    if a <= 1e-12:
+        s = 0.0
+        t = clamp(f / e, 0.0, 1.0)
+    else:
+        c = dx * r_x + dy * r_y
+        b = dx * axis_x + dy * axis_y
+        denom = a * e - b * b
+        s = clamp((b * f - c * e) / denom, 0.0, 1.0) if denom > 1e-12 else 0.0
+        t = (b * s + f) / e
+        if t < 0.0:
+            t = 0.0
+            s = clamp(-c / a, 0.0, 1.0)
+        elif t > 1.0:
+            t = 1.0
+            s = clamp((b - c) / a, 0.0, 1.0)
+
+    gap_x = (r_x + dx * s) - axis_x * t
+    gap_y = (r_y + dy * s) - axis_y * t
+    return gap_x * gap_x + gap_y * gap_y + dz * dz <= HIT_RADIUS * HIT_RADIUS
@@ -0,0 +1,252 @@
+"""
+Delta-compressed state protocol.
+
+Each stream (one player's personal, interest-filtered state) is a sequence
+of numbered states. A ``DeltaEncoder`` remembers what it sent and,
+once the client acknowledges a sequence number, encodes later states as a
+patch against that acknowledged base: only changed fields of records, and
+added/updated/removed entries of id-keyed collections. A full keyframe is
+sent when no usable base exists, on request, and every ``KEYFRAME_INTERVAL``
+messages so clients can always resync.
+
+Message shapes (JSON):
+    keyframe: {"v": 1, "seq": n, "key": True, "state": {...}}
+    delta:    {"v": 1, "seq": n, "base": b, "patch": {...}}
+Either may carry "tick": the simulation tick the state was sampled at, which
+clients use to place snapshots on the server's timeline.
+
+Patch sections, by the type of the value in the state:
+    dict (record):      {"set": {field: value}, "unset": [field]}
+    list (collection):  {"add": [entry], "upd": [{"id", field: value}], "del": [id]}
+    scalar:             the new value
+Unchanged sections are omitted; sections missing from the base are sent whole.
+"""
+from collections import OrderedDict
+from typing import Optional
+
+PROTOCOL_VERSION = 1
+KEYFRAME_INTERVAL = 50  # messages between forced keyframes
+MAX_DELTA_HISTORY = 32  # unacknowledged states kept per stream
+FLOAT_DIGITS = 2  # floats are rounded so sub-centimetre jitter is not "a change"
+
+
+def _quantize(value):
+    if isinstance(value, float):
+        return round(value, FLOAT_DIGITS)
+    return value
+
+
+def _normalize(state: dict) -> dict:
+    """Rounds floats and indexes collections by entry id (keeping order)."""
+    snap = {}
+    for key, value in state.items():
+        if isinstance(value, dict):
+            snap[key] = {k: _quantize(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            snap[key] = OrderedDict(
+                (entry["id"], {k: _quantize(v) for k, v in entry.items()})
+                for entry in value
+            )
+        else:
+            snap[key] = _quantize(value)
+    return snap
+
+
+def _denormalize(snap: dict) -> dict:
+    return {
+        key: list(value.values()) if isinstance(value, OrderedDict) else value
+        for key, value in snap.items()
+    }
+
+
+def _diff_record(old: dict, new: dict) -> dict:
+    patch = {}
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    removed = [k for k in old if k not in new]
+    if changed:
+        patch["set"] = changed
+    if removed:
+        patch["unset"] = removed
+    return patch
+
+
+def _diff_collection(old: OrderedDict, new: OrderedDict) -> dict:
+    patch = {}
+    added, updated = [], []
+    for entry_id, entry in new.items():
+        previous = old.get(entry_id)
+        if previous is None:
+            added.append(entry)
+            continue
+        changed = {k: v for k, v in entry.items() if previous.get(k) != v}
+        if changed:
+            changed["id"] = entry_id
+            updated.append(changed)
+    removed = [entry_id for entry_id in old if entry_id not in new]
+    if added:
+        patch["add"] = added
+    if updated:
+        patch["upd"] = updated
+    if removed:
+        patch["del"] = removed
+    return patch
+
+
+def diff_states(base: dict, snap: dict) -> dict:
+    patch = {}
+    for key, value in snap.items():
+        if key not in base:
+            # New sections are sent whole.
+            patch[key] = list(value.values()) if isinstance(value, OrderedDict) else value
+            continue
+        old = base[key]
+        if isinstance(value, OrderedDict):
+            section = _diff_collection(old if isinstance(old, OrderedDict) else OrderedDict(), value)
+        elif isinstance(value, dict):
+            section = _diff_record(old if isinstance(old, dict) else {}, value)
+        elif old != value:
+            patch[key] = value
+            continue
+        else:
+            continue
+        if section:
+            patch[key] = section
+    return patch
+
+
+class DeltaEncoder:
+    """
+    Encodes one player's state stream. Arenas keep one encoder per player,
+    so each patch is diffed against the last state that player acknowledged
+    (``ack``) and covers only what is in their area of interest; a player
+    that falls out of step asks for a keyframe (``reset``). With
+    ``auto_ack`` every message is assumed delivered instead, for consumers
+    that never drop one (the world journal, see game.persistence).
+    """
+
+    def __init__(
+        self,
+        keyframe_interval: int = KEYFRAME_INTERVAL,
+        history: int = MAX_DELTA_HISTORY,
+        auto_ack: bool = False,
+    ):
+        self.keyframe_interval = keyframe_interval
+        self.history = history
+        self.auto_ack = auto_ack
+        self.seq = 0
+        self.tick: Optional[int] = None
+        self.acked: Optional[int] = None
+        self._sent: "OrderedDict[int, dict]" = OrderedDict()
+        self._last_keyframe = 0
+
+    def encode(self, state: dict, tick: Optional[int] = None) -> dict:
+        snap = _normalize(state)
+        self.seq += 1
+        self.tick = tick
+        base = self._sent.get(self.acked) if self.acked is not None else None
+        if base is None or self.seq - self._last_keyframe >= self.keyframe_interval:
+            message = self._keyframe_message(self.seq, snap)
+            self._last_keyframe = self.seq
+        else:
+            message = {
+                "v": PROTOCOL_VERSION,
+                "seq": self.seq,
+                "base": self.acked,
+                "patch": diff_states(base, snap),
+            }
+
+        if tick is not None:
+            message["tick"] = tick
+        self._sent[self.seq] = snap
+        if self.auto_ack:
+            self.ack(self.seq)
+        while len(self._sent) > self.history:
+            dropped, _ = self._sent.popitem(last=False)
+            if dropped == self.acked:
+                self.acked = None
+        return message
+
+    def ack(self, seq: int) -> None:
+        """Marks ``seq`` as received; older states are no longer needed."""
+        if seq not in self._sent or (self.acked is not None and seq <= self.acked):
+            return
+        self.acked = seq
+        while next(iter(self._sent)) != seq:
+            self._sent.popitem(last=False)
+
+    def keyframe(self) -> Optional[dict]:
+        """Re-sends the latest state in full (for a resyncing client)."""
+        if not self._sent:
+            return None
+        message = self._keyframe_message(self.seq, self._sent[self.seq])
+        if self.tick is not None:
+            message["tick"] = self.tick
+        return message
+
+    def reset(self) -> None:
+        """Forgets the acknowledged base so the next message is a keyframe."""
+        self.acked = None
+
+    @staticmethod
+    def _keyframe_message(seq: int, snap: dict) -> dict:
+        return {"v": PROTOCOL_VERSION, "seq": seq, "key": True, "state": _denormalize(snap)}
+
+
+class DeltaDecoder:
+    """Client-side counterpart of DeltaEncoder (mirrors static/main.js)."""
+
+    def __init__(self, history: int = MAX_DELTA_HISTORY):
+        self.history = history
+        self.states: "OrderedDict[int, dict]" = OrderedDict()
+        self.seq: Optional[int] = None
+
+    @property
+    def state(self) -> Optional[dict]:
+        if self.seq is None:
+            return None
+        return _denormalize(self.states[self.seq])
+
+    def apply(self, message: dict) -> bool:
+        """Applies a message; returns False if a keyframe is needed to resync."""
+        if message.get("v") != PROTOCOL_VERSION:
+            return False
+        if message.get("key"):
+            snap = _normalize(message["state"])
+        else:
+            base = self.states.get(message["base"])
+            if base is None:
+                return False
+            snap = apply_patch(base, message["patch"])
+
+        self.states[message["seq"]] = snap
+        self.seq = message["seq"]
+        while len(self.states) > self.history:
+            self.states.popitem(last=False)
+        return True
+
+
+def apply_patch(base: dict, patch: dict) -> dict:
+    snap = dict(base)
+    for key, section in patch.items():
+        old = base.get(key)
+        if key not in base:
+            snap.update(_normalize({key: section}))
+        elif isinstance(old, OrderedDict):
+            entries = OrderedDict((k, dict(v)) for k, v in old.items())
+            for entry_id in section.get("del", ()):
+                entries.pop(entry_id, None)
+            for changed in section.get("upd", ()):
+                entries[changed["id"]].update(changed)
+            for entry in section.get("add", ()):
+                entries[entry["id"]] = dict(entry)
+            snap[key] = entries
+        elif isinstance(old, dict):
+            record = dict(old)
+            record.update(section.get("set", {}))
+            for field in section.get("unset", ()):
+                record.pop(field, None)
+            snap[key] = record
+        else:
+            snap[key] = section
+    return snap
+
@@ -0,0 +1,189 @@
+"""
+Deterministic match recording and headless replay.
+
+A ``Recorder`` attached to a GameEngine (``engine.recorder``) logs every
+input that can change the world, each with the engine clock reading it was
+made at: players joining, leaving and being re-bound, and each ``update``
+with its elapsed time and the player commands (``update_controls``,
+``fire_torpedo``, ``sonar_ping``, ``request_respawn``) it applied. Commands
+are logged as the batch an update drained, not as they are queued, so one
+queued while an update runs lands with the update that applies it. The log
+header carries the engine's seed, random generator state and starting
+world. Because the engine takes every timestamp and random draw from its
+SimContext (game.context), feeding the same inputs to an engine on a
+``ManualClock`` re-simulates the match exactly, as fast as the CPU allows.
+
+The log is JSON lines: a header object, then one array per input:
+
+    ["join", t, sid, username]     ["leave", t, sid]
+    ["rebind", t, old_sid, new_sid]
+    ["update", t, elapsed, [[sid, kind, data], ...]]
+    ["check", tick, digest]        (state digest, every CHECK_INTERVAL updates)
+
+Inputs can come from several threads (Socket.IO handlers and the game
+loop), so records are written under a lock.
+
+    python -m game.replay match.replay [--until-tick N]
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .engine import GameEngine
+from .persistence import dump_world, load_world
+
+REPLAY_VERSION = 2
+CHECK_INTERVAL = 50  # updates between recorded state digests
+
+
+class ManualClock:
+    """A clock that only moves when told to; pass it as ``GameEngine(clock=...)``."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, dt: float) -> None:
+        self.now += dt
+
+
+def state_digest(engine: GameEngine) -> str:
+    """Fingerprint of the simulated world, for detecting replay divergence."""
+    state = json.dumps(dump_world(engine, {}), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(state.encode()).hexdigest()
+
+
+class Recorder:
+    """Logs an engine's inputs to ``path`` from the moment it is attached."""
+
+    def __init__(self, engine: GameEngine, path: str, check_interval: int = CHECK_INTERVAL):
+        self.engine = engine
+        self.check_interval = check_interval
+        self._updates = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "w")
+        self._write(
+            {
+                "replay": REPLAY_VERSION,
+                "backend": engine.backend,
+                "sim_rate": round(1.0 / engine.sim_dt),
+                "seed": engine.ctx.seed,
+                "accumulator": engine.accumulator,
+                "world": dump_world(engine, {}),
+            }
+        )
+        engine.recorder = self
+
+    def _write(self, record) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def join(self, sid: str, username: str) -> None:
+        self._write(["join", self.engine.ctx.now(), sid, username])
+
+    def leave(self, sid: str) -> None:
+        self._write(["leave", self.engine.ctx.now(), sid])
+
+    def rebind(self, old_sid: str, new_sid: str) -> None:
+        self._write(["rebind", self.engine.ctx.now(), old_sid, new_sid])
+
+    def update(self, now: float, elapsed: float, commands) -> None:
+        """Logs an update and the (sid, kind, data) commands it applies."""
+        if self._updates % self.check_interval == 0:
+            self._write(["check", self.engine.tick, state_digest(self.engine)])
+            with self._lock:
+                self._file.flush()
+        self._updates += 1
+        self._write(["update", now, elapsed, commands])
+
+    def close(self) -> None:
+        if self.engine.recorder is self:
+            self.engine.recorder = None
+        with self._lock:
+            self._file.close()
+
+
+class ReplayDivergence(Exception):
+    """The re-simulated world no longer matches the recorded digest."""
+
+
+def replay(
+    path: str,
+    until_tick: Optional[int] = None,
+    on_update: Optional[Callable[[GameEngine, List[dict]], None]] = None,
+    backend: Optional[str] = None,
+) -> GameEngine:
+    """
+    Re-simulates a recorded match and returns the engine at the end (or at
+    the first update reaching ``until_tick``). ``on_update`` is called after
+    every update with its events. Raises ReplayDivergence if a recorded
+    digest doesn't match.
+    """
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get("replay") != REPLAY_VERSION:
+            raise ValueError(f"unsupported replay version {header.get('replay')!r}")
+        clock = ManualClock()
+        engine = GameEngine(
+            backend=backend or header["backend"],
+            sim_rate=header["sim_rate"],
+            seed=header["seed"],
+            clock=clock,
+        )
+        load_world(engine, header["world"])
+        engine.accumulator = header["accumulator"]
+
+        for line in f:
+            record = json.loads(line)
+            op = record[0]
+            if op == "check":
+                if record[1] == engine.tick and record[2] != state_digest(engine):
+                    raise ReplayDivergence(f"world diverged before tick {engine.tick}")
+                continue
+            clock.now = record[1]
+            if op == "update":
+                # The recorded batch already passed the command buffers'
+                # checks, so it goes straight into them.
+                for sid, kind, data in record[3]:
+                    engine.commands[sid].pending.append((kind, data))
+                events = engine.update(record[2])
+                if on_update:
+                    on_update(engine, events)
+                if until_tick is not None and engine.tick >= until_tick:
+                    break
+            elif op == "join":
+                engine.add_player(record[2], record[3])
+            elif op == "leave":
+                engine.remove_player(record[2])
+            elif op == "rebind":
+                engine.rebind_player(record[2], record[3])
+    return engine
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--until-tick", type=int, help="stop once the simulation reaches this tick")
+    parser.add_argument("--backend", help="override the recorded simulation backend")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    engine = replay(args.path, args.until_tick, backend=args.backend)
+    elapsed = time.perf_counter() - start
+    simulated = engine.tick * engine.sim_dt
+    print(
+        "replayed to tick %d (%.1f s of play) in %.2f s, %.0fx real time; digest %s"
+        % (engine.tick, simulated, elapsed, simulated / max(elapsed, 1e-9), state_digest(engine))
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import time
+from typing import Callable
+
+
+class TickTimer:
+    """
+    Deadline-based fixed-rate timer for the server loop.
+
+    Instead of sleeping a fixed interval after each frame (which lets the rate
+    drift by however long the frame took), the loop sleeps until the next
+    deadline. Frames that finish after their deadline are counted as overruns
+    and the schedule is re-anchored rather than trying to burst-catch-up.
+    """
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic):
+        self.interval = 1.0 / rate
+        self.clock = clock
+        self.due = clock()  # when the upcoming frame should start
+        self.frames = 0
+        self.overruns = 0
+        self.last_overrun = 0.0  # seconds the most recent late frame ran over
+
+    def remaining(self) -> float:
+        """Seconds to sleep before the next frame is due."""
+        return max(0.0, self.due - self.clock())
+
+    def advance(self) -> bool:
+        """
+        Call when a frame finishes. Schedules the next one and returns True if
+        this frame ran past the next frame's start time (an overrun).
+        """
+        now = self.clock()
+        self.frames += 1
+        self.due += self.interval
+        late = now - self.due
+        if late > 0:
+            self.overruns += 1
+            self.last_overrun = late
+            self.due = now
+            return True
+        return False
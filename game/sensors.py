@@ -0,0 +1,72 @@
+"""
+Shared sensor pass.
+
+Active contacts, passive contacts and sonar pings all need the same
+observer -> target geometry. ``sense`` computes it once for every pair of
+living subs within PASSIVE_SONAR_RANGE, the longest sensor range, using
+the spatial index. Each unordered pair is measured once and mirrored.
+Passive-sonar noise is drawn from the supplied generator in a fixed order,
+so a seeded generator gives reproducible contacts.
+"""
+import math
+import random
+from typing import Dict, Iterable, List, NamedTuple
+
+from .constants import (
+    PASSIVE_SONAR_RANGE,
+    PASSIVE_SONAR_NOISE_BEARING,
+    PASSIVE_SONAR_NOISE_DISTANCE,
+)
+from .physics import wrap_delta
+from .spatial import SpatialHash
+
+
+class Contact(NamedTuple):
+    sub: object  # the observed Submarine
+    distance: float  # true 3D distance
+    bearing: float  # true bearing from the observer, degrees
+    noisy_distance: float  # as heard on passive sonar
+    noisy_bearing: float
+
+
+def sense(subs: Iterable, index: SpatialHash, rng: random.Random) -> Dict[str, List[Contact]]:
+    """Contacts within PASSIVE_SONAR_RANGE for every living sub, keyed by sid."""
+    observers = [sub for sub in subs if sub.alive]
+    order = {sub.id: i for i, sub in enumerate(observers)}
+    geometry = {sub.id: [] for sub in observers}
+
+    for sub in observers:
+        rank = order[sub.id]
+        for other in index.query(sub.x, sub.y, PASSIVE_SONAR_RANGE):
+            # Measure each pair once, from the observer that comes first.
+            if order.get(other.id, -1) <= rank:
+                continue
+            dx = wrap_delta(other.x - sub.x)
+            dy = wrap_delta(other.y - sub.y)
+            dz = other.depth - sub.depth
+            dist = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if dist > PASSIVE_SONAR_RANGE:
+                continue
+            bearing = (math.degrees(math.atan2(dx, -dy)) + 360.0) % 360.0
+            geometry[sub.id].append((other, dist, bearing))
+            geometry[other.id].append((sub, dist, (bearing + 180.0) % 360.0))
+
+    contacts = {}
+    for sub in observers:
+        found = []
+        for other, dist, bearing in geometry[sub.id]:
+            bearing_noise = rng.uniform(-PASSIVE_SONAR_NOISE_BEARING, PASSIVE_SONAR_NOISE_BEARING)
+            dist_noise_factor = rng.uniform(
+                1.0 - PASSIVE_SONAR_NOISE_DISTANCE, 1.0 + PASSIVE_SONAR_NOISE_DISTANCE
+            )
+            found.append(
+                Contact(
+                    other,
+                    dist,
+                    bearing,
+                    dist * dist_noise_factor,
+                    (bearing + bearing_noise + 360.0) % 360.0,
+                )
+            )
+        contacts[sub.id] = found
+    return contacts
@@ -0,0 +1,109 @@
+import math
+from typing import Dict, Hashable, Iterator, List, Set, Tuple
+
+from .constants import WORLD_SIZE, SPATIAL_CELL_SIZE
+from .physics import wrap_delta
+
+
+Cell = Tuple[int, int]
+
+
+class SpatialHash:
+    """
+    Uniform grid over the toroidal world plane.
+
+    Entities are bucketed by the cell containing their (x, y) position and are
+    moved between buckets only when they cross a cell boundary, so keeping the
+    index current costs O(1) per moving entity. Radius queries walk the cells
+    overlapping the query circle (wrapping at the world edges) and then filter
+    candidates by their exact wrapped distance.
+    """
+
+    def __init__(self, cell_size: float = SPATIAL_CELL_SIZE, world_size: float = WORLD_SIZE):
+        self.world_size = world_size
+        self.cells_per_side = max(1, int(world_size // cell_size))
+        self.cell_size = world_size / self.cells_per_side
+        self._cells: Dict[Cell, Dict[Hashable, object]] = {}
+        self._cell_of: Dict[Hashable, Cell] = {}
+        # Bumped on every insert, move and removal, so callers can cache
+        # results derived from entity positions.
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._cell_of
+
+    def _cell_for(self, x: float, y: float) -> Cell:
+        n = self.cells_per_side
+        return int(x // self.cell_size) % n, int(y // self.cell_size) % n
+
+    def insert(self, key: Hashable, entity) -> None:
+        """Adds (or re-buckets) an entity that exposes ``x`` and ``y``."""
+        self.version += 1
+        cell = self._cell_for(entity.x, entity.y)
+        old = self._cell_of.get(key)
+        if old == cell:
+            return
+        if old is not None:
+            self._discard(key, old)
+        self._cells.setdefault(cell, {})[key] = entity
+        self._cell_of[key] = cell
+
+    # Moving is just re-inserting: a no-op unless the entity changed cell.
+    move = insert
+
+    def remove(self, key: Hashable) -> None:
+        self.version += 1
+        cell = self._cell_of.pop(key, None)
+        if cell is not None:
+            self._discard(key, cell)
+
+    def _discard(self, key: Hashable, cell: Cell) -> None:
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def touch(self) -> None:
+        """Records that entities moved without leaving their cells (batched updates)."""
+        self.version += 1
+
+    def clear(self) -> None:
+        self.version += 1
+        self._cells.clear()
+        self._cell_of.clear()
+
+    def _cells_in_range(self, x: float, y: float, radius: float) -> Iterator[Cell]:
+        n = self.cells_per_side
+        reach = int(math.ceil(radius / self.cell_size))
+        cx, cy = self._cell_for(x, y)
+        if 2 * reach + 1 >= n:
+            xs: Set[int] = set(range(n))
+            ys: Set[int] = set(range(n))
+        else:
+            xs = {(cx + i) % n for i in range(-reach, reach + 1)}
+            ys = {(cy + j) % n for j in range(-reach, reach + 1)}
+        for ix in xs:
+            for iy in ys:
+                yield ix, iy
+
+    def candidates(self, x: float, y: float, radius: float) -> Iterator[object]:
+        """Yields every entity in a cell touched by the query circle (unfiltered)."""
+        cells = self._cells
+        for cell in self._cells_in_range(x, y, radius):
+            bucket = cells.get(cell)
+            if bucket:
+                yield from bucket.values()
+
+    def query(self, x: float, y: float, radius: float) -> List[object]:
+        """Returns entities whose wrapped horizontal distance to (x, y) is <= radius."""
+        r2 = radius * radius
+        found = []
+        for entity in self.candidates(x, y, radius):
+            dx = wrap_delta(entity.x - x, self.world_size)
+            dy = wrap_delta(entity.y - y, self.world_size)
+            if dx * dx + dy * dy <= r2:
+                found.append(entity)
+        return found
@@ -0,0 +1,45 @@
+"""
+Simulation timers.
+
+A ``TimerQueue`` is a min-heap of (time, kind, subject) entries owned by a
+GameEngine. Respawn readiness, torpedo expiry and sonar contact windows are
+scheduled when they start rather than polled on every entity each step, so
+a step costs O(timers due) however many subs and torpedoes exist.
+
+Cancelled timers (the expiry of a torpedo that hit something first) are
+only marked and are dropped when they reach the top of the heap. Subjects
+can also change under a timer (a player who left, a newer ping), so
+consumers check that a fired timer still applies before acting on it.
+"""
+import heapq
+import itertools
+from typing import Iterator, List, Tuple
+
+
+class TimerQueue:
+    def __init__(self):
+        # Entries are [at, seq, kind, subject]; seq keeps equal times in
+        # scheduling order and subjects from ever being compared.
+        self._heap: List[list] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, at: float, kind: str, subject=None) -> list:
+        """Adds a timer firing at ``at``; returns a handle for ``cancel``."""
+        entry = [at, next(self._seq), kind, subject]
+        heapq.heappush(self._heap, entry)
+        return entry
+
+    @staticmethod
+    def cancel(entry: list) -> None:
+        entry[2] = None
+
+    def due(self, now: float) -> Iterator[Tuple[str, object]]:
+        """Pops and yields (kind, subject) for every live timer at or before ``now``."""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, kind, subject = heapq.heappop(heap)
+            if kind is not None:
+                yield kind, subject
@@ -0,0 +1,471 @@
+"""
+NumPy simulation backend.
+
+Submarine and torpedo state lives in persistent structure-of-arrays columns
+(one row per entity), and the models handed to the rest of the engine are
+views onto their row: reading ``sub.x`` reads the column, assigning it
+writes the column. A step advances every row with one batch of array
+operations using the same inertia model as ``Submarine.update`` and
+``Torpedo.update``; only entities that crossed a spatial hash cell are
+touched one by one, to re-bucket them.
+
+Hit tests use the spatial hash's grid: each torpedo is paired with the
+living subs in the cells around it, found by searching the subs sorted by
+cell, and only those pairs go through the vectorized swept capsule test.
+"""
+import math
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .constants import (
+    WORLD_SIZE,
+    MAX_DEPTH,
+    TORPEDO_SPEED,
+    SUB_MAX_SPEED,
+    MAX_TURN_RATE,
+    MAX_ACCELERATION,
+    BASE_DIVE_RATE,
+    DIVE_RATE_PER_SPEED,
+    HIT_RADIUS,
+    SUB_LENGTH,
+)
+from .models import Submarine, Torpedo, TorpedoPool
+
+# Upper bound on candidate pairs swept at once by hit_pairs, which keeps the
+# temporary arrays small when torpedoes crowd around the same subs.
+HIT_BATCH_PAIRS = 1 << 16
+
+# Column defaults; NaN stands for a target heading of None.
+SUB_COLUMNS = {
+    "x": 0.0,
+    "y": 0.0,
+    "prev_x": 0.0,
+    "prev_y": 0.0,
+    "depth": 0.0,
+    "heading": 0.0,
+    "speed": 0.0,
+    "target_heading": math.nan,
+    "target_speed": 0.0,
+    "target_depth": 0.0,
+    "alive": True,
+}
+TORPEDO_COLUMNS = {
+    "x": 0.0,
+    "y": 0.0,
+    "prev_x": 0.0,
+    "prev_y": 0.0,
+    "depth": 0.0,
+    "heading": 0.0,
+}
+
+
+class Columns:
+    """
+    Growable arrays sharing one row numbering; rows [0, len) are in use.
+    Removal moves the last row into the freed one, like ``TorpedoPool``.
+    """
+
+    def __init__(self, defaults: Dict[str, object], capacity: int = 64):
+        self.defaults = defaults
+        self.arrays = {name: np.full(capacity, value) for name, value in defaults.items()}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self) -> int:
+        """Adds a row of defaults and returns its number."""
+        row = self._size
+        capacity = len(self.arrays["x"])
+        if row == capacity:
+            for name, values in self.arrays.items():
+                grown = np.full(capacity * 2, self.defaults[name])
+                grown[:capacity] = values
+                self.arrays[name] = grown
+        for name, value in self.defaults.items():
+            self.arrays[name][row] = value
+        self._size += 1
+        return row
+
+    def swap_remove(self, row: int) -> None:
+        last = self._size - 1
+        if row != last:
+            for values in self.arrays.values():
+                values[row] = values[last]
+        self._size = last
+
+    def detach(self, row: int) -> "Columns":
+        """A one-row copy of ``row``, for an entity leaving these columns."""
+        copy = Columns(self.defaults, capacity=1)
+        copy.append()
+        for name, values in self.arrays.items():
+            copy.arrays[name][0] = values[row]
+        return copy
+
+
+class _Column:
+    """Model attribute stored in row ``slot`` of the entity's ``columns``."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, entity, owner=None):
+        if entity is None:
+            return self
+        return entity.columns.arrays[self.name].item(entity.slot)
+
+    def __set__(self, entity, value):
+        entity.columns.arrays[self.name][entity.slot] = value
+
+
+class _OptionalColumn(_Column):
+    """A float column where NaN reads back as None."""
+
+    def __get__(self, entity, owner=None):
+        if entity is None:
+            return self
+        value = entity.columns.arrays[self.name].item(entity.slot)
+        return None if value != value else value
+
+    def __set__(self, entity, value):
+        entity.columns.arrays[self.name][entity.slot] = math.nan if value is None else value
+
+
+class ArraySubmarine(Submarine):
+    """A Submarine whose motion state is row ``slot`` of the backend's columns."""
+
+    _x = _Column("x")
+    _y = _Column("y")
+    prev_x = _Column("prev_x")
+    prev_y = _Column("prev_y")
+    depth = _Column("depth")
+    heading = _Column("heading")
+    speed = _Column("speed")
+    target_heading = _OptionalColumn("target_heading")
+    target_speed = _Column("target_speed")
+    target_depth = _Column("target_depth")
+    alive = _Column("alive")
+
+    def __init__(self, columns: Columns, sid, username, ctx):
+        self.columns = columns
+        self.slot = columns.append()
+        super().__init__(sid, username, ctx)
+
+
+class ArrayTorpedo(Torpedo):
+    """A Torpedo whose position, depth and heading are row ``slot`` of its pool's columns."""
+
+    __slots__ = ("columns",)
+
+    _x = _Column("x")
+    _y = _Column("y")
+    prev_x = _Column("prev_x")
+    prev_y = _Column("prev_y")
+    depth = _Column("depth")
+    heading = _Column("heading")
+
+    def __init__(self, columns: Columns):
+        self.columns = columns
+        self.index = None
+        self.slot = -1
+
+
+class ArrayTorpedoPool(TorpedoPool):
+    """A TorpedoPool keeping torpedo state in columns whose rows are the active slots."""
+
+    def __init__(self, ctx=None):
+        super().__init__(ctx)
+        self.columns = Columns(TORPEDO_COLUMNS)
+
+    def spawn(self, owner_id, x, y, depth, heading, torpedo_id=None, now=None) -> Torpedo:
+        if now is None:
+            now = self.ctx.now()
+        torp = self._free.pop() if self._free else ArrayTorpedo(self.columns)
+        torp.slot = self.columns.append()
+        self.active.append(torp)
+        torp.reset(self._issue_id(torpedo_id), owner_id, x, y, depth, heading, now)
+        return torp
+
+    def release(self, torp: Torpedo) -> None:
+        self.columns.swap_remove(torp.slot)
+        super().release(torp)
+
+
+def _wrap_position(values):
+    values = np.where(values < 0, values + WORLD_SIZE, values)
+    return np.where(values >= WORLD_SIZE, values - WORLD_SIZE, values)
+
+
+def _wrap_delta(delta):
+    half = WORLD_SIZE / 2.0
+    delta = np.where(delta > half, delta - WORLD_SIZE, delta)
+    return np.where(delta < -half, delta + WORLD_SIZE, delta)
+
+
+def _move_towards(current, target, max_delta):
+    return np.where(
+        current < target,
+        np.minimum(target, current + max_delta),
+        np.maximum(target, current - max_delta),
+    )
+
+
+def _within(xs, ys, x: float, y: float, radius: float):
+    dx = _wrap_delta(xs - x)
+    dy = _wrap_delta(ys - y)
+    return dx * dx + dy * dy <= radius * radius
+
+
+def _grid_coords(grid, values):
+    """Cell coordinates along one axis, as ``SpatialHash`` computes them."""
+    return np.floor_divide(values, grid.cell_size).astype(np.intp) % grid.cells_per_side
+
+
+def _cells(grid, x, y):
+    return _grid_coords(grid, x) * grid.cells_per_side + _grid_coords(grid, y)
+
+
+def _rebucket(grid, entities: List, rows, old_x, old_y, new_x, new_y) -> None:
+    """Re-buckets the entities at ``rows`` that moved into another cell of ``grid``."""
+    crossed = _cells(grid, old_x, old_y) != _cells(grid, new_x, new_y)
+    for row in rows[crossed].tolist():
+        entity = entities[row]
+        if entity.index is not None:
+            entity.index.move(entity.id, entity)
+    grid.touch()
+
+
+def _neighbour_pairs(grid, radius: float, tx, ty, sx, sy):
+    """
+    (torpedo, sub) index pairs whose cells are within ``radius`` of each
+    other on ``grid``, ordered by torpedo cell offset. Subs are sorted by
+    cell once; each neighbouring cell of every torpedo is then a range of
+    that order found with searchsorted.
+    """
+    n = grid.cells_per_side
+    reach = int(math.ceil(radius / grid.cell_size))
+    t_all = np.arange(len(tx))
+    if 2 * reach + 1 >= n:
+        # Every cell is in range; the grid can't narrow anything down.
+        return np.repeat(t_all, len(sx)), np.tile(np.arange(len(sx)), len(tx))
+
+    s_cells = _cells(grid, sx, sy)
+    order = np.argsort(s_cells, kind="stable")
+    sorted_cells = s_cells[order]
+    t_cx = _grid_coords(grid, tx)
+    t_cy = _grid_coords(grid, ty)
+
+    t_parts, s_parts = [], []
+    for ox in range(-reach, reach + 1):
+        column = (t_cx + ox) % n * n
+        for oy in range(-reach, reach + 1):
+            cells = column + (t_cy + oy) % n
+            lo = np.searchsorted(sorted_cells, cells, "left")
+            counts = np.searchsorted(sorted_cells, cells, "right") - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Row k of the range starting at lo[i] is order[lo[i] + k].
+            first = np.cumsum(counts) - counts
+            t_parts.append(np.repeat(t_all, counts))
+            s_parts.append(order[np.repeat(lo - first, counts) + np.arange(total)])
+    if not t_parts:
+        return t_all[:0], t_all[:0]
+    return np.concatenate(t_parts), np.concatenate(s_parts)
+
+
+def _sweep_hits(t_prev_x, t_prev_y, tx, ty, tdepth, s_prev_x, s_prev_y, sx, sy, sdepth, sheading):
+    """Element-wise ``physics.torpedo_sweep_hits_sub`` over paired arrays."""
+    heading_rad = np.radians(sheading)
+    axis_x = np.sin(heading_rad) * SUB_LENGTH
+    axis_y = -np.cos(heading_rad) * SUB_LENGTH
+    axis_sq = SUB_LENGTH * SUB_LENGTH
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Torpedo path in the sub's frame, relative to the hull axis start.
+        r_x = _wrap_delta(t_prev_x - s_prev_x) + axis_x / 2.0
+        r_y = _wrap_delta(t_prev_y - s_prev_y) + axis_y / 2.0
+        d_x = _wrap_delta(tx - t_prev_x) - _wrap_delta(sx - s_prev_x)
+        d_y = _wrap_delta(ty - t_prev_y) - _wrap_delta(sy - s_prev_y)
+
+        a = d_x * d_x + d_y * d_y
+        b = d_x * axis_x + d_y * axis_y
+        c = d_x * r_x + d_y * r_y
+        f = axis_x * r_x + axis_y * r_y
+        denom = a * axis_sq - b * b
+        moving = a > 1e-12
+
+        s = np.where(denom > 1e-12, np.clip((b * f - c * axis_sq) / denom, 0.0, 1.0), 0.0)
+        t = (b * s + f) / axis_sq
+        s_low = np.where(moving, np.clip(-c / a, 0.0, 1.0), 0.0)
+        s_high = np.where(moving, np.clip((b - c) / a, 0.0, 1.0), 0.0)
+        s = np.where(t < 0.0, s_low, np.where(t > 1.0, s_high, s))
+        t = np.clip(t, 0.0, 1.0)
+
+        gap_x = r_x + d_x * s - axis_x * t
+        gap_y = r_y + d_y * s - axis_y * t
+    dz = tdepth - sdepth
+    return gap_x * gap_x + gap_y * gap_y + dz * dz <= HIT_RADIUS * HIT_RADIUS
+
+
+class VectorizedBackend:
+    """
+    Owns a world's submarine columns and torpedo pool. The engine creates
+    subs through ``add_submarine`` and launches torpedoes from
+    ``torpedo_pool``, so every model it holds is a view onto these arrays.
+    """
+
+    def __init__(self, ctx=None):
+        if np is None:
+            raise ImportError("The 'numpy' engine backend requires numpy (pip install numpy)")
+        self.ctx = ctx
+        self.sub_columns = Columns(SUB_COLUMNS)
+        # Subs by row of sub_columns.
+        self.submarines: List[ArraySubmarine] = []
+        self.torpedo_pool = ArrayTorpedoPool(ctx)
+
+    def add_submarine(self, sid: str, username: str) -> ArraySubmarine:
+        sub = ArraySubmarine(self.sub_columns, sid, username, self.ctx)
+        self.submarines.append(sub)
+        return sub
+
+    def remove_submarine(self, sub: ArraySubmarine) -> None:
+        """Frees a departed sub's row; the object keeps a private copy of its state."""
+        slot = sub.slot
+        sub.columns = self.sub_columns.detach(slot)
+        sub.slot = 0
+        self.sub_columns.swap_remove(slot)
+        last = self.submarines.pop()
+        if last is not sub:
+            self.submarines[slot] = last
+            last.slot = slot
+
+    def torpedoes_near(self, x: float, y: float, radius: float) -> List[Torpedo]:
+        """Torpedoes within ``radius`` (horizontal, wrapped) of (x, y), in slot order."""
+        torps = self.torpedo_pool.active
+        cols = self.torpedo_pool.columns.arrays
+        near = _within(cols["x"][: len(torps)], cols["y"][: len(torps)], x, y, radius)
+        return [torps[row] for row in np.flatnonzero(near).tolist()]
+
+    def subs_near(self, x: float, y: float, radius: float) -> List[Submarine]:
+        """Living subs within ``radius`` (horizontal, wrapped) of (x, y), in row order."""
+        cols = self.sub_columns.arrays
+        count = len(self.submarines)
+        near = _within(cols["x"][:count], cols["y"][:count], x, y, radius) & cols["alive"][:count]
+        return [self.submarines[row] for row in np.flatnonzero(near).tolist()]
+
+    def step_submarines(self, subs: List, dt: float, grid) -> None:
+        """Advances the living subs among ``subs``; ``grid`` is the sub index."""
+        cols = self.sub_columns.arrays
+        rows = np.fromiter((s.slot for s in subs), dtype=np.intp, count=len(subs))
+        rows = rows[cols["alive"][rows]]
+        if not rows.size:
+            return
+
+        x = cols["x"][rows]
+        y = cols["y"][rows]
+        depth = cols["depth"][rows]
+        heading = cols["heading"][rows]
+        speed = cols["speed"][rows]
+        target_heading = cols["target_heading"][rows]
+
+        # Heading inertia
+        target_h = np.where(np.isnan(target_heading), heading, target_heading)
+        turn_amount = min(max(MAX_TURN_RATE * dt, 0.0), 360.0)
+        diff = np.remainder(target_h - heading + 180.0, 360.0) - 180.0
+        heading = np.where(
+            np.abs(diff) < turn_amount,
+            np.remainder(target_h, 360.0),
+            np.remainder(heading + np.copysign(turn_amount, diff), 360.0),
+        )
+
+        # Speed inertia
+        target_s = np.clip(cols["target_speed"][rows], 0.0, SUB_MAX_SPEED)
+        speed = _move_towards(speed, target_s, MAX_ACCELERATION * dt)
+
+        # Depth change
+        target_d = np.clip(cols["target_depth"][rows], 0.0, MAX_DEPTH)
+        dive_rate = BASE_DIVE_RATE + speed * DIVE_RATE_PER_SPEED
+        depth = np.clip(_move_towards(depth, target_d, dive_rate * dt), 0.0, MAX_DEPTH)
+
+        # Movement
+        travel = np.clip(speed, 0.0, SUB_MAX_SPEED)
+        heading_rad = np.radians(heading)
+        new_x = _wrap_position(x + np.sin(heading_rad) * travel * dt)
+        new_y = _wrap_position(y - np.cos(heading_rad) * travel * dt)
+
+        cols["heading"][rows] = heading
+        cols["speed"][rows] = speed
+        cols["depth"][rows] = depth
+        cols["prev_x"][rows] = x
+        cols["prev_y"][rows] = y
+        cols["x"][rows] = new_x
+        cols["y"][rows] = new_y
+        _rebucket(grid, self.submarines, rows, x, y, new_x, new_y)
+
+    def step_torpedoes(self, dt: float, grid) -> None:
+        """Advances every torpedo in flight; ``grid`` is the torpedo index."""
+        count = len(self.torpedo_pool.active)
+        if not count:
+            return
+        cols = self.torpedo_pool.columns.arrays
+        x = cols["x"][:count].copy()
+        y = cols["y"][:count].copy()
+        heading_rad = np.radians(cols["heading"][:count])
+        new_x = _wrap_position(x + np.sin(heading_rad) * TORPEDO_SPEED * dt)
+        new_y = _wrap_position(y - np.cos(heading_rad) * TORPEDO_SPEED * dt)
+
+        cols["prev_x"][:count] = x
+        cols["prev_y"][:count] = y
+        cols["x"][:count] = new_x
+        cols["y"][:count] = new_y
+        _rebucket(grid, self.torpedo_pool.active, np.arange(count), x, y, new_x, new_y)
+
+    def hit_pairs(self, grid, radius: float) -> List[Tuple]:
+        """
+        Swept capsule test (see ``physics.torpedo_sweep_hits_sub``) of every
+        torpedo's path this step against the living subs within ``radius`` of
+        it on ``grid``. Returns (torpedo, sub) pairs in contact, ordered by
+        torpedo then sub, leaving out torpedoes meeting their own sub.
+        """
+        torps = self.torpedo_pool.active
+        t_count = len(torps)
+        s_cols = self.sub_columns.arrays
+        living = np.flatnonzero(s_cols["alive"][: len(self.submarines)])
+        if not t_count or not living.size:
+            return []
+
+        t_cols = self.torpedo_pool.columns.arrays
+        t_x = t_cols["x"][:t_count]
+        t_y = t_cols["y"][:t_count]
+        t_rows, s_pos = _neighbour_pairs(grid, radius, t_x, t_y, s_cols["x"][living], s_cols["y"][living])
+        s_rows = living[s_pos]
+
+        hit_t, hit_s = [], []
+        for start in range(0, len(t_rows), HIT_BATCH_PAIRS):
+            t = t_rows[start : start + HIT_BATCH_PAIRS]
+            s = s_rows[start : start + HIT_BATCH_PAIRS]
+            hit = _sweep_hits(
+                t_cols["prev_x"][t], t_cols["prev_y"][t], t_x[t], t_y[t], t_cols["depth"][t],
+                s_cols["prev_x"][s], s_cols["prev_y"][s], s_cols["x"][s], s_cols["y"][s],
+                s_cols["depth"][s], s_cols["heading"][s],
+            )
+            hit_t.append(t[hit])
+            hit_s.append(s[hit])
+        if not hit_t:
+            return []
+        hit_t = np.concatenate(hit_t)
+        hit_s = np.concatenate(hit_s)
+        order = np.lexsort((hit_s, hit_t))
+
+        subs = self.submarines
+        pairs = []
+        for ti, si in zip(hit_t[order].tolist(), hit_s[order].tolist()):
+            torp, sub = torps[ti], subs[si]
+            if torp.owner_id != sub.id:
+                pairs.append((torp, sub))
+        return pairs
@@ -0,0 +1,399 @@
+"""
+Compact binary wire format.
+
+Clients that negotiate ``encoding: "binary"`` on join receive ``state_update``,
+``sonar_result`` and ``sonar_ping_detected`` as packed
+little-endian structs instead of JSON. The binary frames carry exactly the
+same messages as the JSON protocol (see ``game.protocol``), with:
+
+* coordinates, depths, angles and ranges quantized to 16-bit integers;
+* sub and torpedo ids replaced by 16-bit handles (0 = unknown);
+* usernames omitted and resolved client-side from the handle -> name table
+  the server sends as ``entity_names`` (JSON) when subs join.
+
+Records and collection entries are a field-presence bitmask followed by the
+present fields' values in schema order. ``static/main.js`` mirrors the
+schemas below; keep the two in sync and bump ``WIRE_VERSION`` on change.
+"""
+import math
+import struct
+from typing import Dict, Hashable, List, Optional
+
+from .constants import WORLD_SIZE, MAX_DEPTH
+
+WIRE_VERSION = 3
+ENCODINGS = ("binary", "json")  # in order of server preference
+
+MAX_HANDLE = 0xFFFF
+NO_HANDLE = 0
+
+# Field kinds: (struct code, scale). Values are stored as round(value / scale);
+# a scale of None means the value is written as-is.
+FIELD_KINDS = {
+    "sub": ("H", None),
+    "torp": ("H", None),
+    "name": (None, None),  # not transmitted; derived from the entry's id
+    "pos": ("H", WORLD_SIZE / MAX_HANDLE),
+    "depth": ("H", MAX_DEPTH / MAX_HANDLE),
+    "angle": ("H", 360.0 / 65536),
+    "speed": ("H", 0.01),
+    "range": ("H", 0.1),
+    "bool": ("B", None),
+    "time": ("d", None),
+}
+
+YOU_FIELDS = (
+    ("id", "sub"),
+    ("username", "name"),
+    ("x", "pos"),
+    ("y", "pos"),
+    ("depth", "depth"),
+    ("heading", "angle"),
+    ("speed", "speed"),
+    ("alive", "bool"),
+    ("respawn_at", "time"),
+    ("respawn_ready", "bool"),
+)
+TORPEDO_FIELDS = (
+    ("id", "torp"),
+    ("owner", "sub"),
+    ("x", "pos"),
+    ("y", "pos"),
+    ("depth", "depth"),
+    ("heading", "angle"),
+    ("created_at", "time"),
+    ("expires_at", "time"),
+)
+SONAR_CONTACT_FIELDS = (
+    ("id", "sub"),
+    ("username", "name"),
+    ("x", "pos"),
+    ("y", "pos"),
+    ("depth", "depth"),
+)
+PASSIVE_CONTACT_FIELDS = (
+    ("id", "sub"),
+    ("username", "name"),
+    ("distance", "range"),
+    ("bearing", "angle"),
+    ("depth", "depth"),
+)
+PING_CONTACT_FIELDS = (
+    ("id", "sub"),
+    ("username", "name"),
+    ("distance", "range"),
+    ("bearing", "angle"),
+    ("depth", "depth"),
+)
+
+# Stream schemas: ordered (section, kind, fields).
+PLAYER_STREAM = (
+    ("you", "record", YOU_FIELDS),
+    ("sonar_contacts", "collection", SONAR_CONTACT_FIELDS),
+    ("passive_contacts", "collection", PASSIVE_CONTACT_FIELDS),
+    ("torpedoes", "collection", TORPEDO_FIELDS),
+)
+
+_HEADER = struct.Struct("<BBIIIB")  # version, flags, seq, base, tick, section mask
+_FLAG_KEYFRAME = 1
+
+
+class HandleTable:
+    """
+    Maps ids to small integer handles. Handles are allocated round-robin and
+    a released handle keeps resolving to its old id until it is reassigned,
+    so late references in delta patches (e.g. a removal) still decode.
+    """
+
+    def __init__(self, size: int = MAX_HANDLE):
+        self.size = size
+        self._handle_of: Dict[Hashable, int] = {}
+        self._id_of: Dict[int, Hashable] = {}
+        self._live = set()
+        self._next = NO_HANDLE
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def get(self, entity_id) -> int:
+        return self._handle_of.get(entity_id, NO_HANDLE)
+
+    def acquire(self, entity_id) -> int:
+        handle = self._handle_of.get(entity_id)
+        if handle is not None:
+            self._live.add(handle)
+            return handle
+        if len(self._live) >= self.size:
+            raise OverflowError("out of wire handles")
+        while True:
+            self._next = self._next % self.size + 1
+            if self._next not in self._live:
+                break
+        handle = self._next
+        stale = self._id_of.pop(handle, None)
+        if stale is not None:
+            del self._handle_of[stale]
+        self._handle_of[entity_id] = handle
+        self._id_of[handle] = entity_id
+        self._live.add(handle)
+        return handle
+
+    def release(self, entity_id) -> None:
+        self._live.discard(self._handle_of.get(entity_id))
+
+    def retain(self, entity_ids) -> None:
+        """Marks exactly ``entity_ids`` as live, releasing everything else."""
+        self._live = {self.acquire(entity_id) for entity_id in entity_ids}
+
+
+class _Writer:
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def pack(self, fmt: str, *values) -> None:
+        self.parts.append(struct.pack("<" + fmt, *values))
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, fmt: str):
+        fmt = "<" + fmt
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+
+class WireCodec:
+    """Binary encoder/decoder for one world's entity handles."""
+
+    def __init__(self):
+        self.subs = HandleTable()
+        self.torpedoes = HandleTable()
+        self.names: Dict[int, str] = {}
+
+    # -- entity bookkeeping -------------------------------------------------
+    def register_sub(self, sid: str, username: str) -> Dict[int, str]:
+        """Assigns a handle to a joining sub; returns the name entry to publish."""
+        handle = self.subs.acquire(sid)
+        self.names[handle] = username
+        return {handle: username}
+
+    def release_sub(self, sid: str) -> None:
+        self.subs.release(sid)
+
+    def sync_torpedoes(self, torpedo_ids) -> None:
+        """
+        Keeps handles live for exactly the torpedoes still in the world. Each
+        player sees a different subset, so handle lifetime follows the world
+        rather than any one stream.
+        """
+        self.torpedoes.retain(torpedo_ids)
+
+    # -- values ------------------------------------------------------------
+    def _handle(self, kind: str, value, allocate: bool) -> int:
+        table = self.subs if kind == "sub" else self.torpedoes
+        if allocate and kind == "torp":
+            return table.acquire(value)
+        return table.get(value)
+
+    def _write_value(self, out: _Writer, kind: str, value, allocate: bool) -> None:
+        code, scale = FIELD_KINDS[kind]
+        if code is None:
+            return
+        if kind in ("sub", "torp"):
+            value = self._handle(kind, value, allocate)
+        elif kind == "time":
+            value = float("nan") if value is None else float(value)
+        elif kind == "bool":
+            value = 1 if value else 0
+        else:
+            if kind == "angle":
+                value = float(value) % 360.0
+            value = min(MAX_HANDLE, max(0, int(round(float(value) / scale))))
+        out.pack(code, value)
+
+    def _read_value(self, reader: _Reader, kind: str, entry: dict):
+        code, scale = FIELD_KINDS[kind]
+        if code is None:
+            return self.names.get(entry.get("id"), "Unknown")
+        (value,) = reader.unpack(code)
+        if kind == "time":
+            return None if math.isnan(value) else value
+        if kind == "bool":
+            return bool(value)
+        if scale is not None:
+            return value * scale
+        return value
+
+    # -- records -------------------------------------------------------------
+    def _write_record(self, out: _Writer, fields, record: dict, allocate: bool = False) -> None:
+        mask = 0
+        for bit, (name, _) in enumerate(fields):
+            if name in record:
+                mask |= 1 << bit
+        out.pack("H", mask)
+        for name, kind in fields:
+            if name in record:
+                self._write_value(out, kind, record[name], allocate)
+
+    def _read_record(self, reader: _Reader, fields) -> dict:
+        (mask,) = reader.unpack("H")
+        record = {}
+        for bit, (name, kind) in enumerate(fields):
+            if mask & (1 << bit):
+                record[name] = self._read_value(reader, kind, record)
+        return record
+
+    def _write_mask(self, out: _Writer, fields, names) -> None:
+        mask = 0
+        for bit, (name, _) in enumerate(fields):
+            if name in names:
+                mask |= 1 << bit
+        out.pack("H", mask)
+
+    def _read_mask(self, reader: _Reader, fields) -> List[str]:
+        (mask,) = reader.unpack("H")
+        return [name for bit, (name, _) in enumerate(fields) if mask & (1 << bit)]
+
+    def _write_entries(self, out: _Writer, fields, entries, allocate: bool) -> None:
+        out.pack("H", len(entries))
+        for entry in entries:
+            self._write_record(out, fields, entry, allocate)
+
+    def _read_entries(self, reader: _Reader, fields) -> List[dict]:
+        (count,) = reader.unpack("H")
+        return [self._read_record(reader, fields) for _ in range(count)]
+
+    # -- stream messages -----------------------------------------------------
+    def encode_stream(self, schema, message: dict) -> bytes:
+        """Packs a DeltaEncoder message (keyframe or delta) for ``schema``."""
+        out = _Writer()
+        keyframe = bool(message.get("key"))
+        body = message["state"] if keyframe else message["patch"]
+        mask = 0
+        for bit, (section, _, _) in enumerate(schema):
+            if section in body:
+                mask |= 1 << bit
+        out.parts.append(
+            _HEADER.pack(
+                WIRE_VERSION,
+                _FLAG_KEYFRAME if keyframe else 0,
+                message["seq"],
+                0 if keyframe else message["base"],
+                message.get("tick", 0),
+                mask,
+            )
+        )
+
+        for section, kind, fields in schema:
+            if section not in body:
+                continue
+            value = body[section]
+            id_kind = fields[0][1]
+            if kind == "record":
+                if keyframe or "set" not in value and "unset" not in value:
+                    value = {"set": value}
+                self._write_record(out, fields, value.get("set", {}))
+                self._write_mask(out, fields, value.get("unset", ()))
+            elif keyframe or isinstance(value, list):
+                # A whole collection is sent as additions only.
+                self._write_entries(out, fields, value, allocate=True)
+                out.pack("HH", 0, 0)
+            else:
+                added = value.get("add", [])
+                self._write_entries(out, fields, added, allocate=True)
+                self._write_entries(out, fields, value.get("upd", []), allocate=False)
+                removed = value.get("del", [])
+                out.pack("H", len(removed))
+                for entry_id in removed:
+                    out.pack("H", self._handle(id_kind, entry_id, allocate=False))
+        return out.getvalue()
+
+    def decode_stream(self, schema, data: bytes) -> dict:
+        reader = _Reader(data)
+        version, flags, seq, base, tick, mask = _HEADER.unpack_from(reader.data, 0)
+        reader.offset = _HEADER.size
+        if version != WIRE_VERSION:
+            raise ValueError(f"unsupported wire version {version}")
+        keyframe = bool(flags & _FLAG_KEYFRAME)
+
+        body = {}
+        for bit, (section, kind, fields) in enumerate(schema):
+            if not mask & (1 << bit):
+                continue
+            if kind == "record":
+                record = self._read_record(reader, fields)
+                unset = self._read_mask(reader, fields)
+                if keyframe:
+                    body[section] = record
+                else:
+                    patch = {}
+                    if record:
+                        patch["set"] = record
+                    if unset:
+                        patch["unset"] = unset
+                    body[section] = patch
+            else:
+                added = self._read_entries(reader, fields)
+                updated = self._read_entries(reader, fields)
+                (count,) = reader.unpack("H")
+                removed = [reader.unpack("H")[0] for _ in range(count)]
+                if keyframe:
+                    body[section] = added
+                else:
+                    patch = {}
+                    if added:
+                        patch["add"] = added
+                    if updated:
+                        patch["upd"] = updated
+                    if removed:
+                        patch["del"] = removed
+                    body[section] = patch
+
+        if keyframe:
+            return {"v": 1, "seq": seq, "key": True, "state": body, "tick": tick}
+        return {"v": 1, "seq": seq, "base": base, "patch": body, "tick": tick}
+
+    # -- sonar events --------------------------------------------------------
+    def encode_sonar_result(self, contacts: List[dict]) -> bytes:
+        out = _Writer()
+        out.pack("B", WIRE_VERSION)
+        self._write_entries(out, PING_CONTACT_FIELDS, contacts, allocate=False)
+        return out.getvalue()
+
+    def decode_sonar_result(self, data: bytes) -> dict:
+        reader = _Reader(data)
+        reader.unpack("B")
+        return {"contacts": self._read_entries(reader, PING_CONTACT_FIELDS)}
+
+    def encode_ping_detected(self, pinging_id: str, approx_distance: float) -> bytes:
+        out = _Writer()
+        out.pack("B", WIRE_VERSION)
+        self._write_value(out, "sub", pinging_id, allocate=False)
+        self._write_value(out, "range", approx_distance, allocate=False)
+        return out.getvalue()
+
+    def decode_ping_detected(self, data: bytes) -> dict:
+        reader = _Reader(data)
+        reader.unpack("B")
+        (handle,) = reader.unpack("H")
+        entry = {"id": handle}
+        return {
+            "pinging_id": handle,
+            "pinging_username": self._read_value(reader, "name", entry),
+            "approx_distance": self._read_value(reader, "range", entry),
+        }
+
+
+def negotiate(offered: Optional[List[str]]) -> str:
+    """Picks the first server-preferred encoding the client offered."""
+    for encoding in ENCODINGS:
+        if offered and encoding in offered:
+            return encoding
+    return "json"
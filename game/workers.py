@@ -0,0 +1,168 @@
+"""
+Process-pool arena execution.
+
+Arenas are independent, so they can be simulated in separate processes to
+get past the GIL. ``ArenaPool`` is a drop-in replacement for ``ArenaManager``
+that keeps the routing (which player is in which arena, auto-balancing,
+tick slots) in the Socket.IO process, while each arena's ``Arena`` object
+lives in one of N worker processes.
+
+Commands travel to the workers over pipes and never block the caller. Each
+worker replies with batches of ``Outbound`` messages whose binary payloads
+are already wire-encoded, and the front process only relays them (see
+``receive``).
+"""
+import multiprocessing
+import threading
+from typing import Dict, List, Optional, Set
+
+from .arena import Arena, ArenaManager, Outbound
+from .wire import negotiate
+
+
+def serve_arenas(conn, backend: str = "object") -> None:
+    """Worker process main loop: runs commands against its arenas until closed."""
+    arenas: Dict[str, Arena] = {}
+    while True:
+        try:
+            command = conn.recv()
+        except EOFError:
+            return
+        if command is None:
+            return
+        op, name, args = command
+        if op == "open":
+            arenas[name] = Arena(name, backend=backend)
+            continue
+        arena = arenas.get(name)
+        if arena is None:
+            continue
+        if op == "close":
+            del arenas[name]
+            continue
+        messages = getattr(arena, op)(*args)
+        if messages:
+            conn.send((name, arena.engine.dropped_steps, messages))
+        elif op == "tick":
+            conn.send((name, arena.engine.dropped_steps, []))
+
+
+class ArenaProxy:
+    """
+    Front-process stand-in for an Arena running in a worker. Mirrors enough
+    membership state (players and their encodings) to answer ``len`` and
+    ``rooms_for`` locally; every other call is forwarded and returns no
+    messages, since replies arrive asynchronously through the pool.
+    """
+
+    def __init__(self, name: str, worker: "_Worker"):
+        self.name = name
+        self.room = f"arena:{name}"
+        self.worker = worker
+        self.slot = 0
+        self.encodings: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.encodings)
+
+    encoding_room = Arena.encoding_room
+    rooms_for = Arena.rooms_for
+
+    def _forward(self, op: str, *args) -> List[Outbound]:
+        self.worker.send((op, self.name, args))
+        return []
+
+    def join(
+        self, sid: str, username: str, encodings=None, token: Optional[str] = None
+    ) -> List[Outbound]:
+        self.encodings[sid] = negotiate(encodings)
+        return self._forward("join", sid, username, encodings, token)
+
+    def leave(self, sid: str) -> List[Outbound]:
+        self.encodings.pop(sid, None)
+        return self._forward("leave", sid)
+
+    def ack_state(self, sid: str, seq) -> None:
+        self._forward("ack_state", sid, seq)
+
+    def request_keyframe(self, sid: str, stream: Optional[str]) -> List[Outbound]:
+        return self._forward("request_keyframe", sid, stream)
+
+    def update_controls(self, sid: str, data: dict) -> List[Outbound]:
+        return self._forward("update_controls", sid, data)
+
+    def sonar_ping(self, sid: str) -> List[Outbound]:
+        return self._forward("sonar_ping", sid)
+
+    def fire_torpedo(self, sid: str, data: Optional[dict] = None) -> List[Outbound]:
+        return self._forward("fire_torpedo", sid, data)
+
+    def request_respawn(self, sid: str) -> List[Outbound]:
+        return self._forward("request_respawn", sid)
+
+    def tick(self) -> List[Outbound]:
+        return self._forward("tick")
+
+
+class _Worker:
+    def __init__(self, context, backend: str):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=serve_arenas, args=(child_conn, backend), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        # Socket.IO handlers and the game loop send from different threads.
+        self.lock = threading.Lock()
+        self.arenas: Set[str] = set()
+        self.dropped_steps: Dict[str, int] = {}
+
+    def send(self, command) -> None:
+        with self.lock:
+            self.conn.send(command)
+
+
+class ArenaPool(ArenaManager):
+    def __init__(self, processes: int, start_method: str = "spawn", **kwargs):
+        if kwargs.get("state_dir") or kwargs.get("replay_dir"):
+            raise ValueError(
+                "arena journals and recordings are only kept by the in-process ArenaManager"
+            )
+        super().__init__(**kwargs)
+        context = multiprocessing.get_context(start_method)
+        self.workers = [_Worker(context, self.backend) for _ in range(processes)]
+
+    def _new_arena(self, name: str) -> ArenaProxy:
+        worker = min(self.workers, key=lambda w: len(w.arenas))
+        worker.arenas.add(name)
+        worker.send(("open", name, ()))
+        return ArenaProxy(name, worker)
+
+    def _discard(self, arena: ArenaProxy) -> None:
+        super()._discard(arena)
+        arena.worker.arenas.discard(arena.name)
+        arena.worker.dropped_steps.pop(arena.name, None)
+        arena.worker.send(("close", arena.name, ()))
+
+    def receive(self, index: int, timeout: Optional[float] = None) -> List[Outbound]:
+        """
+        Waits for the next batch of messages from worker ``index``. Run one
+        receiver per worker (for example a background task looping over this
+        and relaying the result). Returns [] on timeout.
+        """
+        worker = self.workers[index]
+        if timeout is not None and not worker.conn.poll(timeout):
+            return []
+        name, dropped, messages = worker.conn.recv()
+        if name in worker.arenas:
+            worker.dropped_steps[name] = dropped
+        return messages
+
+    @property
+    def dropped_steps(self) -> int:
+        return sum(sum(w.dropped_steps.values()) for w in self.workers)
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.send(None)
+            worker.process.join(timeout=1.0)
@@ -0,0 +1,178 @@
+"""
+Asyncio server: the same game as ``app.py`` on a single event loop.
+
+Every connection is a coroutine rather than an OS thread, and the loop is the
+only thing that touches the arenas, so no locking is needed. Player inputs
+are buffered by each engine and applied at its next update (see
+``game.commands``); each frame's outgoing messages are emitted concurrently.
+
+Run with ``python server_async.py``; the arena manager is configured as for
+app.py (see ``game.launch``).
+"""
+import asyncio
+import hmac
+import logging
+import os
+import time
+
+import socketio
+from aiohttp import web
+
+from game.constants import TICK_RATE
+from game.launch import make_arenas
+from game.metrics import METRICS
+from game.scheduler import TickTimer
+from game.workers import ArenaPool
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")  # see app.py
+logger = logging.getLogger(__name__)
+
+sio = socketio.AsyncServer(async_mode="aiohttp")
+app = web.Application()
+sio.attach(app)
+
+# Built on startup, see game.launch.
+arenas = None
+
+
+async def relay(messages):
+    for m in messages:
+        METRICS.inc("messages_emitted_total", event=m.event)
+        payload = m.payload["state"] if m.event == "tick_events" else m.payload
+        if isinstance(payload, bytes):
+            METRICS.inc("bytes_emitted_total", len(payload))
+    await asyncio.gather(
+        *(
+            sio.emit(m.event, m.payload, room=m.to, skip_sid=m.skip_sid)
+            for m in messages
+        )
+    )
+
+
+# -----------------------------------------------------------------------------
+# Game Loop
+# -----------------------------------------------------------------------------
+async def game_loop():
+    # See app.game_loop: arenas are staggered over ARENA_TICK_SLOTS slots.
+    timer = TickTimer(TICK_RATE * arenas.slots)
+    while True:
+        start = time.perf_counter()
+        messages = arenas.tick()
+        emitting = time.perf_counter()
+        await relay(messages)
+        METRICS.observe("phase_seconds", time.perf_counter() - emitting, phase="emit")
+        METRICS.observe("tick_seconds", time.perf_counter() - start)
+        METRICS.set("connected_players", len(arenas.player_arena))
+        METRICS.set("arenas", len(arenas.arenas))
+
+        if timer.advance():
+            METRICS.inc("tick_overruns_total")
+            logger.warning(
+                "Tick overran by %.1f ms (%d overruns, %d simulation steps dropped)",
+                timer.last_overrun * 1000.0,
+                timer.overruns,
+                arenas.dropped_steps,
+            )
+        await asyncio.sleep(timer.remaining())
+
+
+async def worker_relay(index):
+    loop = asyncio.get_running_loop()
+    while True:
+        await relay(await loop.run_in_executor(None, arenas.receive, index))
+
+
+async def start_background_tasks(app):
+    global arenas
+    arenas = make_arenas()
+    if isinstance(arenas, ArenaPool):
+        for index in range(len(arenas.workers)):
+            asyncio.ensure_future(worker_relay(index))
+    asyncio.ensure_future(game_loop())
+
+
+async def close_arenas(app):
+    arenas.close()
+
+
+# -----------------------------------------------------------------------------
+# HTTP routes
+# -----------------------------------------------------------------------------
+async def index(request):
+    return web.FileResponse(os.path.join(STATIC_DIR, "index.html"))
+
+
+async def metrics(request):
+    METRICS.set("dropped_steps", arenas.dropped_steps)
+    return web.Response(text=METRICS.render(), content_type="text/plain")
+
+
+async def announce(request):
+    if not ADMIN_TOKEN or not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {ADMIN_TOKEN}".encode()
+    ):
+        raise web.HTTPNotFound()
+    try:
+        message = (await request.json()).get("message")
+    except (ValueError, AttributeError):
+        message = None
+    if not isinstance(message, str) or not message.strip():
+        raise web.HTTPBadRequest()
+    await relay(arenas.announce(message.strip()))
+    return web.json_response({"status": "sent"})
+
+
+app.router.add_get("/", index)
+app.router.add_get("/metrics", metrics)
+app.router.add_post("/admin/announce", announce)
+app.router.add_static("/static", STATIC_DIR)
+app.on_startup.append(start_background_tasks)
+app.on_cleanup.append(close_arenas)
+
+
+# -----------------------------------------------------------------------------
+# Socket.IO events
+# -----------------------------------------------------------------------------
+@sio.event
+async def connect(sid, environ):
+    await sio.emit("connected", {"message": "Connected to U-Boat server"}, room=sid)
+
+
+@sio.event
+async def disconnect(sid):
+    await relay(arenas.leave(sid))
+
+
+@sio.event
+async def join_game(sid, data):
+    data = data or {}
+    previous = arenas.arena_for(sid)
+    if previous:
+        for room in previous.rooms_for(sid):
+            await sio.leave_room(sid, room)
+    arena, messages = arenas.join(
+        sid,
+        data.get("username", "Captain"),
+        arena_name=data.get("arena"),
+        encodings=data.get("encodings"),
+        token=data.get("token"),
+    )
+    if arena:  # None when redirected to another node
+        for room in arena.rooms_for(sid):
+            await sio.enter_room(sid, room)
+    await relay(messages)
+
+
+@sio.on("*")
+async def player_event(event, sid, data=None):
+    try:
+        messages = arenas.dispatch(sid, event, data)
+    except ValueError:
+        return
+    await relay(messages)
+
+
+# -----------------------------------------------------------------------------
+if __name__ == "__main__":
+    web.run_app(app, host="0.0.0.0", port=5000)
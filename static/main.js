@@ -2,6 +2,117 @@ let socket;
 let playerId = null;
 let username = null;
 let latestState = null;
+let worldConfig = {};
+
+// Delta-compressed state streams (see game/protocol.py).
+const PROTOCOL_VERSION = 1;
+const STREAM_HISTORY = 32;
+
+class StreamDecoder {
+  constructor() {
+    this.states = new Map();
+    this.seq = null;
+    this.resyncRequested = false;
+  }
+
+  get state() {
+    return this.seq === null ? null : this.states.get(this.seq);
+  }
+
+  // Returns false when the message cannot be applied and a keyframe is needed.
+  apply(message) {
+    if (!message || message.v !== PROTOCOL_VERSION) return false;
+    let next;
+    if (message.key) {
+      next = message.state;
+      this.resyncRequested = false;
+    } else {
+      const base = this.states.get(message.base);
+      if (!base) return false;
+      next = applyPatch(base, message.patch);
+    }
+    this.states.set(message.seq, next);
+    this.seq = message.seq;
+    while (this.states.size > STREAM_HISTORY) {
+      this.states.delete(this.states.keys().next().value);
+    }
+    return true;
+  }
+}
+
+const playerStream = new StreamDecoder();
+
+// Snapshot interpolation. Every state_update is stamped with the simulation
+// tick it was sampled at. The map is drawn slightly in the past, blending the
+// two buffered snapshots around the render time, and is dead-reckoned from
+// heading and speed when the next snapshot is late. This keeps motion smooth
+// at a low server broadcast rate.
+const SNAPSHOT_BUFFER = 8;
+const INTERPOLATION_DELAY = 1.2; // in broadcast intervals
+const MAX_EXTRAPOLATION = 0.5; // seconds of dead-reckoning before freezing
+const TELEPORT_DISTANCE = 100; // larger jumps (e.g. respawns) snap instead of sliding
+const snapshots = [];
+let clockOffset = null; // server simulation time minus local time, seconds
+
+// Compact binary wire format (see game/wire.py; keep the schemas in sync).
+const WIRE_VERSION = 3;
+const MAX_HANDLE = 0xffff;
+const entityNames = {};
+
+const YOU_FIELDS = [
+  ["id", "sub"], ["username", "name"], ["x", "pos"], ["y", "pos"], ["depth", "depth"],
+  ["heading", "angle"], ["speed", "speed"], ["alive", "bool"], ["respawn_at", "time"],
+  ["respawn_ready", "bool"],
+];
+const TORPEDO_FIELDS = [
+  ["id", "torp"], ["owner", "sub"], ["x", "pos"], ["y", "pos"], ["depth", "depth"],
+  ["heading", "angle"], ["created_at", "time"], ["expires_at", "time"],
+];
+const SONAR_CONTACT_FIELDS = [
+  ["id", "sub"], ["username", "name"], ["x", "pos"], ["y", "pos"], ["depth", "depth"],
+];
+const PASSIVE_CONTACT_FIELDS = [
+  ["id", "sub"], ["username", "name"], ["distance", "range"], ["bearing", "angle"], ["depth", "depth"],
+];
+const PING_CONTACT_FIELDS = PASSIVE_CONTACT_FIELDS;
+
+const PLAYER_STREAM = [
+  ["you", "record", YOU_FIELDS],
+  ["sonar_contacts", "collection", SONAR_CONTACT_FIELDS],
+  ["passive_contacts", "collection", PASSIVE_CONTACT_FIELDS],
+  ["torpedoes", "collection", TORPEDO_FIELDS],
+];
+
+class WireReader {
+  constructor(buffer) {
+    this.view = new DataView(buffer);
+    this.offset = 0;
+  }
+
+  u8() {
+    const value = this.view.getUint8(this.offset);
+    this.offset += 1;
+    return value;
+  }
+
+  u16() {
+    const value = this.view.getUint16(this.offset, true);
+    this.offset += 2;
+    return value;
+  }
+
+  u32() {
+    const value = this.view.getUint32(this.offset, true);
+    this.offset += 4;
+    return value;
+  }
+
+  f64() {
+    const value = this.view.getFloat64(this.offset, true);
+    this.offset += 8;
+    return value;
+  }
+}
 const sonarBlips = [];
 let sweepAngle = 0;
 let lastFrameTime = performance.now();
@@ -80,14 +191,34 @@ function connectSocket() {
     statusText.textContent = data.message;
   });
 
+  // After a server restart the client reconnects with a new sid; rejoining
+  // with the session token hands our restored sub back to us.
+  socket.on("connect", () => {
+    if (playerId !== null) joinGame(username);
+  });
+
   socket.on("joined", (data) => {
     playerId = data.id;
     username = data.username;
+    if (data.token) sessionStorage.setItem("sessionToken", data.token);
+    if (data.arena) sessionStorage.setItem("arena", data.arena);
     statusText.textContent = `You are ${username}`;
   });
 
-  socket.on("state_update", (data) => {
-    latestState = data;
+  // The arena is run by another server of the cluster; continue there.
+  socket.on("redirect", (data) => {
+    const params = new URLSearchParams({ arena: data.arena, name: usernameInput.value });
+    if (data.token) params.set("token", data.token);
+    window.location.assign(`${data.url}/?${params}`);
+  });
+
+  socket.on("join_rejected", (data) => {
+    statusText.textContent = data.message;
+  });
+
+  // Static world parameters arrive once per session.
+  socket.on("world_config", (data) => {
+    worldConfig = data;
     if (data.max_depth) {
       depthSlider.max = data.max_depth;
     }
@@ -100,6 +231,28 @@ function connectSocket() {
     if (typeof data.sub_max_speed === "number") {
       SUB_MAX_SPEED_CLIENT = data.sub_max_speed;
     }
+  });
+
+  // Handle -> username table for binary frames.
+  socket.on("entity_names", (names) => {
+    Object.assign(entityNames, names);
+  });
+
+  // A tick's events for us arrive bundled with its state update; hand each
+  // to its usual handler, events first.
+  socket.on("tick_events", (bundle) => {
+    for (const [event, payload] of bundle.events) deliver(event, payload);
+    if (bundle.state) deliver("state_update", bundle.state);
+  });
+
+  // Personal envelope: own sub, sonar contacts and nearby torpedoes.
+  socket.on("state_update", (message) => {
+    if (message instanceof ArrayBuffer) message = decodeWireStream(PLAYER_STREAM, message);
+    if (!applyStreamMessage(playerStream, message, "state")) return;
+    socket.emit("state_ack", { seq: message.seq });
+    const data = playerStream.state;
+    latestState = { ...worldConfig, ...data };
+    if (typeof message.tick === "number") recordSnapshot(message.tick, data);
 
     // Update Actuals
     if (data.you && data.you.alive) {
@@ -154,6 +307,7 @@ function connectSocket() {
   });
 
   socket.on("sonar_result", (data) => {
+    if (data instanceof ArrayBuffer) data = decodeWireSonarResult(data);
     const now = performance.now();
     sonarBlips.length = 0;
     if (data.contacts.length === 0) {
@@ -176,12 +330,299 @@ function connectSocket() {
   });
 
   socket.on("sonar_ping_detected", (data) => {
+    if (data instanceof ArrayBuffer) data = decodeWirePingDetected(data);
     addMessage(`Sonar ping detected from ${data.pinging_username}!`);
   });
 
   socket.on("torpedo_fired", () => {
     addMessage("Torpedo away!");
   });
+
+  socket.on("command_rejected", (data) => {
+    if (data.message) {
+      addMessage(data.message);
+    }
+  });
+}
+
+function deliver(event, payload) {
+  for (const handler of socket.listeners(event)) handler(payload);
+}
+
+function applyStreamMessage(stream, message, name) {
+  if (stream.apply(message)) return true;
+  if (!stream.resyncRequested) {
+    stream.resyncRequested = true;
+    socket.emit("request_keyframe", { stream: name });
+  }
+  return false;
+}
+
+function applyPatch(base, patch) {
+  const next = { ...base };
+  for (const [key, section] of Object.entries(patch)) {
+    const old = base[key];
+    if (!(key in base)) {
+      next[key] = section;
+    } else if (Array.isArray(old)) {
+      next[key] = applyCollectionPatch(old, section);
+    } else if (old !== null && typeof old === "object") {
+      const record = { ...old, ...(section.set || {}) };
+      (section.unset || []).forEach((field) => delete record[field]);
+      next[key] = record;
+    } else {
+      next[key] = section;
+    }
+  }
+  return next;
+}
+
+function applyCollectionPatch(entries, section) {
+  const removed = new Set(section.del || []);
+  const updates = new Map((section.upd || []).map((u) => [u.id, u]));
+  const next = [];
+  entries.forEach((entry) => {
+    if (removed.has(entry.id)) return;
+    const update = updates.get(entry.id);
+    next.push(update ? { ...entry, ...update } : entry);
+  });
+  (section.add || []).forEach((entry) => next.push(entry));
+  return next;
+}
+
+function recordSnapshot(tick, state) {
+  const time = tick / (worldConfig.sim_rate || 20);
+  const sample = time - performance.now() / 1000;
+  const last = snapshots[snapshots.length - 1];
+  if (last && time < last.time) {
+    // The timeline restarted (e.g. we moved to another arena).
+    snapshots.length = 0;
+    clockOffset = null;
+  } else if (last && time === last.time) {
+    snapshots.pop();
+  }
+  // The least delayed snapshot gives the best clock estimate; later samples
+  // only pull it down slowly, so one slow packet doesn't cause a stall.
+  if (clockOffset === null || sample > clockOffset) {
+    clockOffset = sample;
+  } else {
+    clockOffset += (sample - clockOffset) * 0.02;
+  }
+  snapshots.push({ time, state });
+  if (snapshots.length > SNAPSHOT_BUFFER) snapshots.shift();
+}
+
+function wrapDelta(delta) {
+  const size = worldConfig.world_size || 2000;
+  return delta - size * Math.round(delta / size);
+}
+
+function wrapCoord(value) {
+  const size = worldConfig.world_size || 2000;
+  return ((value % size) + size) % size;
+}
+
+// Blends two states of one entity; t beyond 1 extrapolates along the line.
+function blendEntity(a, b, t) {
+  if (!a || typeof a.x !== "number" || typeof b.x !== "number") return b;
+  const dx = wrapDelta(b.x - a.x);
+  const dy = wrapDelta(b.y - a.y);
+  if (Math.hypot(dx, dy) > TELEPORT_DISTANCE) return t < 1 ? a : b;
+  const out = { ...b, x: wrapCoord(a.x + dx * t), y: wrapCoord(a.y + dy * t) };
+  if (typeof a.depth === "number" && typeof b.depth === "number") {
+    out.depth = a.depth + (b.depth - a.depth) * t;
+  }
+  if (typeof a.heading === "number" && typeof b.heading === "number") {
+    const turn = ((b.heading - a.heading + 540) % 360) - 180;
+    out.heading = normalizeHeading(a.heading + turn * t);
+  }
+  return out;
+}
+
+// Moves an entity along its heading at ``speed`` for ``dt`` seconds.
+function deadReckon(entity, speed, dt) {
+  if (typeof entity.x !== "number" || typeof entity.heading !== "number") return entity;
+  const rad = (entity.heading * Math.PI) / 180;
+  return {
+    ...entity,
+    x: wrapCoord(entity.x + Math.sin(rad) * speed * dt),
+    y: wrapCoord(entity.y - Math.cos(rad) * speed * dt),
+  };
+}
+
+function byId(entries) {
+  return new Map((entries || []).map((entry) => [entry.id, entry]));
+}
+
+// Simulation time (seconds) shown on screen at local time ``nowMs``.
+function renderTimeAt(nowMs) {
+  const interval = 1 / (worldConfig.tick_rate || 5);
+  return nowMs / 1000 + clockOffset - INTERPOLATION_DELAY * interval;
+}
+
+// The simulation tick on screen now. Shots and orders are stamped with it so
+// the server can judge them against the world we actually saw.
+function viewTick() {
+  if (clockOffset === null) return null;
+  return Math.max(0, Math.floor(renderTimeAt(performance.now()) * (worldConfig.sim_rate || 20)));
+}
+
+// The state to draw at local time ``nowMs``: interpolated between buffered
+// snapshots, or extrapolated from the newest one when it is overdue.
+function renderState(nowMs) {
+  if (!latestState || !snapshots.length || clockOffset === null) return latestState;
+  const renderTime = renderTimeAt(nowMs);
+
+  let k = snapshots.length - 1;
+  while (k >= 0 && snapshots[k].time > renderTime) k--;
+  if (k < 0) return { ...latestState, ...snapshots[0].state };
+
+  const older = snapshots[k];
+  const newer = snapshots[k + 1];
+  if (newer) {
+    const t = (renderTime - older.time) / (newer.time - older.time);
+    const after = byId(newer.state.sonar_contacts);
+    const afterTorps = byId(newer.state.torpedoes);
+    return {
+      ...latestState,
+      you: blendEntity(older.state.you, newer.state.you, t),
+      sonar_contacts: (older.state.sonar_contacts || []).map((c) =>
+        after.has(c.id) ? blendEntity(c, after.get(c.id), t) : c
+      ),
+      torpedoes: (older.state.torpedoes || []).map((torp) =>
+        afterTorps.has(torp.id) ? blendEntity(torp, afterTorps.get(torp.id), t) : torp
+      ),
+    };
+  }
+
+  // Late snapshot: dead-reckon own sub and torpedoes from heading and speed,
+  // and contacts from their motion between the last two snapshots.
+  const dt = Math.min(renderTime - older.time, MAX_EXTRAPOLATION);
+  const you = older.state.you;
+  const previous = snapshots[k - 1];
+  const before = byId(previous && previous.state.sonar_contacts);
+  const span = previous ? older.time - previous.time : 0;
+  return {
+    ...latestState,
+    you: you && you.alive ? deadReckon(you, you.speed || 0, dt) : you,
+    sonar_contacts: (older.state.sonar_contacts || []).map((c) =>
+      before.has(c.id) && span > 0 ? blendEntity(before.get(c.id), c, 1 + dt / span) : c
+    ),
+    torpedoes: (older.state.torpedoes || []).map((torp) =>
+      deadReckon(torp, worldConfig.torpedo_speed || 30, dt)
+    ),
+  };
+}
+
+function wireScale(kind) {
+  switch (kind) {
+    case "pos":
+      return (worldConfig.world_size || 2000) / MAX_HANDLE;
+    case "depth":
+      return (worldConfig.max_depth || 300) / MAX_HANDLE;
+    case "angle":
+      return 360 / 65536;
+    case "speed":
+      return 0.01;
+    default:
+      return 0.1; // range
+  }
+}
+
+function readWireValue(reader, kind, entry) {
+  switch (kind) {
+    case "name":
+      return entityNames[entry.id] || "Unknown";
+    case "sub":
+    case "torp":
+      return reader.u16();
+    case "bool":
+      return reader.u8() !== 0;
+    case "time": {
+      const value = reader.f64();
+      return Number.isNaN(value) ? null : value;
+    }
+    default:
+      return reader.u16() * wireScale(kind);
+  }
+}
+
+function readWireRecord(reader, fields) {
+  const mask = reader.u16();
+  const record = {};
+  fields.forEach(([name, kind], bit) => {
+    if (mask & (1 << bit)) record[name] = readWireValue(reader, kind, record);
+  });
+  return record;
+}
+
+function readWireMask(reader, fields) {
+  const mask = reader.u16();
+  return fields.filter((_, bit) => mask & (1 << bit)).map(([name]) => name);
+}
+
+function readWireEntries(reader, fields) {
+  const count = reader.u16();
+  const entries = [];
+  for (let i = 0; i < count; i++) entries.push(readWireRecord(reader, fields));
+  return entries;
+}
+
+// Turns a binary stream frame back into the JSON delta-protocol message.
+function decodeWireStream(schema, buffer) {
+  const reader = new WireReader(buffer);
+  if (reader.u8() !== WIRE_VERSION) return null;
+  const keyframe = (reader.u8() & 1) !== 0;
+  const seq = reader.u32();
+  const base = reader.u32();
+  const tick = reader.u32();
+  const mask = reader.u8();
+  const body = {};
+  schema.forEach(([section, kind, fields], bit) => {
+    if (!(mask & (1 << bit))) return;
+    if (kind === "record") {
+      const record = readWireRecord(reader, fields);
+      const unset = readWireMask(reader, fields);
+      body[section] = keyframe ? record : { set: record, unset };
+    } else {
+      const added = readWireEntries(reader, fields);
+      const updated = readWireEntries(reader, fields);
+      const removed = [];
+      const count = reader.u16();
+      for (let i = 0; i < count; i++) removed.push(reader.u16());
+      body[section] = keyframe ? added : { add: added, upd: updated, del: removed };
+    }
+  });
+  return keyframe
+    ? { v: PROTOCOL_VERSION, seq, key: true, state: body, tick }
+    : { v: PROTOCOL_VERSION, seq, base, patch: body, tick };
+}
+
+function roundTenth(value) {
+  return Math.round(value * 10) / 10;
+}
+
+function decodeWireSonarResult(buffer) {
+  const reader = new WireReader(buffer);
+  reader.u8();
+  const contacts = readWireEntries(reader, PING_CONTACT_FIELDS).map((c) => ({
+    ...c,
+    distance: roundTenth(c.distance),
+    bearing: roundTenth(c.bearing),
+    depth: roundTenth(c.depth),
+  }));
+  return { contacts };
+}
+
+function decodeWirePingDetected(buffer) {
+  const reader = new WireReader(buffer);
+  reader.u8();
+  const handle = reader.u16();
+  return {
+    pinging_id: handle,
+    pinging_username: entityNames[handle] || "Unknown",
+    approx_distance: roundTenth(reader.u16() * 0.1),
+  };
 }
 
 function addMessage(text) {
@@ -191,14 +632,27 @@ function addMessage(text) {
   systemMessages.scrollTop = systemMessages.scrollHeight;
 }
 
+// A cluster redirect carries the captain's name over.
+usernameInput.value = new URLSearchParams(window.location.search).get("name") || usernameInput.value;
+
 joinBtn.addEventListener("click", () => {
   const name = usernameInput.value.trim() || "Captain";
   loginOverlay.classList.add("hidden");
   mainUi.classList.remove("hidden");
   connectSocket();
-  socket.emit("join_game", { username: name });
+  joinGame(name);
 });
 
+function joinGame(name) {
+  // Optional ?arena=<name> joins a specific match; otherwise the server picks
+  // one. A session token (ours, or one carried over by a redirect) also
+  // rejoins the arena it was issued in.
+  const params = new URLSearchParams(window.location.search);
+  const token = params.get("token") || sessionStorage.getItem("sessionToken");
+  const arena = params.get("arena") || (token && sessionStorage.getItem("arena"));
+  socket.emit("join_game", { username: name, arena, token, encodings: ["binary", "json"] });
+}
+
 // Heading Dial Interaction (Outer Ring)
 headingDial.addEventListener("pointerdown", (event) => {
   headingDialActive = true;
@@ -233,7 +687,7 @@ pingBtn.addEventListener("click", () => {
 });
 
 fireBtn.addEventListener("click", () => {
-  socket.emit("fire_torpedo");
+  socket.emit("fire_torpedo", { tick: viewTick() });
 });
 
 respawnBtn.addEventListener("click", () => {
@@ -242,12 +696,28 @@ respawnBtn.addEventListener("click", () => {
   socket.emit("request_respawn");
 });
 
+// Control changes (dial drags, slider moves) are sent at most once per
+// CONTROL_SEND_INTERVAL_MS; the last change in each window is always sent.
+const CONTROL_SEND_INTERVAL_MS = 100;
+let lastControlsSent = 0;
+let controlsTimer = null;
+
 function sendControls() {
-  if (!socket) return;
+  if (!socket || controlsTimer) return;
+  const wait = lastControlsSent + CONTROL_SEND_INTERVAL_MS - performance.now();
+  if (wait > 0) {
+    controlsTimer = setTimeout(() => {
+      controlsTimer = null;
+      sendControls();
+    }, wait);
+    return;
+  }
+  lastControlsSent = performance.now();
   socket.emit("update_controls", {
     heading: currentHeadingOrder,
     speed: speedOrderToActual(currentSpeedOrder),
     depth: parseFloat(depthSlider.value),
+    tick: viewTick(),
   });
 }
 
@@ -444,15 +914,15 @@ function updateRespawnCountdown() {
   }
 }
 
-function drawMap() {
+function drawMap(state) {
   mapCtx.fillStyle = "#00121d";
   mapCtx.fillRect(0, 0, mapCanvas.width, mapCanvas.height);
-  if (!latestState || !latestState.world_size) return;
-  const scale = mapCanvas.width / latestState.world_size;
+  if (!state || !state.world_size) return;
+  const scale = mapCanvas.width / state.world_size;
 
-  if (latestState.torpedoes) {
+  if (state.torpedoes) {
     mapCtx.fillStyle = "yellow";
-    latestState.torpedoes.forEach((torp) => {
+    state.torpedoes.forEach((torp) => {
       const x = torp.x * scale;
       const y = torp.y * scale;
       mapCtx.beginPath();
@@ -461,9 +931,9 @@ function drawMap() {
     });
   }
 
-  if (latestState.sonar_contacts) {
+  if (state.sonar_contacts) {
     mapCtx.fillStyle = "red";
-    latestState.sonar_contacts.forEach((contact) => {
+    state.sonar_contacts.forEach((contact) => {
       const x = contact.x * scale;
       const y = contact.y * scale;
       mapCtx.beginPath();
@@ -472,9 +942,9 @@ function drawMap() {
     });
   }
 
-  if (latestState.passive_contacts) {
+  if (state.passive_contacts) {
     mapCtx.fillStyle = "rgba(255, 0, 0, 0.3)"; // Faint red for passive
-    latestState.passive_contacts.forEach((contact) => {
+    state.passive_contacts.forEach((contact) => {
       const x = contact.x * scale;
       const y = contact.y * scale;
       mapCtx.beginPath();
@@ -483,8 +953,8 @@ function drawMap() {
     });
   }
 
-  if (latestState.you && latestState.you.alive) {
-    const you = latestState.you;
+  if (state.you && state.you.alive) {
+    const you = state.you;
     const x = you.x * scale;
     const y = you.y * scale;
     mapCtx.save();
@@ -665,7 +1135,7 @@ function gameRenderLoop() {
   sweepAngle += SWEEP_SPEED * dt;
   if (sweepAngle > Math.PI * 2) sweepAngle -= Math.PI * 2;
 
-  drawMap();
+  drawMap(renderState(now));
   drawSonar(now);
 
   requestAnimationFrame(gameRenderLoop);
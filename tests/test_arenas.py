@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import ArenaManager, unbundle
+
+
+class TestArenaManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = ArenaManager(capacity=2, slots=2)
+
+    def test_auto_arenas_fill_before_opening_new(self):
+        a, _ = self.manager.join("sid1", "One")
+        b, _ = self.manager.join("sid2", "Two")
+        c, _ = self.manager.join("sid3", "Three")
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(len(self.manager.arenas), 2)
+        # New arenas take the least loaded tick slot.
+        self.assertNotEqual(a.slot, c.slot)
+
+    def test_named_arena_is_shared_and_isolated(self):
+        red, _ = self.manager.join("sid1", "One", arena_name="red")
+        same, _ = self.manager.join("sid2", "Two", arena_name="red")
+        blue, _ = self.manager.join("sid3", "Three", arena_name="blue")
+        self.assertIs(red, same)
+        self.assertEqual(set(red.engine.submarines), {"sid1", "sid2"})
+        self.assertEqual(set(blue.engine.submarines), {"sid3"})
+
+    def test_unsafe_arena_names_are_rejected(self):
+        self.manager.join("sid1", "One", arena_name="red")
+        for name in ('evil"} 1\nsubwars_fake 99', "x" * 33, "../etc", ["red"], 5):
+            arena, messages = self.manager.join("sid1", "One", arena_name=name)
+            self.assertIsNone(arena)
+            self.assertEqual(messages[-1].event, "join_rejected")
+        self.assertEqual(list(self.manager.arenas), [])
+        arena, _ = self.manager.join("sid1", "One", arena_name="Red_Team-2")
+        self.assertEqual(arena.name, "Red_Team-2")
+
+    def test_empty_arena_is_torn_down(self):
+        red, _ = self.manager.join("sid1", "One", arena_name="red")
+        self.manager.join("sid2", "Two", arena_name="red")
+        red.tick()
+        self.assertEqual(self.manager.leave("sid1"), [])
+        self.assertIn("red", self.manager.arenas)
+
+        # The announcement goes out with the arena's next tick.
+        messages = unbundle(red.tick())
+        self.assertEqual(
+            [(m.event, m.to) for m in messages if m.event == "system_message"],
+            [("system_message", "arena:red")],
+        )
+
+        self.manager.leave("sid2")
+        self.assertNotIn("red", self.manager.arenas)
+        self.assertIsNone(self.manager.arena_for("sid2"))
+
+    def test_rejoin_moves_player(self):
+        self.manager.join("sid1", "One", arena_name="red")
+        blue, _ = self.manager.join("sid1", "One", arena_name="blue")
+        self.assertNotIn("red", self.manager.arenas)
+        self.assertIs(self.manager.arena_for("sid1"), blue)
+
+    def test_join_messages_stay_in_arena(self):
+        arena, messages = self.manager.join("sid1", "One", encodings=["json"])
+        events = [m.event for m in messages]
+        self.assertIn("joined", events)
+        self.assertIn("world_config", events)
+        for message in messages:
+            self.assertTrue(message.to == "sid1" or message.to.startswith(arena.room))
+
+    def test_tick_steps_one_slot_at_a_time(self):
+        a, _ = self.manager.join("sid1", "One", arena_name="a")
+        b, _ = self.manager.join("sid2", "Two", arena_name="b")
+        first = self.manager.tick()
+        second = self.manager.tick()
+        first_updates = {m.to for m in first if m.event == "state_update"}
+        second_updates = {m.to for m in second if m.event == "state_update"}
+        self.assertEqual(len(first_updates), 1)
+        self.assertEqual(len(second_updates), 1)
+        self.assertEqual(first_updates | second_updates, {"sid1", "sid2"})
+
+    def test_state_updates_are_stamped_with_the_tick(self):
+        arena, _ = self.manager.join("sid1", "One")
+        arena.engine.update = lambda: arena.engine.step(0.05, 0.0)
+        for expected in (1, 2):
+            update = next(m for m in arena.tick() if m.event == "state_update")
+            self.assertEqual(update.payload["tick"], expected)
+
+    def test_dispatch_routes_player_events(self):
+        self.assertEqual(self.manager.dispatch("nobody", "fire_torpedo"), [])
+        arena, _ = self.manager.join("sid1", "One")
+        self.assertEqual(self.manager.dispatch("sid1", "fire_torpedo"), [])
+        self.manager.dispatch("sid1", "update_controls", {"speed": 5.0})
+        # Inputs take effect when the arena next ticks.
+        fired = [m.event for m in unbundle(arena.tick()) if m.event == "torpedo_fired"]
+        self.assertEqual(fired, ["torpedo_fired"])
+        self.assertEqual(arena.engine.submarines["sid1"].target_speed, 5.0)
+        with self.assertRaises(ValueError):
+            self.manager.dispatch("sid1", "self_destruct")
+
+    def test_hit_events_stay_in_arena(self):
+        arena, _ = self.manager.join("sid1", "Shooter", arena_name="red")
+        self.manager.join("sid2", "Victim", arena_name="red")
+        self.manager.join("sid3", "Elsewhere", arena_name="blue")
+        arena.tick()  # sends the join announcements
+        shooter = arena.engine.submarines["sid1"]
+        victim = arena.engine.submarines["sid2"]
+        shooter.place(480.0, 500.0)
+        shooter.heading = 90.0
+        victim.place(500.0, 500.0)
+        victim.heading = 0.0
+        arena.engine.fire_torpedo("sid1")
+        shooter.place(100.0, 100.0)
+
+        arena.engine.update = lambda: arena.engine.step(1.5, 0.0)
+        messages = arena.tick()
+        hits = [m.to for m in unbundle(messages) if m.event == "sub_hit"]
+        self.assertEqual(hits, ["sid1", "sid2"])
+
+        # Each player gets their events and state update as one emit.
+        self.assertEqual(sorted(m.to for m in messages), ["sid1", "sid2"])
+        bundle = next(m.payload for m in messages if m.to == "sid2")
+        self.assertEqual([e for e, _ in bundle["events"]], ["sub_hit", "you_were_hit"])
+        self.assertEqual(bundle["state"]["tick"], arena.engine.tick)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+import json
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.batch_sim import aggregate, run_batch, run_match
+from benchmarks.engine_bench import PHASES, percentile, run
+
+
+class TestEngineBench(unittest.TestCase):
+    def test_small_run_reports_every_phase(self):
+        result = run(subs=5, torpedoes=5, frames=3)
+        self.assertEqual(set(result["phases"]), set(PHASES))
+        self.assertGreater(result["frame"]["p99_ms"], 0.0)
+        self.assertGreater(result["bytes_per_player_frame"]["json"], 0.0)
+        self.assertGreater(result["bytes_per_player_frame"]["binary"], 0.0)
+        json.dumps(result)
+
+    def test_runs_on_simulated_time(self):
+        # 21 simulated seconds: the 40 starting torpedoes (20 s fuses) are gone,
+        # and one bot can't have fired as many since.
+        result = run(subs=1, torpedoes=40, frames=105)
+        self.assertLess(result["torpedoes_in_flight"], 40)
+
+    def test_percentile(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile([], 99), 0.0)
+
+
+class TestBatchSim(unittest.TestCase):
+    def test_seed_determines_the_match(self):
+        first = run_match(seed=5, subs=6, duration=20.0)
+        again = run_match(seed=5, subs=6, duration=20.0)
+        self.assertEqual(first["digest"], again["digest"])
+        self.assertEqual((first["shots"], first["hits"]), (again["shots"], again["hits"]))
+        self.assertNotEqual(run_match(seed=6, subs=6, duration=20.0)["digest"], first["digest"])
+
+    def test_pool_matches_serial_run(self):
+        serial = run_batch([1, 2, 3], subs=4, duration=5.0, processes=1)
+        pooled = run_batch([1, 2, 3], subs=4, duration=5.0, processes=2)
+        self.assertEqual([r["seed"] for r in pooled], [1, 2, 3])
+        self.assertEqual([r["digest"] for r in pooled], [r["digest"] for r in serial])
+        summary = aggregate(pooled, wall=1.0)
+        self.assertEqual(summary["matches"], 3)
+        json.dumps(summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import Outbound
+from game.cluster import ClusterManager, FileBus, FileDirectory, LocalBus, LocalDirectory
+from game.replay import ManualClock
+
+
+class TestDirectory(unittest.TestCase):
+    def check_ownership(self, directory, clock):
+        directory.register("a", "http://a")
+        directory.register("b", "http://b")
+        self.assertEqual(directory.claim("north", "a"), "a")
+        self.assertEqual(directory.claim("north", "b"), "a")
+        self.assertEqual(directory.owner("north"), "a")
+        self.assertEqual(directory.url("a"), "http://a")
+
+        # A silent node loses its arenas to the next claimant.
+        clock.advance(60.0)
+        directory.register("b", "http://b")
+        self.assertIsNone(directory.owner("north"))
+        self.assertEqual(directory.claim("north", "b"), "b")
+
+        directory.release("north", "b")
+        self.assertIsNone(directory.owner("north"))
+        directory.claim("south", "b")
+        directory.unregister("b")
+        self.assertIsNone(directory.owner("south"))
+        self.assertIsNone(directory.url("b"))
+
+    def test_local_directory(self):
+        clock = ManualClock(1000.0)
+        self.check_ownership(LocalDirectory(clock=clock), clock)
+
+    def test_file_directory_is_shared_through_the_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cluster.json")
+            clock = ManualClock(1000.0)
+            self.check_ownership(FileDirectory(path, clock=clock), clock)
+            first, second = FileDirectory(path), FileDirectory(path)
+            first.register("c", "http://c")
+            first.claim("east", "c")
+            self.assertEqual(second.claim("east", "d"), "c")
+
+
+class TestClusterManager(unittest.TestCase):
+    def setUp(self):
+        self.directory = LocalDirectory()
+        self.bus = LocalBus()
+        self.a = ClusterManager("a", "http://a", self.directory, self.bus)
+        self.b = ClusterManager("b", "http://b", self.directory, self.bus)
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+
+    def test_join_redirects_to_the_owning_node(self):
+        arena, _ = self.a.join("sid1", "Nemo", arena_name="north")
+        self.assertEqual(arena.name, "north")
+
+        arena, messages = self.b.join("sid2", "Ahab", arena_name="north", token="tok")
+        self.assertIsNone(arena)
+        self.assertEqual(
+            messages,
+            [Outbound("redirect", {"url": "http://a", "arena": "north", "token": "tok"}, "sid2")],
+        )
+        self.assertNotIn("north", self.b.arenas)
+        self.assertNotIn("sid2", self.b.player_arena)
+
+    def test_empty_arena_is_released(self):
+        self.a.join("sid1", "Nemo", arena_name="north")
+        self.a.leave("sid1")
+        self.assertIsNone(self.directory.owner("north"))
+        arena, _ = self.b.join("sid2", "Ahab", arena_name="north")
+        self.assertEqual(arena.name, "north")
+
+    def test_auto_arenas_get_distinct_names(self):
+        first, _ = self.a.join("sid1", "Nemo")
+        second, _ = self.b.join("sid2", "Ahab")
+        self.assertNotEqual(first.name, second.name)
+        self.assertEqual(self.directory.owner(first.name), "a")
+        self.assertEqual(self.directory.owner(second.name), "b")
+
+    def test_announcements_reach_every_node(self):
+        self.assertEqual(self.a.announce("Storm warning"), [])
+        announcement = Outbound("system_message", {"message": "Storm warning"})
+        for node in (self.a, self.b):
+            self.assertIn(announcement, node.tick())
+            self.assertNotIn(announcement, node.tick())
+
+    def test_leave_messages_stay_local(self):
+        self.a.join("sid1", "Nemo", arena_name="north")
+        self.a.join("sid2", "Ahab", arena_name="north")
+        self.a.leave("sid2")
+        self.assertEqual(self.b.tick(), [])
+
+
+class TestFileBus(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cluster.bus")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nodes_sharing_the_file_hear_each_other(self):
+        FileBus(self.path).publish({"event": "old"})
+        first, second = FileBus(self.path), FileBus(self.path)
+        heard = []
+        second.subscribe(heard.append)
+        first.publish({"event": "system_message", "payload": {"message": "Hi"}})
+        with open(self.path, "a") as f:
+            f.write('{"event":"torn"')  # a publisher mid-write
+        second.poll()
+        self.assertEqual(heard, [{"event": "system_message", "payload": {"message": "Hi"}}])
+
+    def test_cluster_nodes_over_a_file_bus(self):
+        directory = LocalDirectory()
+        a = ClusterManager("a", "http://a", directory, FileBus(self.path))
+        b = ClusterManager("b", "http://b", directory, FileBus(self.path))
+        a.announce("Surface for inspection")
+        self.assertIn(Outbound("system_message", {"message": "Surface for inspection"}), b.tick())
+        a.close()
+        b.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import random
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import HIT_QUERY_RADIUS, GameEngine
+from game.physics import torpedo_hits_sub, torpedo_sweep_hits_sub
+from game.constants import WORLD_SIZE, HIT_RADIUS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestSweptCollision(unittest.TestCase):
+    def test_stationary_matches_point_test(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            tx, ty = rng.uniform(0, 100), rng.uniform(0, 100)
+            td, sd, heading = rng.uniform(40, 60), rng.uniform(40, 60), rng.uniform(0, 360)
+            self.assertEqual(
+                torpedo_sweep_hits_sub(tx, ty, tx, ty, td, 50, 50, 50, 50, sd, heading),
+                torpedo_hits_sub(tx, ty, td, 50, 50, sd, heading),
+            )
+
+    def test_fast_torpedo_does_not_tunnel(self):
+        # Sub lies north-south at (500, 500); the torpedo crosses it west to
+        # east in one step, ending well clear of the hull on the far side.
+        self.assertFalse(torpedo_hits_sub(530, 500, 50, 500, 500, 50, 0))
+        self.assertTrue(torpedo_sweep_hits_sub(470, 500, 530, 500, 50, 500, 500, 500, 500, 50, 0))
+
+    def test_sub_driving_through_torpedo(self):
+        # A stationary torpedo that a north-south hull sweeps over sideways.
+        self.assertFalse(torpedo_hits_sub(500, 500, 50, 530, 500, 50, 0))
+        self.assertTrue(torpedo_sweep_hits_sub(500, 500, 500, 500, 50, 470, 500, 530, 500, 50, 0))
+        self.assertFalse(torpedo_sweep_hits_sub(500, 500, 500, 500, 50, 470, 400, 530, 400, 50, 0))
+
+    def test_parallel_paths_miss(self):
+        offset = HIT_RADIUS + 1.0
+        self.assertFalse(
+            torpedo_sweep_hits_sub(400, 500 + offset, 600, 500 + offset, 50, 500, 500, 500, 500, 50, 90)
+        )
+
+    def test_sweep_across_world_edge(self):
+        self.assertTrue(
+            torpedo_sweep_hits_sub(
+                WORLD_SIZE - 20, 500, 20, 500, 50, 0, 500, 0, 500, 50, 0
+            )
+        )
+
+    def test_engine_hits_with_long_step(self):
+        engine = GameEngine()
+        shooter = engine.add_player("sid1", "Shooter")
+        victim = engine.add_player("sid2", "Victim")
+        shooter.place(480.0, 500.0)
+        shooter.heading = 90.0
+        victim.place(500.0, 500.0)
+        victim.heading = 0.0
+
+        engine.fire_torpedo("sid1")
+        shooter.place(100.0, 100.0)
+        # 1.5 s at TORPEDO_SPEED carries the torpedo 45 units: from 20 units
+        # short of the hull to 25 units past it.
+        events = engine.step(1.5, 0.0)
+        self.assertEqual([e["type"] for e in events], ["hit"])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_sweep_matches_scalar(self):
+        rng = random.Random(11)
+        engine = GameEngine(backend="numpy")
+        subs = []
+        for i in range(20):
+            sub = engine.add_player(f"sub{i}", "Sub")
+            sub.place(rng.uniform(0, 300), rng.uniform(0, 300))
+            sub.move_to(sub.x + rng.uniform(-5, 5), sub.y + rng.uniform(-5, 5))
+            sub.depth = rng.uniform(40, 60)
+            sub.heading = rng.uniform(0, 360)
+            subs.append(sub)
+        for _ in range(200):
+            engine.fire_torpedo(rng.choice(subs).id)
+        for torp in engine.torpedoes:
+            torp.place(rng.uniform(0, 300), rng.uniform(0, 300))
+            torp.move_to(torp.x + rng.uniform(-30, 30), torp.y + rng.uniform(-30, 30))
+
+        expected = [
+            (t.id, s.id)
+            for t in engine.torpedoes
+            for s in subs
+            if s.id != t.owner_id
+            and torpedo_sweep_hits_sub(
+                t.prev_x, t.prev_y, t.x, t.y, t.depth,
+                s.prev_x, s.prev_y, s.x, s.y, s.depth, s.heading,
+            )
+        ]
+        # Torpedoes moved up to 42 units and subs up to 7 since their last pose.
+        pairs = engine.vector.hit_pairs(engine.sub_index, HIT_QUERY_RADIUS + 50.0)
+        actual = [(t.id, s.id) for t, s in pairs]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(actual, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
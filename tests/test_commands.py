@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import ArenaManager, Outbound
+from game.commands import CommandBuffer
+from game.engine import GameEngine
+from game.constants import FIRE_COOLDOWN, MAX_PENDING_COMMANDS
+
+
+class TestCommandBuffer(unittest.TestCase):
+    def test_consecutive_controls_coalesce(self):
+        buffer = CommandBuffer()
+        buffer.push("controls", {"heading": 10.0, "speed": 5.0}, 0.0)
+        buffer.push("controls", {"heading": 20.0, "depth": None}, 0.0)
+        self.assertEqual(buffer.drain(), [("controls", {"heading": 20.0, "speed": 5.0})])
+
+    def test_order_is_kept_around_other_commands(self):
+        buffer = CommandBuffer()
+        buffer.push("controls", {"heading": 10.0}, 0.0)
+        buffer.push("fire", None, 0.0)
+        buffer.push("controls", {"heading": 20.0}, 0.0)
+        self.assertEqual(
+            [kind for kind, _ in buffer.drain()], ["controls", "fire", "controls"]
+        )
+
+    def test_cooldowns(self):
+        buffer = CommandBuffer()
+        self.assertTrue(buffer.push("fire", None, 10.0))
+        self.assertFalse(buffer.push("fire", None, 10.0 + FIRE_COOLDOWN / 2))
+        self.assertTrue(buffer.push("fire", None, 10.0 + FIRE_COOLDOWN))
+
+    def test_single_pending_respawn_and_cap(self):
+        buffer = CommandBuffer()
+        self.assertTrue(buffer.push("respawn", None, 0.0))
+        self.assertFalse(buffer.push("respawn", None, 0.0))
+        for i in range(MAX_PENDING_COMMANDS * 2):
+            buffer.push("ping" if i % 2 else "controls", {"speed": i}, i * 100.0)
+        self.assertEqual(len(buffer), MAX_PENDING_COMMANDS)
+
+    def test_controls_are_converted_or_rejected(self):
+        buffer = CommandBuffer()
+        buffer.push("controls", {"heading": "90", "speed": 3, "tick": 7}, 0.0)
+        self.assertEqual(
+            buffer.drain(), [("controls", {"heading": 90.0, "speed": 3.0, "tick": 7})]
+        )
+        for bad in ({"heading": "north"}, {"speed": float("nan")}, {"depth": [1]},
+                    {"speed": True}, {"tick": 1.5}, None):
+            with self.assertRaises(ValueError):
+                buffer.push("controls", bad, 0.0)
+        self.assertEqual(len(buffer), 0)
+
+
+class TestEngineCommands(unittest.TestCase):
+    def test_commands_apply_at_next_update(self):
+        engine = GameEngine()
+        sub = engine.add_player("sid1", "Test")
+        self.assertTrue(engine.queue_command("sid1", "controls", {"speed": 10.0}))
+        self.assertTrue(engine.queue_command("sid1", "fire"))
+        self.assertFalse(engine.queue_command("sid1", "fire"))
+        self.assertEqual(engine.torpedoes, [])
+
+        events = engine.update(0.0)
+        self.assertEqual(sub.target_speed, 10.0)
+        self.assertEqual(len(engine.torpedoes), 1)
+        self.assertEqual(
+            events, [{"type": "torpedo_fired", "sid": "sid1", "torpedo_id": engine.torpedoes[0].id}]
+        )
+        self.assertEqual(engine.update(0.0), [])
+
+    def test_unknown_player(self):
+        engine = GameEngine()
+        self.assertFalse(engine.queue_command("nobody", "fire"))
+
+    def test_malformed_controls_are_rejected_not_applied(self):
+        arenas = ArenaManager(slots=1)
+        arenas.join("a", "One", arena_name="red")
+        arenas.join("b", "Two", arena_name="red")
+        arena = arenas.arena_for("a")
+        self.assertEqual(arenas.dispatch("b", "update_controls", {"speed": 10.0}), [])
+        self.assertEqual(
+            arenas.dispatch("a", "update_controls", {"heading": "north"}),
+            [
+                Outbound(
+                    "command_rejected",
+                    {"command": "controls", "message": "Orders not understood: heading must be a number."},
+                    "a",
+                )
+            ],
+        )
+        arenas.tick()
+        self.assertEqual(arena.engine.submarines["b"].target_speed, 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from game.engine import GameEngine
+from game.models import TorpedoPool
 from game.constants import SUB_MAX_SPEED
 
 class TestGameEngine(unittest.TestCase):
@@ -28,7 +29,7 @@ class TestGameEngine(unittest.TestCase):
         self.engine.update_controls("sid1", {"speed": 4.0}) # 4.0 is max order
         
         # Update engine for 1 second
-        self.engine.update()
+        self.engine.update(1.0)
         # Sub should have accelerated
         self.assertGreater(sub.speed, 0)
         
@@ -51,5 +52,111 @@ class TestGameEngine(unittest.TestCase):
         self.assertEqual(len(self.engine.torpedoes), 1)
         self.assertEqual(self.engine.torpedoes[0].owner_id, "sid1")
 
+    def test_torpedoes_serialized_once_per_tick(self):
+        shooter = self.engine.add_player("sid1", "Shooter")
+        shooter.place(500.0, 500.0)
+        shooter.heading = 0.0
+        # Within sight of the torpedo but well clear of its path.
+        self.engine.add_player("sid2", "Bystander").place(560.0, 500.0)
+        self.engine.add_player("sid3", "Faraway").place(1500.0, 1500.0)
+        self.engine.fire_torpedo("sid1")
+
+        (seen,) = self.engine.get_personal_state("sid1")["torpedoes"]
+        self.assertIs(self.engine.get_personal_state("sid2")["torpedoes"][0], seen)
+        self.assertEqual(self.engine.get_personal_state("sid3")["torpedoes"], [])
+        # Only torpedoes someone sees are serialized.
+        self.assertEqual(list(self.engine._torpedo_dicts), [seen["id"]])
+
+        self.engine.update(self.engine.sim_dt)
+        self.assertIsNot(self.engine.get_personal_state("sid1")["torpedoes"][0], seen)
+
+    def test_personal_state_excludes_world_config(self):
+        self.engine.add_player("sid1", "Solo")
+        personal = self.engine.get_personal_state("sid1")
+        self.assertEqual(
+            set(personal), {"you", "sonar_contacts", "passive_contacts", "torpedoes"}
+        )
+
+        full = self.engine.get_state("sid1")
+        self.assertIn("torpedoes", full)
+        self.assertIn("world_size", full)
+
+
+class TestSleepingSubs(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine()
+        self.sub = self.engine.add_player("sid1", "Idle")
+
+    def test_settled_sub_sleeps_until_ordered(self):
+        self.engine.step(0.05, 0.0)
+        self.assertNotIn("sid1", self.engine.active)
+        self.sub.update = None  # a sleeping sub is never stepped
+        self.engine.step(0.05, 0.0)
+
+        del self.sub.update
+        self.engine.update_controls("sid1", {"speed": 2.0})
+        self.assertIn("sid1", self.engine.active)
+        x, y = self.sub.x, self.sub.y
+        self.engine.step(0.05, 0.0)
+        self.assertNotEqual((self.sub.x, self.sub.y), (x, y))
+
+    def test_coming_to_rest_resets_the_sweep(self):
+        self.engine.update_controls("sid1", {"speed": 1.0})
+        for _ in range(5):
+            self.engine.step(0.05, 0.0)
+        self.engine.update_controls("sid1", {"speed": 0.0})
+        for _ in range(40):
+            self.engine.step(0.05, 0.0)
+            if not self.engine.active:
+                break
+        self.assertNotIn("sid1", self.engine.active)
+        self.assertEqual((self.sub.prev_x, self.sub.prev_y), (self.sub.x, self.sub.y))
+
+    def test_sunk_subs_wait_for_their_respawn_timer(self):
+        self.engine._sink(self.sub, self.engine.torpedo_pool.spawn("x", 0, 0, 0, 0, now=0.0), 0.0)
+        self.assertEqual(len(self.engine.timers), 1)
+        self.assertEqual(self.engine.step(0.05, 1.0), [])
+        events = self.engine.step(0.05, self.sub.respawn_at)
+        self.assertEqual(events, [{"type": "respawn_ready", "sid": "sid1"}])
+        self.assertEqual(len(self.engine.timers), 0)
+
+        self.assertTrue(self.engine.request_respawn("sid1", self.sub.respawn_at))
+        self.assertIn("sid1", self.engine.active)
+
+
+class TestTorpedoPool(unittest.TestCase):
+    def test_ids_increase_and_objects_are_reused(self):
+        pool = TorpedoPool()
+        a = pool.spawn("sid1", 0.0, 0.0, 50.0, 0.0)
+        b = pool.spawn("sid1", 0.0, 0.0, 50.0, 0.0)
+        self.assertEqual((a.id, b.id), (1, 2))
+
+        pool.release(a)
+        c = pool.spawn("sid2", 5.0, 5.0, 50.0, 90.0)
+        self.assertIs(c, a)
+        self.assertEqual(c.id, 3)
+        self.assertEqual(c.owner_id, "sid2")
+        self.assertFalse(hasattr(c, "__dict__"))
+
+    def test_swap_and_pop(self):
+        pool = TorpedoPool()
+        torps = [pool.spawn("sid1", 0.0, 0.0, 50.0, 0.0) for _ in range(4)]
+        pool.release(torps[1])
+        self.assertEqual([t.id for t in pool.active], [1, 4, 3])
+        self.assertEqual([t.slot for t in pool.active], [0, 1, 2])
+        pool.release(torps[2])
+        self.assertEqual([t.id for t in pool.active], [1, 4])
+
+    def test_engine_keeps_list_identity(self):
+        engine = GameEngine()
+        engine.add_player("sid1", "Shooter")
+        torpedoes = engine.torpedoes
+        engine.fire_torpedo("sid1")
+        engine.step(0.05, engine.torpedoes[0].expires_at)
+        self.assertIs(engine.torpedoes, torpedoes)
+        self.assertEqual(len(engine.torpedoes), 0)
+        self.assertEqual(len(engine.torpedo_index), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
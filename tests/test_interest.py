@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import GameEngine
+from game.arena import Arena, unbundle
+from game.constants import INTEREST_RANGE, INTEREST_EXIT_RANGE
+
+
+class TestInterest(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine()
+        self.viewer = self.engine.add_player("sid1", "Viewer")
+        self.shooter = self.engine.add_player("sid2", "Shooter")
+        self.viewer.place(100.0, 1000.0)
+        self.shooter.place(100.0 + INTEREST_RANGE + 50.0, 1000.0)
+        self.engine.fire_torpedo("sid2")
+        self.torp = self.engine.torpedoes[0]
+
+    def visible(self):
+        return [t["id"] for t in self.engine.get_personal_state("sid1")["torpedoes"]]
+
+    def test_far_torpedoes_are_filtered(self):
+        self.assertEqual(self.visible(), [])
+        self.assertEqual(
+            [t["id"] for t in self.engine.get_personal_state("sid2")["torpedoes"]],
+            [self.torp.id],
+        )
+
+    def test_hysteresis(self):
+        self.torp.place(100.0 + INTEREST_RANGE - 10.0, 1000.0)
+        self.assertEqual(self.visible(), [self.torp.id])
+
+        # Between the two ranges: stays visible once seen...
+        self.torp.place(100.0 + (INTEREST_RANGE + INTEREST_EXIT_RANGE) / 2.0, 1000.0)
+        self.assertEqual(self.visible(), [self.torp.id])
+
+        # ...until it passes the exit range, after which it must re-enter.
+        self.torp.place(100.0 + INTEREST_EXIT_RANGE + 10.0, 1000.0)
+        self.assertEqual(self.visible(), [])
+        self.torp.place(100.0 + (INTEREST_RANGE + INTEREST_EXIT_RANGE) / 2.0, 1000.0)
+        self.assertEqual(self.visible(), [])
+
+    def test_interest_wraps_world_edge(self):
+        self.viewer.place(10.0, 10.0)
+        self.torp.place(1990.0, 1990.0)
+        self.assertEqual(self.visible(), [self.torp.id])
+
+    def test_sub_hit_only_reaches_nearby_players(self):
+        arena = Arena("test")
+        for sid, name, x in (("a", "Attacker", 480.0), ("v", "Victim", 500.0),
+                             ("n", "Near", 700.0), ("f", "Far", 1500.0)):
+            arena.join(sid, name)
+            arena.engine.submarines[sid].place(x, 500.0)
+        attacker = arena.engine.submarines["a"]
+        attacker.heading = 90.0
+        arena.engine.submarines["v"].heading = 0.0
+        arena.engine.fire_torpedo("a")
+        attacker.place(100.0, 100.0)
+
+        arena.engine.update = lambda: arena.engine.step(1.5, 0.0)
+        hits = [m.to for m in unbundle(arena.tick()) if m.event == "sub_hit"]
+        self.assertEqual(hits, ["a", "n", "v"])
+
+
+if __name__ == '__main__':
+    unittest.main()
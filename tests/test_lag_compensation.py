@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import Arena, unbundle
+from game.engine import GameEngine
+from game.history import PoseHistory
+from game.metrics import METRICS
+
+
+class TestPoseHistory(unittest.TestCase):
+    def test_ring_keeps_only_recent_ticks(self):
+        history = PoseHistory(capacity=4)
+        for tick in range(1, 7):
+            history.record(tick, float(tick), 2.0, 3.0, 4.0)
+        self.assertEqual(history.at(6), (6.0, 2.0, 3.0, 4.0))
+        self.assertEqual(history.at(3), (3.0, 2.0, 3.0, 4.0))
+        self.assertIsNone(history.at(2))  # overwritten by tick 6
+        # A sub stops recording while it sleeps; its last pose holds.
+        self.assertEqual(history.at(9), (6.0, 2.0, 3.0, 4.0))
+        self.assertIsNone(history.at(-1))
+        history.clear()
+        self.assertIsNone(history.at(6))
+
+    def test_pose_held_through_a_long_sleep(self):
+        history = PoseHistory(capacity=11)
+        history.record(3, 1.0, 2.0, 3.0, 4.0)
+        # Asleep since tick 3; woken by new controls at tick 47.
+        history.record(47, 5.0, 2.0, 3.0, 4.0)
+        history.record(48, 6.0, 2.0, 3.0, 4.0)
+        self.assertEqual(history.at(44), (1.0, 2.0, 3.0, 4.0))
+        self.assertEqual(history.at(46), (1.0, 2.0, 3.0, 4.0))
+        self.assertEqual(history.at(47), (5.0, 2.0, 3.0, 4.0))
+        self.assertIsNone(history.at(37))  # older than the ring
+
+
+class TestRewoundShots(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine(seed=1)
+        self.shooter = self.engine.add_player("sid1", "Shooter")
+        self.target = self.engine.add_player("sid2", "Target")
+        self.shooter.place(500.0, 500.0)
+        self.shooter.heading = 90.0
+        # Now well clear of the firing line (hull lying east-west, 40 north)...
+        self.target.place(515.0, 460.0)
+        self.target.heading = 90.0
+        self.target.depth = self.shooter.depth
+        for _ in range(6):
+            self.engine.step(self.engine.sim_dt, 0.0)
+        # ...but a few ticks ago it lay across it.
+        for tick in range(1, self.engine.tick + 1):
+            self.engine.history["sid2"].record(tick, 515.0, 500.0, self.shooter.depth, 0.0)
+
+    def test_shot_is_judged_in_the_world_the_shooter_saw(self):
+        hits = []
+        torp_id = self.engine.fire_torpedo("sid1", 100.0, self.engine.tick - 5, hits)
+        self.assertIsNotNone(torp_id)
+        self.assertEqual([(h["attacker_id"], h["victim_id"]) for h in hits], [("sid1", "sid2")])
+        self.assertFalse(self.target.alive)
+        self.assertEqual(self.engine.torpedoes, [])
+
+    def test_rewind_is_measured_in_seconds(self):
+        METRICS.histograms.pop("rewind_seconds", None)
+        self.engine.fire_torpedo("sid1", 100.0, self.engine.tick - 5)
+        (histogram,) = METRICS.histograms["rewind_seconds"].values()
+        self.assertAlmostEqual(histogram.total, 5 * self.engine.sim_dt)
+        # 0.25 s lands in a finite bucket, not just +Inf.
+        self.assertEqual(sum(histogram.counts), 1)
+
+    def test_unstamped_shot_uses_present_positions(self):
+        hits = []
+        self.engine.fire_torpedo("sid1", 100.0, None, hits)
+        self.assertEqual(hits, [])
+        self.assertTrue(self.target.alive)
+        self.assertEqual((self.engine.torpedoes[0].x, self.engine.torpedoes[0].y), (500.0, 500.0))
+
+    def test_rewind_is_capped(self):
+        self.engine.tick = 100
+        for tick in range(80, 101):
+            self.engine.history["sid1"].record(tick, 500.0, 500.0, 0.0, 90.0)
+        self.engine.fire_torpedo("sid1", 100.0, 3)
+        self.assertEqual(self.engine.view_lag["sid1"], self.engine.max_rewind)
+        # The torpedo has been running since the rewound tick.
+        torp = self.engine.torpedoes[0]
+        self.assertAlmostEqual(torp.created_at, 100.0 - self.engine.max_rewind * self.engine.sim_dt)
+        self.assertGreater(torp.x, 500.0)
+
+    def test_arena_passes_stamps_through(self):
+        arena = Arena("test")
+        arena.engine = self.engine
+        arena.encodings = {"sid1": "json", "sid2": "json"}
+        arena.fire_torpedo("sid1", {"tick": self.engine.tick - 5})
+        self.engine.update = lambda: self.engine.apply_commands(100.0)
+        hits = [m.to for m in unbundle(arena.tick()) if m.event == "you_were_hit"]
+        self.assertEqual(hits, ["sid2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
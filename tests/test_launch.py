@@ -0,0 +1,45 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import ArenaManager
+from game.cluster import ClusterManager, FileBus
+from game.launch import make_arenas
+from game.workers import ArenaPool
+
+
+class TestMakeArenas(unittest.TestCase):
+    def test_defaults_to_in_process_manager(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            arenas = make_arenas({"STATE_DIR": tmp})
+            self.assertIs(type(arenas), ArenaManager)
+            self.assertEqual(arenas.state_dir, tmp)
+            arenas.close()
+
+    def test_cluster_directory_makes_a_node(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            arenas = make_arenas(
+                {"CLUSTER_DIRECTORY": os.path.join(tmp, "cluster.json"), "CLUSTER_NODE": "n1"}
+            )
+            self.assertIsInstance(arenas, ClusterManager)
+            self.assertEqual(arenas.node_id, "n1")
+            self.assertEqual(arenas.directory.url("n1"), "http://localhost:5000")
+            self.assertIsInstance(arenas.bus, FileBus)
+            self.assertEqual(arenas.bus.path, os.path.join(tmp, "cluster.json.bus"))
+            arenas.close()
+
+    def test_workers_make_a_pool(self):
+        arenas = make_arenas({"ARENA_WORKERS": "1"})
+        try:
+            self.assertIsInstance(arenas, ArenaPool)
+            self.assertEqual(len(arenas.workers), 1)
+        finally:
+            arenas.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
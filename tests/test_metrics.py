@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import Arena
+from game.metrics import METRICS, Metrics, SamplingProfiler
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render_counters_gauges_and_histograms(self):
+        metrics = Metrics(prefix="t")
+        metrics.inc("events_total", 3)
+        metrics.inc("events_total")
+        metrics.set("players", 7, arena="a")
+        metrics.observe("phase_seconds", 0.002, phase="collision")
+        metrics.observe("phase_seconds", 0.2, phase="collision")
+        text = metrics.render()
+        self.assertIn("# TYPE t_events_total counter", text)
+        self.assertIn("t_events_total 4", text)
+        self.assertIn('t_players{arena="a"} 7', text)
+        self.assertIn('t_phase_seconds_bucket{phase="collision",le="0.0025"} 1', text)
+        self.assertIn('t_phase_seconds_bucket{phase="collision",le="+Inf"} 2', text)
+        self.assertIn('t_phase_seconds_count{phase="collision"} 2', text)
+        self.assertIn('t_phase_seconds_recent{phase="collision",quantile="0.99"} 0.2', text)
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics(prefix="t")
+        metrics.set("players", 1, arena='evil"} 1\nt_fake 99\\')
+        self.assertEqual(
+            metrics.render().splitlines()[1], 't_players{arena="evil\\"} 1\\nt_fake 99\\\\"} 1'
+        )
+
+    def test_rolling_quantiles_forget_old_samples(self):
+        metrics = Metrics()
+        for _ in range(1000):
+            metrics.observe("tick_seconds", 1.0)
+        for _ in range(600):
+            metrics.observe("tick_seconds", 0.01)
+        self.assertEqual(metrics.quantiles("tick_seconds"), {"p50": 0.01, "p99": 0.01})
+
+    def test_removed_gauge_is_not_rendered(self):
+        metrics = Metrics(prefix="t")
+        metrics.set("players", 1, arena="gone")
+        metrics.remove("players", arena="gone")
+        self.assertNotIn("gone", metrics.render())
+
+    def test_arena_tick_records_phases(self):
+        arena = Arena("metrics")
+        arena.join("p1", "Alpha")
+        arena.join("p2", "Beta")
+        arena.engine.update(0.1)
+        arena.tick()
+        for phase in ("sub_physics", "torpedo_physics", "collision", "sensor_pass", "serialization"):
+            self.assertGreater(METRICS.quantiles("phase_seconds", phase=phase)["p99"], 0.0, phase)
+        self.assertEqual(METRICS.gauges["players"][(("arena", "metrics"),)], 2)
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_writes_folded_stacks_after_the_requested_ticks(self):
+        profiler = SamplingProfiler(interval=0.001)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stacks.folded")
+            self.assertTrue(profiler.start(2, path))
+            self.assertFalse(profiler.start(2, path))
+            time.sleep(0.02)
+            self.assertIsNone(profiler.tick())
+            self.assertEqual(profiler.tick(), path)
+            self.assertFalse(profiler.active)
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(any("MainThread" in line for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
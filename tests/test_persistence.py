@@ -0,0 +1,180 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import ArenaManager, journal_path
+from game.engine import GameEngine
+from game.metrics import METRICS
+from game.persistence import WorldJournal, dump_world, load_world
+
+
+class TestWorldState(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine(seed=7)
+        hunter = self.engine.add_player("sid1", "Hunter")
+        hunter.place(100.0, 200.0)
+        hunter.set_controls(90.0, 2, 120.0)
+        wreck = self.engine.add_player("sid2", "Wreck")
+        wreck.take_hit()
+        self.engine._untrack(self.engine.sub_index, wreck)
+        self.engine.fire_torpedo("sid1")
+        self.engine.step(0.05, 0.0)
+
+    def test_round_trip(self):
+        state = dump_world(self.engine, {"sid1": "tok1"})
+        restored = GameEngine()
+        self.assertEqual(load_world(restored, state), {"sid1": "tok1"})
+
+        self.assertEqual(restored.tick, self.engine.tick)
+        self.assertEqual(restored.ctx.seed, 7)
+        for sid, sub in self.engine.submarines.items():
+            self.assertEqual(restored.submarines[sid].to_dict(), sub.to_dict())
+        self.assertEqual(
+            [t.to_dict() for t in restored.torpedoes], [t.to_dict() for t in self.engine.torpedoes]
+        )
+        # Only living subs are indexed; new launches don't reuse restored ids.
+        self.assertIn("sid1", restored.sub_index)
+        self.assertNotIn("sid2", restored.sub_index)
+        self.assertGreater(restored.fire_torpedo("sid1"), self.engine.torpedoes[0].id)
+
+    def test_restored_world_continues_the_random_stream(self):
+        state = dump_world(self.engine, {})
+        restored = GameEngine()
+        load_world(restored, state)
+        self.assertEqual(restored.ctx.rng.random(), self.engine.ctx.rng.random())
+
+    def test_rebind_moves_sub_and_torpedoes(self):
+        self.engine.rebind_player("sid1", "new1")
+        self.assertNotIn("sid1", self.engine.submarines)
+        self.assertEqual(self.engine.submarines["new1"].id, "new1")
+        self.assertIn("new1", self.engine.sub_index)
+        self.assertEqual(self.engine.torpedoes[0].owner_id, "new1")
+        self.assertTrue(self.engine.queue_command("new1", "controls", {"speed": 1}))
+
+
+class TestWorldJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "arena.journal")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_then_patches_replay_to_latest_state(self):
+        engine = GameEngine()
+        engine.add_player("sid1", "Nemo")
+        journal = WorldJournal(self.path, snapshot_interval=4)
+        for _ in range(10):
+            engine.step(0.05, 0.0)
+            journal.record(dump_world(engine, {}))
+        journal.close()
+
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        # Compacted at records 1, 5 and 9, so only the last snapshot and one patch remain.
+        self.assertEqual(len(lines), 2)
+        state = WorldJournal.load(self.path)
+        self.assertEqual(state["world"]["tick"], engine.tick)
+        self.assertAlmostEqual(state["subs"][0]["x"], engine.submarines["sid1"].x, places=2)
+
+    def test_records_are_due_every_interval(self):
+        journal = WorldJournal(self.path, interval=3)
+        self.assertEqual([journal.due() for _ in range(7)], [True, False, False, True, False, False, True])
+        journal.close()
+
+    def test_torn_last_line_is_ignored(self):
+        journal = WorldJournal(self.path)
+        journal.record({"world": {"tick": 1}, "subs": [], "torpedoes": []})
+        journal.record({"world": {"tick": 2}, "subs": [], "torpedoes": []})
+        journal.close()
+        with open(self.path, "a") as f:
+            f.write('{"v":1,"seq":3,"ba')
+        self.assertEqual(WorldJournal.load(self.path)["world"]["tick"], 2)
+
+    def test_missing_file(self):
+        self.assertIsNone(WorldJournal.load(self.path))
+
+    def test_write_failure_stops_the_journal(self):
+        errors = METRICS.counters["journal_errors_total"].get((), 0)
+        journal = WorldJournal(os.path.join(self.tmp.name, "missing", "arena.journal"))
+        with self.assertLogs("game.persistence", "ERROR"):
+            journal.record({"world": {"tick": 1}, "subs": [], "torpedoes": []})
+            for _ in range(200):
+                if journal.failed:
+                    break
+                time.sleep(0.005)
+            self.assertIsInstance(journal.failed, OSError)
+        journal.record({"world": {"tick": 2}, "subs": [], "torpedoes": []})
+        self.assertTrue(journal._queue.empty())
+        self.assertFalse(journal.close())
+        self.assertEqual(METRICS.counters["journal_errors_total"][()], errors + 1)
+
+
+class TestRestart(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_and_stop(self):
+        manager = ArenaManager(slots=1, state_dir=self.tmp.name)
+        _, messages = manager.join("sid1", "Nemo", arena_name="north-sea")
+        token = next(m.payload["token"] for m in messages if m.event == "joined")
+        sub = manager.arenas["north-sea"].engine.submarines["sid1"]
+        sub.place(321.0, 654.0)
+        manager.tick()
+        manager.close()
+        return token
+
+    def test_player_reclaims_sub_after_restart(self):
+        token = self.run_and_stop()
+        manager = ArenaManager(slots=1, state_dir=self.tmp.name)
+        self.assertIn("north-sea", manager.arenas)
+
+        arena, messages = manager.join("sid9", "Someone", token=token)
+        self.assertEqual(arena.name, "north-sea")
+        sub = arena.engine.submarines["sid9"]
+        self.assertEqual((sub.username, sub.x, sub.y), ("Nemo", 321.0, 654.0))
+        self.assertNotIn("sid1", arena.engine.submarines)
+        joined = next(m.payload for m in messages if m.event == "joined")
+        self.assertEqual(joined["token"], token)
+        self.assertFalse(arena.detached)
+        manager.close()
+
+    def test_close_records_the_latest_state(self):
+        manager = ArenaManager(slots=1, state_dir=self.tmp.name)
+        manager.join("sid1", "Nemo", arena_name="west")
+        manager.tick()
+        arena = manager.arenas["west"]
+        arena.engine.submarines["sid1"].place(111.0, 222.0)
+        manager.tick()  # not a journal tick
+        manager.close()
+        state = WorldJournal.load(journal_path(self.tmp.name, "west"))
+        self.assertEqual((state["subs"][0]["x"], state["subs"][0]["y"]), (111.0, 222.0))
+
+    def test_unclaimed_subs_expire(self):
+        self.run_and_stop()
+        manager = ArenaManager(slots=1, state_dir=self.tmp.name)
+        arena = manager.arenas["north-sea"]
+        arena.detached = {token: (sid, 0.0) for token, (sid, _) in arena.detached.items()}
+        manager.tick()
+        self.assertNotIn("north-sea", manager.arenas)
+        self.assertFalse(os.path.exists(journal_path(self.tmp.name, "north-sea")))
+
+    def test_unknown_token_gets_a_fresh_sub(self):
+        manager = ArenaManager(state_dir=self.tmp.name)
+        arena, messages = manager.join("sid1", "Nemo", token="forged")
+        joined = next(m.payload for m in messages if m.event == "joined")
+        self.assertNotEqual(joined["token"], "forged")
+        self.assertEqual(arena.engine.submarines["sid1"].username, "Nemo")
+        manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.protocol import DeltaEncoder, DeltaDecoder
+
+
+def make_state(x, torpedoes):
+    return {
+        "you": {"id": "sid1", "x": x, "y": 10.0, "depth": 50.0, "alive": True},
+        "torpedoes": [{"id": t, "x": float(t), "y": 0.0, "created_at": 5.0} for t in torpedoes],
+    }
+
+
+class TestDeltaProtocol(unittest.TestCase):
+    def setUp(self):
+        self.encoder = DeltaEncoder(keyframe_interval=10)
+        self.decoder = DeltaDecoder()
+
+    def send(self, state):
+        message = self.encoder.encode(state)
+        self.assertTrue(self.decoder.apply(message))
+        self.encoder.ack(message["seq"])
+        return message
+
+    def test_first_message_is_keyframe(self):
+        message = self.send(make_state(1.0, [1]))
+        self.assertTrue(message["key"])
+        self.assertEqual(self.decoder.state["you"]["x"], 1.0)
+
+    def test_delta_contains_only_changes(self):
+        self.send(make_state(1.0, [1, 2]))
+        message = self.send(make_state(2.0, [2, 3]))
+
+        self.assertNotIn("key", message)
+        patch = message["patch"]
+        self.assertEqual(patch["you"], {"set": {"x": 2.0}})
+        self.assertEqual(patch["torpedoes"]["del"], [1])
+        self.assertEqual([t["id"] for t in patch["torpedoes"]["add"]], [3])
+        self.assertNotIn("upd", patch["torpedoes"])
+        self.assertEqual(self.decoder.state, make_state(2.0, [2, 3]))
+
+    def test_unacknowledged_messages_diff_against_last_ack(self):
+        self.send(make_state(1.0, []))
+        self.encoder.encode(make_state(2.0, []))  # lost / not yet acked
+        message = self.encoder.encode(make_state(3.0, []))
+        self.assertEqual(message["base"], 1)
+        self.assertTrue(self.decoder.apply(message))
+        self.assertEqual(self.decoder.state["you"]["x"], 3.0)
+
+    def test_removed_fields_are_unset(self):
+        self.send(make_state(1.0, []))
+        dead = {"you": {"id": "sid1", "alive": False, "respawn_at": 12.0}, "torpedoes": []}
+        message = self.send(dead)
+        self.assertEqual(set(message["patch"]["you"]["unset"]), {"x", "y", "depth"})
+        self.assertEqual(self.decoder.state, dead)
+
+    def test_periodic_keyframe(self):
+        keyframes = [self.send(make_state(float(i), [])).get("key", False) for i in range(25)]
+        self.assertEqual([i for i, key in enumerate(keyframes) if key], [0, 10, 20])
+
+    def test_decoder_requests_resync_on_unknown_base(self):
+        self.encoder.encode(make_state(1.0, []))
+        self.encoder.ack(1)
+        message = self.encoder.encode(make_state(2.0, []))
+        self.assertFalse(self.decoder.apply(message))
+        self.assertTrue(self.decoder.apply(self.encoder.keyframe()))
+        self.assertEqual(self.decoder.state["you"]["x"], 2.0)
+
+    def test_auto_ack_stream_diffs_against_previous(self):
+        encoder = DeltaEncoder(auto_ack=True)
+        encoder.encode(make_state(1.0, []))
+        message = encoder.encode(make_state(1.0, []))
+        self.assertEqual(message["base"], 1)
+        self.assertEqual(message["patch"], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
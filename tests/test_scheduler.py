@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import GameEngine
+from game.replay import ManualClock
+from game.scheduler import TickTimer
+from game.constants import MAX_CATCHUP_STEPS
+
+
+class TestTickTimer(unittest.TestCase):
+    def test_sleeps_until_deadline(self):
+        clock = ManualClock(100.0)
+        timer = TickTimer(5, clock=clock)
+        clock.advance(0.05)  # frame took 50 ms
+        self.assertFalse(timer.advance())
+        self.assertAlmostEqual(timer.remaining(), 0.15)
+
+    def test_overrun_is_reported_and_reanchored(self):
+        clock = ManualClock(100.0)
+        timer = TickTimer(5, clock=clock)
+        clock.advance(0.5)
+        self.assertTrue(timer.advance())
+        self.assertEqual(timer.overruns, 1)
+        self.assertAlmostEqual(timer.last_overrun, 0.3)
+        self.assertEqual(timer.remaining(), 0.0)
+
+
+class TestFixedStep(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine(sim_rate=20)
+
+    def test_elapsed_time_runs_whole_steps(self):
+        self.engine.update(0.12)
+        self.assertEqual(self.engine.tick, 2)
+        self.assertAlmostEqual(self.engine.accumulator, 0.02)
+
+        self.engine.update(0.03)
+        self.assertEqual(self.engine.tick, 3)
+        self.assertAlmostEqual(self.engine.accumulator, 0.0)
+
+    def test_catch_up_is_capped(self):
+        self.engine.update(5.0)
+        self.assertEqual(self.engine.tick, MAX_CATCHUP_STEPS)
+        self.assertEqual(self.engine.dropped_steps, 100 - MAX_CATCHUP_STEPS)
+        self.assertLess(self.engine.accumulator, self.engine.sim_dt)
+
+    def test_motion_is_independent_of_frame_size(self):
+        coarse = GameEngine(sim_rate=20)
+        fine = GameEngine(sim_rate=20)
+        for engine in (coarse, fine):
+            sub = engine.add_player("sid1", "Test")
+            sub.place(1000.0, 1000.0)
+            sub.heading = 0.0
+            engine.update_controls("sid1", {"speed": 4.0, "heading": 45.0})
+
+        for _ in range(4):
+            coarse.update(0.2)
+        for _ in range(16):
+            fine.update(0.05)
+
+        a, b = coarse.submarines["sid1"], fine.submarines["sid1"]
+        self.assertEqual(coarse.tick, fine.tick)
+        self.assertAlmostEqual(a.x, b.x)
+        self.assertAlmostEqual(a.y, b.y)
+        self.assertAlmostEqual(a.heading, b.heading)
+
+
+if __name__ == '__main__':
+    unittest.main()
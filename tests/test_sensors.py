@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import math
+import random
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import GameEngine
+from game.physics import wrap_delta
+from game.constants import PASSIVE_SONAR_RANGE, SONAR_RANGE
+
+
+def build(seed):
+    engine = GameEngine(seed=seed)
+    rng = random.Random(5)
+    for i in range(30):
+        sub = engine.add_player(f"sid{i}", f"Sub{i}")
+        sub.place(rng.uniform(0, 2000), rng.uniform(0, 2000))
+        sub.depth = rng.uniform(0, 300)
+    return engine
+
+
+class TestSensorPass(unittest.TestCase):
+    def test_matches_pairwise_geometry(self):
+        engine = build(1)
+        subs = list(engine.submarines.values())
+        for sub in subs:
+            expected = {}
+            for other in subs:
+                if other is sub:
+                    continue
+                dx = wrap_delta(other.x - sub.x)
+                dy = wrap_delta(other.y - sub.y)
+                dist = math.sqrt(dx * dx + dy * dy + (other.depth - sub.depth) ** 2)
+                if dist <= PASSIVE_SONAR_RANGE:
+                    expected[other.id] = (dist, (math.degrees(math.atan2(dx, -dy)) + 360.0) % 360.0)
+            actual = {c.sub.id: (c.distance, c.bearing) for c in engine.sensor_contacts(sub.id)}
+            self.assertEqual(set(actual), set(expected))
+            for sid, (dist, bearing) in expected.items():
+                self.assertAlmostEqual(actual[sid][0], dist)
+                self.assertAlmostEqual(math.cos(math.radians(actual[sid][1] - bearing)), 1.0)
+
+    def test_seeded_noise_is_reproducible(self):
+        a, b, c = build(7), build(7), build(8)
+        states = [e.get_personal_state("sid0")["passive_contacts"] for e in (a, b, c)]
+        self.assertTrue(states[0])
+        self.assertEqual(states[0], states[1])
+        self.assertNotEqual(states[0], states[2])
+
+    def test_pass_is_cached_until_something_moves(self):
+        engine = build(1)
+        first = engine.sensor_contacts("sid0")
+        self.assertIs(engine.sensor_contacts("sid0"), first)
+        engine.submarines["sid0"].place(1.0, 1.0)
+        self.assertIsNot(engine.sensor_contacts("sid0"), first)
+
+    def test_ping_uses_true_range(self):
+        engine = build(1)
+        sub = engine.submarines["sid0"]
+        result = engine.perform_sonar_ping("sid0")
+        true = {c.sub.id: c.distance for c in engine.sensor_contacts("sid0") if c.distance <= SONAR_RANGE}
+        self.assertEqual({c["id"] for c in result["contacts"]}, set(true))
+        for contact in result["contacts"]:
+            self.assertAlmostEqual(contact["distance"], true[contact["id"]], delta=0.05)
+        self.assertTrue(all(d["pinger_id"] == sub.id for d in result["detected_by"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import GameEngine
+from game.spatial import SpatialHash
+from game.constants import WORLD_SIZE, SONAR_RANGE
+
+
+class Point:
+    def __init__(self, key, x, y):
+        self.id = key
+        self.x = x
+        self.y = y
+
+
+class TestSpatialHash(unittest.TestCase):
+    def setUp(self):
+        self.grid = SpatialHash(cell_size=100.0, world_size=1000.0)
+
+    def test_query_radius(self):
+        self.grid.insert("a", Point("a", 100, 100))
+        self.grid.insert("b", Point("b", 180, 100))
+        self.grid.insert("c", Point("c", 500, 500))
+
+        found = {p.id for p in self.grid.query(100, 100, 90)}
+        self.assertEqual(found, {"a", "b"})
+
+    def test_query_wraps_around_edges(self):
+        self.grid.insert("edge", Point("edge", 995, 5))
+        found = {p.id for p in self.grid.query(5, 995, 20)}
+        self.assertEqual(found, {"edge"})
+
+    def test_move_and_remove(self):
+        p = Point("a", 50, 50)
+        self.grid.insert("a", p)
+        p.x, p.y = 750, 750
+        self.grid.move("a", p)
+        self.assertEqual(self.grid.query(50, 50, 40), [])
+        self.assertEqual(self.grid.query(750, 750, 1), [p])
+
+        self.grid.remove("a")
+        self.assertEqual(len(self.grid), 0)
+        self.assertEqual(self.grid.query(750, 750, 1), [])
+
+    def test_large_radius_covers_world_once(self):
+        for i in range(10):
+            self.grid.insert(i, Point(i, i * 97.0, i * 53.0))
+        self.assertEqual(len(self.grid.query(0, 0, 5000)), 10)
+
+
+class TestEngineIndex(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine()
+
+    def test_index_follows_submarine_moves(self):
+        sub = self.engine.add_player("sid1", "Mover")
+        sub.x, sub.y = 10.0, 10.0
+        self.assertIn(sub, self.engine.subs_near(10.0, 10.0, 1.0))
+
+        sub.x = 1500.0
+        self.assertNotIn(sub, self.engine.subs_near(10.0, 10.0, 100.0))
+        self.assertIn(sub, self.engine.subs_near(1500.0, 10.0, 1.0))
+
+    def test_removed_player_leaves_index(self):
+        sub = self.engine.add_player("sid1", "Leaver")
+        self.engine.remove_player("sid1")
+        self.assertEqual(self.engine.subs_near(sub.x, sub.y, 1.0), [])
+
+    def test_sonar_ping_across_world_edge(self):
+        pinger = self.engine.add_player("sid1", "Pinger")
+        target = self.engine.add_player("sid2", "Target")
+        pinger.x, pinger.y, pinger.depth = 10.0, 1000.0, 50.0
+        target.x, target.y, target.depth = WORLD_SIZE - 10.0, 1000.0, 50.0
+
+        result = self.engine.perform_sonar_ping("sid1")
+        self.assertEqual(len(result["contacts"]), 1)
+        self.assertAlmostEqual(result["contacts"][0]["distance"], 20.0)
+        self.assertAlmostEqual(result["contacts"][0]["bearing"], 270.0)
+
+    def test_torpedo_hits_through_index(self):
+        shooter = self.engine.add_player("sid1", "Shooter")
+        victim = self.engine.add_player("sid2", "Victim")
+        shooter.x, shooter.y, shooter.depth, shooter.heading = 500.0, 500.0, 50.0, 90.0
+        victim.x, victim.y, victim.depth, victim.heading = 500.0 + SONAR_RANGE, 500.0, 50.0, 0.0
+
+        self.engine.fire_torpedo("sid1")
+        torp = self.engine.torpedoes[0]
+        torp.x = victim.x - 5.0
+
+        events = self.engine.update(self.engine.sim_dt)
+        self.assertEqual([e["type"] for e in events], ["hit"])
+        self.assertFalse(victim.alive)
+        self.assertEqual(self.engine.torpedoes, [])
+        self.assertEqual(len(self.engine.torpedo_index), 0)
+        self.assertEqual(self.engine.subs_near(victim.x, victim.y, 1.0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
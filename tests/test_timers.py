@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.constants import SONAR_CONTACT_WINDOW
+from game.engine import GameEngine
+from game.timers import TimerQueue
+
+
+class TestTimerQueue(unittest.TestCase):
+    def test_fires_due_timers_in_order(self):
+        timers = TimerQueue()
+        timers.schedule(3.0, "c")
+        timers.schedule(1.0, "a", "first")
+        timers.schedule(1.0, "b", "second")
+        cancelled = timers.schedule(2.0, "x")
+        timers.cancel(cancelled)
+        self.assertEqual(list(timers.due(2.5)), [("a", "first"), ("b", "second")])
+        self.assertEqual(len(timers), 1)
+        self.assertEqual(list(timers.due(2.5)), [])
+        self.assertEqual(list(timers.due(3.0)), [("c", None)])
+
+
+class TestEngineTimers(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine()
+        self.pinger = self.engine.add_player("sid1", "Pinger")
+        self.other = self.engine.add_player("sid2", "Other")
+        self.pinger.place(100.0, 100.0)
+        self.other.place(200.0, 100.0)
+
+    def contacts(self, sid):
+        return [c["id"] for c in self.engine.get_personal_state(sid)["sonar_contacts"]]
+
+    def test_ping_reveals_contacts_for_the_window(self):
+        self.assertEqual(self.contacts("sid1"), [])
+        self.engine.perform_sonar_ping("sid1", 10.0)
+        self.assertEqual(self.contacts("sid1"), ["sid2"])
+        self.assertEqual(self.contacts("sid2"), ["sid1"])  # the pinger gave itself away
+
+        self.engine.step(0.05, 10.0 + SONAR_CONTACT_WINDOW - 1.0)
+        self.assertEqual(self.contacts("sid1"), ["sid2"])
+        self.engine.step(0.05, 10.0 + SONAR_CONTACT_WINDOW)
+        self.assertEqual(self.contacts("sid1"), [])
+
+    def test_newer_ping_extends_the_window(self):
+        self.engine.perform_sonar_ping("sid1", 10.0)
+        self.engine.perform_sonar_ping("sid1", 12.0)
+        self.engine.step(0.05, 10.0 + SONAR_CONTACT_WINDOW)
+        self.assertEqual(self.contacts("sid1"), ["sid2"])
+
+    def test_recycled_torpedo_outlives_its_predecessors_timer(self):
+        self.engine.fire_torpedo("sid1", 0.0)
+        torp = self.engine.torpedoes[0]
+        expiry = self.engine.expiry_timers[torp.id]
+        self.engine._retire_torpedo(torp)
+        self.assertIsNone(expiry[2])  # cancelled along with the torpedo
+        self.assertEqual(self.engine.expiry_timers, {})
+        self.engine.fire_torpedo("sid1", 15.0)
+        self.assertIs(self.engine.torpedoes[0], torp)  # same pooled object
+        self.engine.step(0.05, 20.0)
+        self.assertEqual(len(self.engine.torpedoes), 1)
+        self.engine.step(0.05, 35.0)
+        self.assertEqual(self.engine.torpedoes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
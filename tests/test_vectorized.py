@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import math
+import random
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import GameEngine
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def build_engine(backend, seed):
+    rng = random.Random(seed)
+    engine = GameEngine(backend=backend)
+    for i in range(12):
+        sub = engine.add_player(f"sid{i}", f"Captain {i}")
+        sub.place(rng.uniform(0, 2000), rng.uniform(0, 2000))
+        sub.heading = rng.uniform(0, 360)
+        sub.depth = rng.uniform(20, 120)
+        sub.set_controls(rng.uniform(0, 360), rng.uniform(0, 4), rng.uniform(0, 300))
+
+    # Park a target straight down the first shooter's line of fire.
+    shooter, target = engine.submarines["sid0"], engine.submarines["sid1"]
+    heading_rad = math.radians(shooter.heading)
+    target.place(
+        (shooter.x + math.sin(heading_rad) * 100.0) % 2000,
+        (shooter.y - math.cos(heading_rad) * 100.0) % 2000,
+    )
+    target.depth = target.target_depth = shooter.depth
+    target.target_speed = 0.0
+    for i in range(0, 12, 2):
+        engine.fire_torpedo(f"sid{i}")
+    return engine
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestVectorizedBackend(unittest.TestCase):
+    def test_unknown_backend_rejected(self):
+        with self.assertRaises(ValueError):
+            GameEngine(backend="gpu")
+
+    def test_matches_object_backend(self):
+        reference = build_engine("object", seed=7)
+        batched = build_engine("numpy", seed=7)
+
+        now = 1000.0
+        hits = 0
+        for _ in range(200):
+            now += 0.2
+            ref_events = reference.step(0.2, now)
+            vec_events = batched.step(0.2, now)
+            self.assertEqual(
+                [(e["type"], e.get("victim_id")) for e in ref_events],
+                [(e["type"], e.get("victim_id")) for e in vec_events],
+            )
+            hits += sum(1 for e in vec_events if e["type"] == "hit")
+        self.assertGreaterEqual(hits, 1)
+
+        for sid, ref in reference.submarines.items():
+            vec = batched.submarines[sid]
+            self.assertEqual(ref.alive, vec.alive)
+            for attr in ("x", "y", "depth", "heading", "speed"):
+                self.assertAlmostEqual(getattr(ref, attr), getattr(vec, attr), places=6)
+
+        self.assertEqual(len(reference.torpedoes), len(batched.torpedoes))
+        for ref, vec in zip(reference.torpedoes, batched.torpedoes):
+            self.assertAlmostEqual(ref.x, vec.x, places=6)
+            self.assertAlmostEqual(ref.y, vec.y, places=6)
+
+    def test_owner_is_never_hit(self):
+        engine = GameEngine(backend="numpy")
+        engine.add_player("sid1", "Loner")
+        engine.fire_torpedo("sid1")
+        self.assertEqual(engine.step(0.0, 0.0), [])
+        self.assertEqual(len(engine.torpedoes), 1)
+
+    def test_models_are_views_onto_the_arrays(self):
+        engine = build_engine("numpy", seed=3)
+        columns = engine.vector.sub_columns.arrays
+        sub = engine.submarines["sid4"]
+        sub.place(123.0, 456.0)
+        self.assertEqual((columns["x"][sub.slot], columns["y"][sub.slot]), (123.0, 456.0))
+        sub.target_heading = None
+        self.assertIsNone(sub.target_heading)
+
+        # A departing sub's row is reused; it and the others keep their state.
+        before = {sid: s.to_dict() for sid, s in engine.submarines.items()}
+        left = engine.remove_player("sid0")
+        self.assertEqual(left.to_dict(), before.pop("sid0"))
+        self.assertEqual({sid: s.to_dict() for sid, s in engine.submarines.items()}, before)
+        self.assertEqual(sorted(s.slot for s in engine.submarines.values()), list(range(11)))
+
+        # A retired torpedo's row is filled by the last one, which moves with it.
+        last = engine.torpedoes[-1]
+        state = last.to_dict()
+        engine._retire_torpedo(engine.torpedoes[0])
+        self.assertEqual(last.slot, 0)
+        self.assertEqual(last.to_dict(), state)
+
+    def test_radius_queries_match_the_spatial_index(self):
+        engine = build_engine("numpy", seed=5)
+        for _ in range(20):
+            engine.step(0.2, 0.0)
+        for sub in engine.submarines.values():
+            self.assertEqual(
+                {t.id for t in engine.torpedoes_near(sub.x, sub.y, 300.0)},
+                {t.id for t in engine.torpedo_index.query(sub.x, sub.y, 300.0)},
+            )
+            self.assertEqual(
+                {s.id for s in engine.subs_near(sub.x, sub.y, 700.0)},
+                {s.id for s in engine.sub_index.query(sub.x, sub.y, 700.0)},
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
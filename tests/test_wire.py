@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import json
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.engine import GameEngine
+from game.protocol import DeltaEncoder, DeltaDecoder
+from game.wire import (
+    WireCodec,
+    HandleTable,
+    PLAYER_STREAM,
+    negotiate,
+)
+
+
+class TestHandleTable(unittest.TestCase):
+    def test_released_handles_resolve_until_reused(self):
+        table = HandleTable(size=3)
+        a = table.acquire("a")
+        b = table.acquire("b")
+        table.release("a")
+        self.assertEqual(table.get("a"), a)
+
+        c = table.acquire("c")
+        self.assertNotIn(c, (a, b))
+        d = table.acquire("d")  # wraps around onto the released handle
+        self.assertEqual(d, a)
+        self.assertEqual(table.get("a"), 0)
+
+    def test_overflow(self):
+        table = HandleTable(size=1)
+        table.acquire("a")
+        with self.assertRaises(OverflowError):
+            table.acquire("b")
+
+
+class TestWireCodec(unittest.TestCase):
+    def setUp(self):
+        self.engine = GameEngine()
+        self.codec = WireCodec()
+        for sid, name in (("sid1", "Nemo"), ("sid2", "Ahab")):
+            sub = self.engine.add_player(sid, name)
+            self.codec.register_sub(sid, name)
+        self.engine.submarines["sid1"].place(100.0, 100.0)
+        self.engine.submarines["sid2"].place(400.0, 100.0)
+
+    def round_trip(self, schema, encoder, decoder, state):
+        message = encoder.encode(state)
+        frame = self.codec.encode_stream(schema, message)
+        self.assertIsInstance(frame, bytes)
+        self.assertTrue(decoder.apply(self.codec.decode_stream(schema, frame)))
+        encoder.ack(message["seq"])
+        return frame, message
+
+    def test_player_stream_round_trip(self):
+        encoder, decoder = DeltaEncoder(), DeltaDecoder()
+        for _ in range(3):
+            self.engine.step(0.2, 0.0)
+            state = self.engine.get_personal_state("sid1")
+            frame, message = self.round_trip(PLAYER_STREAM, encoder, decoder, state)
+
+        decoded = decoder.state
+        you = decoded["you"]
+        self.assertEqual(you["id"], self.codec.subs.get("sid1"))
+        self.assertEqual(you["username"], "Nemo")
+        self.assertAlmostEqual(you["x"], state["you"]["x"], delta=0.05)
+        self.assertAlmostEqual(you["heading"], state["you"]["heading"], delta=0.01)
+
+        passive = decoded["passive_contacts"]
+        self.assertEqual([c["username"] for c in passive], ["Ahab"])
+        self.assertAlmostEqual(passive[0]["distance"], state["passive_contacts"][0]["distance"], delta=0.1)
+        self.assertLess(len(frame), len(json.dumps(message)))
+
+    def test_frames_carry_the_simulation_tick(self):
+        encoder = DeltaEncoder()
+        self.engine.step(0.05, 0.0)
+        state = self.engine.get_personal_state("sid1")
+        message = encoder.encode(state, self.engine.tick)
+        decoded = self.codec.decode_stream(PLAYER_STREAM, self.codec.encode_stream(PLAYER_STREAM, message))
+        self.assertEqual(decoded["tick"], self.engine.tick)
+
+    def test_torpedo_handles_follow_the_world(self):
+        encoder, decoder = DeltaEncoder(auto_ack=True), DeltaDecoder()
+        self.engine.fire_torpedo("sid1")
+        self.codec.sync_torpedoes(t.id for t in self.engine.torpedoes)
+        self.round_trip(PLAYER_STREAM, encoder, decoder, self.engine.get_personal_state("sid1"))
+        self.assertEqual(len(self.codec.torpedoes), 1)
+        torp = decoder.state["torpedoes"][0]
+        self.assertEqual(torp["owner"], self.codec.subs.get("sid1"))
+
+        self.engine.step(0.2, self.engine.torpedoes[0].expires_at)
+        self.codec.sync_torpedoes(t.id for t in self.engine.torpedoes)
+        self.round_trip(PLAYER_STREAM, encoder, decoder, self.engine.get_personal_state("sid1"))
+        self.assertEqual(decoder.state["torpedoes"], [])
+        self.assertEqual(len(self.codec.torpedoes), 0)
+
+    def test_sonar_events(self):
+        result = self.engine.perform_sonar_ping("sid1")
+        decoded = self.codec.decode_sonar_result(self.codec.encode_sonar_result(result["contacts"]))
+        self.assertEqual(decoded["contacts"][0]["username"], "Ahab")
+        self.assertAlmostEqual(decoded["contacts"][0]["distance"], 300.0, delta=0.1)
+
+        detected = self.codec.decode_ping_detected(self.codec.encode_ping_detected("sid1", 300.0))
+        self.assertEqual(detected["pinging_username"], "Nemo")
+        self.assertAlmostEqual(detected["approx_distance"], 300.0, delta=0.1)
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(["json", "binary"]), "binary")
+        self.assertEqual(negotiate(["json"]), "json")
+        self.assertEqual(negotiate(None), "json")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import game package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.arena import unbundle
+from game.workers import ArenaPool
+
+
+class TestArenaPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ArenaPool(2, slots=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def drain(self, index, expected):
+        """Collects messages from a worker until ``expected`` events have arrived."""
+        seen = []
+        while not set(expected) <= {m.event for m in seen}:
+            batch = self.pool.receive(index, timeout=10.0)
+            self.assertTrue(batch, f"timed out waiting for {expected}")
+            seen.extend(unbundle(batch))
+        return seen
+
+    def test_arenas_spread_over_workers(self):
+        red, _ = self.pool.join("sid1", "One", arena_name="red")
+        blue, _ = self.pool.join("sid2", "Two", arena_name="blue")
+        self.assertIsNot(red.worker, blue.worker)
+        self.assertEqual(red.rooms_for("sid1"), ["arena:red", "arena:red:json"])
+
+    def test_worker_runs_commands_and_ticks(self):
+        arena, messages = self.pool.join("sid1", "One", encodings=["binary"])
+        self.assertEqual(messages, [])
+        index = self.pool.workers.index(arena.worker)
+        joined = self.drain(index, ["joined"])
+        self.assertEqual(joined[0].event, "entity_names")
+
+        self.pool.tick()
+        update = [m for m in self.drain(index, ["state_update"]) if m.event == "state_update"]
+        self.assertEqual(update[0].to, "sid1")
+        self.assertIsInstance(update[0].payload, bytes)
+
+        arena.sonar_ping("sid1")
+        self.pool.tick()
+        self.assertIn("sonar_result", [m.event for m in self.drain(index, ["sonar_result"])])
+
+    def test_empty_arena_closes_in_worker(self):
+        arena, _ = self.pool.join("sid1", "One", arena_name="red")
+        self.pool.leave("sid1")
+        self.assertNotIn("red", self.pool.arenas)
+        self.assertNotIn("red", arena.worker.arenas)
+
+
+if __name__ == '__main__':
+    unittest.main()